@@ -0,0 +1,51 @@
+"""Profile suggestions for the search box. The profiles are found with the
+   indexed prefix search of ProfileQuerySet.search(); the suggestions of the
+   short prefixes, typed by everybody and matching the most profiles, are
+   kept in the cache for a little while.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Profile
+
+AUTOCOMPLETE_CACHE_KEY = 'accounts:autocomplete:{}'
+
+
+def get_cache_key(prefix):
+    digest = hashlib.md5(prefix.encode('utf-8')).hexdigest()
+    return AUTOCOMPLETE_CACHE_KEY.format(digest)
+
+
+def find_profile_suggestions(prefix, limit):
+    qs = Profile.objects.search(prefix)
+    suggestions = []
+    for profile in qs[:limit]:
+        suggestions.append({
+            'username': profile.user.username,
+            'name': profile.name,
+            'url': profile.get_absolute_url(),
+            'image': profile.image.url if profile.image else None,
+        })
+    return suggestions
+
+
+def get_profile_suggestions(prefix):
+    """Returns the most followed profiles whose name or username starts with
+       prefix, as dicts ready to be serialized.
+    """
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    limit = settings.PROFILE_AUTOCOMPLETE_LIMIT
+    if len(prefix) > settings.PROFILE_AUTOCOMPLETE_CACHED_PREFIX_LENGTH:
+        return find_profile_suggestions(prefix, limit)
+
+    key = get_cache_key(prefix)
+    suggestions = cache.get(key)
+    if suggestions is None:
+        suggestions = find_profile_suggestions(prefix, limit)
+        cache.set(
+            key, suggestions, settings.PROFILE_AUTOCOMPLETE_CACHE_TIMEOUT)
+    return suggestions
@@ -0,0 +1,65 @@
+"""The "People worth following" page reads its profiles by rank from the
+   precomputed leaderboard, so any of its pages costs the same whatever the
+   number of profiles.
+"""
+from django.db.models import Count, Max
+
+from .models import LeaderboardEntry, Profile
+
+
+class Leaderboard:
+    """Sequence of the ranked profiles. Slicing it fetches the profiles of a
+       range of ranks, so it can be given to paginators in place of a
+       queryset.
+    """
+
+    def __init__(self, queryset=None):
+        if queryset is None:
+            queryset = Profile.objects.all()
+        self.queryset = queryset
+
+    def __len__(self):
+        return self.count()
+
+    def count(self):
+        if not hasattr(self, '_count'):
+            stats = LeaderboardEntry.objects.aggregate(
+                count=Count('id'), last_rank=Max('rank'))
+            if stats['count']:
+                self._count = stats['count']
+                self._last_rank = stats['last_rank']
+            else:
+                # Not built yet (refresh_leaderboard builds it), the profiles
+                # are ranked by the query.
+                self._count = self.queryset.count()
+                self._last_rank = None
+        return self._count
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.count())
+            if start >= stop:
+                return []
+            if self._last_rank is None:
+                return list(self.queryset.top()[start:stop])
+            if self._last_rank != self._count:
+                # Deleted profiles left gaps in the ranks until the next
+                # refresh, read the ranks of the range.
+                ranks = LeaderboardEntry.objects.order_by('rank')
+                ranks = list(
+                    ranks.values_list('rank', flat=True)[start:stop])
+                if not ranks:
+                    return []
+                start, stop = ranks[0] - 1, ranks[-1]
+            qs = self.queryset.filter(
+                leaderboard_entry__rank__gt=start,
+                leaderboard_entry__rank__lte=stop)
+            return list(qs.order_by('leaderboard_entry__rank'))
+        if key < 0:
+            key += self.count()
+        if not 0 <= key < self.count():
+            raise IndexError('leaderboard index out of range')
+        return self[key:key + 1][0]
+
+    def __iter__(self):
+        return iter(self[:])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    help = (
+        'Rank the profiles again for the "People worth following" page. '
+        'Schedule it, new profiles are ranked last until then.')
+
+    def handle(self, *args, **options):
+        LeaderboardEntry.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            'Ranked {} profiles.'.format(LeaderboardEntry.objects.count())))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the stored diaries, followers and followed profiles '
+        'counters of the profiles.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of profiles updated per query.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        profiles_ids = Profile.objects.order_by('pk').values_list(
+            'pk', flat=True)
+
+        repaired = 0
+        last_pk = 0
+        while True:
+            chunk = list(profiles_ids.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            repaired += Profile.objects.filter(
+                pk__in=chunk).refresh_counters()
+            last_pk = chunk[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            'Repaired the counters of {} profiles.'.format(repaired)))
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:21
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def set_profile_counters(apps, schema_editor):
+    Profile = apps.get_model('accounts', 'Profile')
+    profiles = Profile.objects.annotate(
+        diaries=Count('written_diaries', distinct=True),
+        visible_diaries=Count(
+            'written_diaries',
+            filter=Q(written_diaries__is_visible='all'),
+            distinct=True),
+        followers_number=Count('followers', distinct=True),
+        followed_profiles_number=Count('followed_profiles', distinct=True))
+    for p in profiles:
+        p.written_diaries_count = p.diaries
+        p.visible_written_diaries_count = p.visible_diaries
+        p.followers_count = p.followers_number
+        p.followed_profiles_count = p.followed_profiles_number
+        p.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_assign_default_image_to_profile_without_one'),
+        ('diaries', '0011_diary_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followed_profiles_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='visible_written_diaries_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='written_diaries_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            set_profile_counters,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(unique=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to='accounts.Profile')),
+            ],
+            options={
+                'verbose_name_plural': 'leaderboard entries',
+                'ordering': ['rank'],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import migrations
+
+# (index name, table getter, column) of the columns profiles are searched by.
+# Django matches istartswith with UPPER(column::text) LIKE on PostgreSQL and
+# with LIKE (case insensitive for ASCII) on SQLite.
+SEARCH_COLUMNS = (
+    ('accounts_profile_name_search_idx', 'accounts.Profile', 'name'),
+    ('accounts_user_username_search_idx', settings.AUTH_USER_MODEL,
+     'username'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        sql = ('CREATE INDEX {} ON {} '
+               'USING GIN ((UPPER({}::text)) gin_trgm_ops)')
+    elif vendor == 'sqlite':
+        sql = 'CREATE INDEX {} ON {} ({} COLLATE NOCASE)'
+    else:
+        return
+    for index_name, model_name, column in SEARCH_COLUMNS:
+        table = apps.get_model(model_name)._meta.db_table
+        schema_editor.execute(sql.format(
+            index_name,
+            schema_editor.quote_name(table),
+            schema_editor.quote_name(column)))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    for index_name, model_name, column in SEARCH_COLUMNS:
+        schema_editor.execute('DROP INDEX {}'.format(index_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # The last migration that alters auth_user, SQLite rebuilds the table
+        # (and drops its indexes) on every AlterField.
+        ('auth', '0009_alter_user_last_name_max_length'),
+        ('accounts', '0007_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
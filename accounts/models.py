@@ -1,25 +1,78 @@
-from django.db import models
-from django.db.models import Count, F
-from django.db.models.signals import post_save
+import hashlib
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    BooleanField, Count, Exists, F, IntegerField, Max, OuterRef, Q, Subquery,
+    Value, Window)
+from django.db.models.functions import RowNumber
+from django.db.models.signals import post_delete, post_save, m2m_changed
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from .utils import assign_default_image_to_profile
+from core.page_cache import invalidate_anonymous_pages
+from core.thumbnails import schedule_thumbnails
 from core.utils import get_image_upload_path
 
 
 class ProfileQuerySet(models.QuerySet):
-    def with_diaries_followers_count(self):
-        return self.annotate(
-            written_diaries_count=Count('written_diaries', distinct=True),
-            followers_count=Count('followers', distinct=True),
-        )
+    def _count_subquery(self, relation, condition=None):
+        qs = Profile.objects.filter(pk=OuterRef('pk')).order_by()
+        qs = qs.annotate(count=Count(relation, filter=condition))
+        return Subquery(qs.values('count'), output_field=IntegerField())
+
+    def refresh_follow_counters(self):
+        """Recomputes the stored followers and followed profiles counts"""
+        return self.update(
+            followers_count=self._count_subquery('followers'),
+            followed_profiles_count=self._count_subquery('followed_profiles'))
+
+    def refresh_counters(self):
+        """Recomputes every stored counter of the profiles, the soft deleted
+           diaries aren't counted
+        """
+        return self.update(
+            written_diaries_count=self._count_subquery(
+                'written_diaries',
+                Q(written_diaries__is_deleted=False)),
+            visible_written_diaries_count=self._count_subquery(
+                'written_diaries',
+                Q(written_diaries__is_deleted=False,
+                  written_diaries__is_visible='all')),
+            followers_count=self._count_subquery('followers'),
+            followed_profiles_count=self._count_subquery('followed_profiles'))
+
+    def with_viewer_state(self, user):
+        """Annotates is_followed: whether user follows the profile. It's
+           computed by the same query that fetches the profiles.
+        """
+        if not user.is_authenticated:
+            return self.annotate(
+                is_followed=Value(False, output_field=BooleanField()))
+        # profile.followers rows go from the followed profile to the follower.
+        follows = Profile.followers.through.objects.filter(
+            from_profile=OuterRef('pk'),
+            to_profile=user.profile)
+        return self.annotate(is_followed=Exists(follows))
+
+    def search(self, q):
+        """Returns the profiles whose name or username starts with q (case
+           insensitive), most followed first. Both columns have a prefix
+           index; the conditions are on two tables so they're queried
+           separately and merged with UNION, an OR would scan the profiles.
+        """
+        qs = self.select_related('user')
+        by_name = qs.filter(name__istartswith=q)
+        users = get_user_model().objects.filter(username__istartswith=q)
+        by_username = qs.filter(user__in=users.values('pk'))
+        qs = by_name.union(by_username)
+        return qs.order_by('-followers_count', 'pk')
 
     def top(self):
-        qs = self.with_diaries_followers_count()
-        qs = qs.annotate(
+        qs = self.annotate(
             interactions=F('written_diaries_count') + F('followers_count')
-        ).order_by('-interactions')
+        ).order_by('-interactions', 'pk')
         return qs
 
 
@@ -61,6 +114,26 @@ class Profile(models.Model):
         default=NOT_SPECIFIED
     )
 
+    # Counters kept up to date when diaries are written, deleted or change
+    # visibility and when profiles follow each other.
+    COUNTER_FIELDS = (
+        'written_diaries_count',
+        'visible_written_diaries_count',
+        'followers_count',
+        'followed_profiles_count',
+    )
+    written_diaries_count = models.PositiveIntegerField(default=0)
+    visible_written_diaries_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    followed_profiles_count = models.PositiveIntegerField(default=0)
+
+    # Thumbnails of the image shown by the templates, generated when it's
+    # saved.
+    THUMBNAILS = (
+        ('50x50', {'crop': 'center'}),
+        ('50x50', {'crop': '90px'}),
+    )
+
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -75,14 +148,93 @@ class Profile(models.Model):
     def get_absolute_url(self):
         return reverse('accounts:profile_detail', args=[self.user.username])
 
+    @property
+    def card_version(self):
+        """Changes with the name and the image of the profile. The cached
+           diary cards and pages showing them are keyed on it.
+        """
+        image = self.image.name if self.image else ''
+        value = '{}:{}'.format(self.name, image)
+        return hashlib.md5(value.encode('utf-8')).hexdigest()[:12]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Profile, cls).from_db(db, field_names, values)
+        # Keep the loaded values around so that save handlers can tell what
+        # changed (the image for instance).
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.name:
             self.name = self.user.username
+        # The counters are only written by UPDATE queries, don't overwrite
+        # them with the values loaded with the instance.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS]
         return super(Profile, self).save(*args, **kwargs)
 
-    @property
-    def visible_written_diaries_count(self):
-        return self.written_diaries.filter(is_visible='all').count()
+
+class LeaderboardEntryQuerySet(models.QuerySet):
+    BATCH_SIZE = 1000
+
+    def last_rank(self):
+        return self.aggregate(Max('rank'))['rank__max'] or 0
+
+    def rebuild(self):
+        """Replaces the leaderboard with the current ranking of profiles,
+           numbered by the database so that the ranks have no gaps
+        """
+        ranking = Profile.objects.top().annotate(rank=Window(
+            RowNumber(),
+            order_by=[F('interactions').desc(), F('pk').asc()]))
+        ranking = ranking.order_by().values_list('id', 'rank')
+        with transaction.atomic():
+            self.all().delete()
+            entries = []
+            for profile_id, rank in ranking.iterator():
+                entries.append(
+                    LeaderboardEntry(rank=rank, profile_id=profile_id))
+                if len(entries) >= self.BATCH_SIZE:
+                    self.bulk_create(entries)
+                    entries = []
+            self.bulk_create(entries)
+
+    def append(self, profile):
+        """Ranks profile last, where new profiles belong until the next
+           rebuild. Returns None if the rank was taken by a concurrent append
+           too many times.
+        """
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    return self.create(
+                        rank=self.last_rank() + 1,
+                        profile=profile)
+            except IntegrityError:
+                continue
+
+
+class LeaderboardEntry(models.Model):
+    """Precomputed position of a profile in the "People worth following"
+       ranking, so that a page of it is a range of ranks.
+    """
+    rank = models.PositiveIntegerField(unique=True)
+    profile = models.OneToOneField(
+        Profile,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entry')
+
+    objects = LeaderboardEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'leaderboard entries'
+        ordering = ['rank']
+
+    def __str__(self):
+        return '{}: {}'.format(self.rank, self.profile)
 
 
 def create_profile(sender, instance, created, **kwargs):
@@ -90,6 +242,58 @@ def create_profile(sender, instance, created, **kwargs):
         new_profile = Profile(user=instance)
         new_profile = assign_default_image_to_profile(new_profile)
         new_profile.save()
+        # An empty leaderboard is built by refresh_leaderboard.
+        if LeaderboardEntry.objects.exists():
+            LeaderboardEntry.objects.append(new_profile)
 
 
 post_save.connect(create_profile, sender=settings.AUTH_USER_MODEL)
+
+
+def follow_counters_handler(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    # Recount rather than increment: pk_set of a remove also holds the
+    # profiles that weren't followed.
+    if action == 'pre_clear':
+        # profile.followers rows go from the followed profile to the follower.
+        follows = Profile.followers.through.objects
+        if reverse:
+            follows = follows.filter(to_profile=instance)
+            profile_ids = follows.values_list('from_profile_id', flat=True)
+        else:
+            follows = follows.filter(from_profile=instance)
+            profile_ids = follows.values_list('to_profile_id', flat=True)
+        instance._cleared_profile_ids = set(profile_ids)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if action == 'post_clear':
+            profile_ids = instance._cleared_profile_ids
+        else:
+            profile_ids = set(pk_set)
+        profile_ids.add(instance.pk)
+        Profile.objects.filter(pk__in=profile_ids).refresh_follow_counters()
+
+
+m2m_changed.connect(follow_counters_handler, sender=Profile.followers.through)
+
+
+def profile_page_cache_handler(sender, instance, **kwargs):
+    invalidate_anonymous_pages()
+
+
+post_save.connect(profile_page_cache_handler, sender=Profile)
+post_delete.connect(profile_page_cache_handler, sender=Profile)
+
+
+def profile_thumbnails_handler(sender, instance, created, update_fields,
+                               **kwargs):
+    # save() always writes the image, only schedule them when it changed.
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    loaded_values = getattr(instance, '_loaded_values', {})
+    if created or loaded_values.get('image') != instance.image.name:
+        schedule_thumbnails(instance.image, Profile.THUMBNAILS)
+    loaded_values['image'] = instance.image.name
+    instance._loaded_values = loaded_values
+
+
+post_save.connect(profile_thumbnails_handler, sender=Profile)
@@ -1,7 +1,12 @@
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
 from ..models import Profile
+from diaries.models import Diary
 
 
 class profileModelTest(TestCase):
@@ -51,3 +56,112 @@ class profileModelTest(TestCase):
 
         expected_url = '/account/user1/'
         self.assertEqual(profile.get_absolute_url(), expected_url)
+
+
+class ProfileCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(1, 3):
+            get_user_model().objects.create_user(
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                password=f'user{i}pass'  # -_-
+            )
+        cls.profile1 = Profile.objects.get(id=1)
+        cls.profile2 = Profile.objects.get(id=2)
+
+    def create_diary(self, is_visible=Diary.ALL_CHOICE):
+        return Diary.objects.create(
+            title='A test diary',
+            content='test content',
+            is_visible=is_visible,
+            author=ProfileCountersTest.profile1)
+
+    def assertCounters(self, profile, written, visible, followers, followed):
+        profile.refresh_from_db()
+        self.assertEqual(
+            (profile.written_diaries_count,
+             profile.visible_written_diaries_count,
+             profile.followers_count,
+             profile.followed_profiles_count),
+            (written, visible, followers, followed))
+
+    def test_diaries_counters_follow_diaries_changes(self):
+        public_diary = self.create_diary()
+        draft_diary = self.create_diary(is_visible=Diary.NO_ONE_CHOICE)
+        self.assertCounters(ProfileCountersTest.profile1, 2, 1, 0, 0)
+
+        draft_diary = Diary.objects.get(pk=draft_diary.pk)
+        draft_diary.is_visible = Diary.ALL_CHOICE
+        draft_diary.save()
+        self.assertCounters(ProfileCountersTest.profile1, 2, 2, 0, 0)
+
+        public_diary.delete()
+        self.assertCounters(ProfileCountersTest.profile1, 1, 1, 0, 0)
+
+    def test_follow_counters_follow_follows(self):
+        ProfileCountersTest.profile1.followers.add(ProfileCountersTest.profile2)
+        self.assertCounters(ProfileCountersTest.profile1, 0, 0, 1, 0)
+        self.assertCounters(ProfileCountersTest.profile2, 0, 0, 0, 1)
+
+        ProfileCountersTest.profile2.followed_profiles.remove(
+            ProfileCountersTest.profile1)
+        self.assertCounters(ProfileCountersTest.profile1, 0, 0, 0, 0)
+        self.assertCounters(ProfileCountersTest.profile2, 0, 0, 0, 0)
+
+    def test_saving_a_loaded_profile_keeps_the_counters(self):
+        profile = Profile.objects.get(pk=ProfileCountersTest.profile1.pk)
+        self.create_diary()
+        profile.name = 'New name'
+        profile.save()
+        self.assertCounters(profile, 1, 1, 0, 0)
+        self.assertEqual(profile.name, 'New name')
+
+    def test_repair_command_recomputes_counters(self):
+        self.create_diary()
+        ProfileCountersTest.profile1.followers.add(ProfileCountersTest.profile2)
+        Profile.objects.update(
+            written_diaries_count=7,
+            visible_written_diaries_count=7,
+            followers_count=7,
+            followed_profiles_count=7)
+        call_command('repair_profile_counters', stdout=StringIO())
+        self.assertCounters(ProfileCountersTest.profile1, 1, 1, 1, 0)
+        self.assertCounters(ProfileCountersTest.profile2, 0, 0, 0, 1)
+
+    def test_drifted_counters_do_not_go_below_zero(self):
+        diary = Diary.objects.get(pk=self.create_diary().pk)
+        Profile.objects.update(
+            written_diaries_count=0, visible_written_diaries_count=0)
+        diary.is_visible = Diary.NO_ONE_CHOICE
+        diary.save()
+        diary.soft_delete()
+        self.assertCounters(ProfileCountersTest.profile1, 0, 0, 0, 0)
+
+    def test_refresh_skips_soft_deleted_diaries(self):
+        self.create_diary()
+        self.create_diary().soft_delete()
+        self.assertCounters(ProfileCountersTest.profile1, 1, 1, 0, 0)
+        Profile.objects.refresh_counters()
+        self.assertCounters(ProfileCountersTest.profile1, 1, 1, 0, 0)
+
+
+class ProfileThumbnailsTest(TestCase):
+    def test_thumbnails_are_scheduled_when_the_image_changes(self):
+        with mock.patch('accounts.models.schedule_thumbnails') as schedule:
+            profile = get_user_model().objects.create_user(
+                username='user1',
+                password='user1pass').profile
+            schedule.assert_called_once_with(
+                profile.image, Profile.THUMBNAILS)
+
+            schedule.reset_mock()
+            profile = Profile.objects.get(pk=profile.pk)
+            profile.name = 'New name'
+            profile.save()
+            schedule.assert_not_called()
+
+            profile.image = 'accounts/other.png'
+            profile.save()
+            schedule.assert_called_once_with(
+                profile.image, Profile.THUMBNAILS)
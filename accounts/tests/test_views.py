@@ -1,9 +1,14 @@
+from io import StringIO
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
 
-from ..models import Profile
+from ..models import LeaderboardEntry, Profile
+from diaries.models import Diary
 from ..views import ProfileTopListView
 
 
@@ -86,3 +91,140 @@ class ProfileTopListViewTest(TestCase):
 
         for profile in ProfileTopListViewTest.profiles[12:]:
             self.assertContains(response, profile.name)
+
+    def test_profiles_followed_by_user_are_marked(self):
+        user1_profile = ProfileTopListViewTest.profiles[1]
+        followed = ProfileTopListViewTest.profiles[2]
+        followed.followers.add(user1_profile)
+
+        self.client.login(username='user1', password='user1pass')
+        response = self.client.get(ProfileTopListViewTest.PROFILE_LIST_URL)
+        for profile in response.context['profiles']:
+            self.assertEqual(profile.is_followed, profile == followed)
+        self.assertContains(response, 'Unfollow', count=1)
+
+    def test_profiles_are_ordered_by_the_leaderboard(self):
+        popular_profile = ProfileTopListViewTest.profiles[15]
+        popular_profile.followers.add(ProfileTopListViewTest.profiles[0])
+        call_command('refresh_leaderboard', stdout=StringIO())
+
+        self.client.login(username='user1', password='user1pass')
+        response = self.client.get(ProfileTopListViewTest.PROFILE_LIST_URL)
+        self.assertEqual(response.context['profiles'][0], popular_profile)
+
+    def test_new_profiles_are_ranked_last(self):
+        call_command('refresh_leaderboard', stdout=StringIO())
+        self.client.login(username='user1', password='user1pass')
+        get_user_model().objects.create_user(
+            username='newcomer',
+            email='newcomer@example.com',
+            password='newcomerpass')
+
+        url = f'{ProfileTopListViewTest.PROFILE_LIST_URL}?page=2'
+        response = self.client.get(url)
+        profiles = list(response.context['profiles'])
+        self.assertEqual(len(profiles), 9)
+        self.assertEqual(profiles[-1].user.username, 'newcomer')
+
+
+    def test_deleted_profiles_leave_no_gaps(self):
+        call_command('refresh_leaderboard', stdout=StringIO())
+        last_profile = Profile.objects.order_by('pk').last()
+        ProfileTopListViewTest.profiles[2].user.delete()
+
+        self.client.login(username='user1', password='user1pass')
+        response = self.client.get(ProfileTopListViewTest.PROFILE_LIST_URL)
+        self.assertEqual(len(response.context['profiles']), 12)
+        url = f'{ProfileTopListViewTest.PROFILE_LIST_URL}?page=2'
+        response = self.client.get(url)
+        profiles = list(response.context['profiles'])
+        self.assertEqual(len(profiles), 7)
+        self.assertEqual(profiles[-1], last_profile)
+
+    def test_profiles_are_ranked_live_until_the_leaderboard_is_built(self):
+        popular_profile = ProfileTopListViewTest.profiles[15]
+        popular_profile.followers.add(ProfileTopListViewTest.profiles[0])
+
+        self.client.login(username='user1', password='user1pass')
+        response = self.client.get(ProfileTopListViewTest.PROFILE_LIST_URL)
+        self.assertEqual(response.context['profiles'][0], popular_profile)
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+
+class ProfileAutocompleteViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for username, name in (('omar', 'Omar R'), ('marie', 'Omaima'),
+                               ('sam', 'Samir')):
+            user = get_user_model().objects.create_user(
+                username=username,
+                password='pass')
+            user.profile.name = name
+            user.profile.save()
+        omar = Profile.objects.get(user__username='omar')
+        omar.followers.add(Profile.objects.get(user__username='sam'))
+
+    def setUp(self):
+        cache.clear()
+
+    def get_usernames(self, q):
+        response = self.client.get(
+            reverse('accounts:profile_autocomplete'), {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [r['username'] for r in response.json()['results']]
+
+    def test_matches_name_and_username_prefixes(self):
+        self.assertEqual(self.get_usernames('OM'), ['omar', 'marie'])
+        self.assertEqual(self.get_usernames('mar'), ['marie'])
+        self.assertEqual(self.get_usernames('ar'), [])
+        self.assertEqual(self.get_usernames(''), [])
+
+    def test_short_prefixes_are_cached(self):
+        self.get_usernames('sa')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_usernames('sa'), ['sam'])
+        with self.assertNumQueries(1):
+            self.get_usernames('samir')
+
+
+class ProfileDetailViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_model = get_user_model()
+        cls.user1 = user_model.objects.create_user(
+            username='user1',
+            password='user1pass')
+        cls.user2 = user_model.objects.create_user(
+            username='user2',
+            password='user2pass')
+        for i in range(12):
+            Diary.objects.create(
+                title=f'Diary N° {i + 1}',
+                content=f'Content of diary N° {i + 1}',
+                is_visible=(
+                    Diary.NO_ONE_CHOICE if i % 4 == 0 else Diary.ALL_CHOICE),
+                author=cls.user1.profile)
+        cls.PROFILE_URL = reverse('accounts:profile_detail', args=['user1'])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_diaries_are_paginated(self):
+        self.client.force_login(ProfileDetailViewTest.user1)
+        response = self.client.get(ProfileDetailViewTest.PROFILE_URL)
+        self.assertTrue(response.context['is_paginated'])
+        self.assertEqual(len(response.context['diaries']), 9)
+        self.assertEqual(response.context['paginator'].count, 12)
+
+        response = self.client.get(
+            ProfileDetailViewTest.PROFILE_URL + '?page=2')
+        titles = [diary.title for diary in response.context['diaries']]
+        self.assertEqual(titles, ['Diary N° 3', 'Diary N° 2', 'Diary N° 1'])
+
+    def test_other_profiles_only_see_public_diaries(self):
+        self.client.force_login(ProfileDetailViewTest.user2)
+        response = self.client.get(ProfileDetailViewTest.PROFILE_URL)
+        self.assertEqual(response.context['paginator'].count, 9)
+        self.assertFalse(response.context['is_paginated'])
+        for diary in response.context['diaries']:
+            self.assertEqual(diary.is_visible, Diary.ALL_CHOICE)
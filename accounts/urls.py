@@ -1,15 +1,20 @@
 from django.urls import path, include
 
+from core.page_cache import cache_anonymous_page
 from . import views
 
 app_name = 'accounts'
 
 urlpatterns = [
     path('profiles', views.ProfileTopListView.as_view(), name='profile_list'),
+    path(
+        'profiles/autocomplete',
+        views.ProfileAutocompleteView.as_view(),
+        name='profile_autocomplete'),
     path('<str:username>/', include([
          path(
              '',
-             views.ProfileDetailView.as_view(),
+             cache_anonymous_page(views.ProfileDetailView.as_view()),
              name='profile_detail'),
          path(
              'update',
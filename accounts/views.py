@@ -1,5 +1,5 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import Http404
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.views.generic import (
     View,
@@ -9,7 +9,13 @@ from django.views.generic import (
 )
 from notifications.signals import notify
 
+from core.pagination import WindowedPaginator
+from diaries.forms import FeelingFilterForm
+from diaries.models import Diary
+
+from .autocomplete import get_profile_suggestions
 from .forms import ProfileForm
+from .leaderboard import Leaderboard
 from .models import Profile
 from .utils import assign_default_image_to_profile
 
@@ -18,6 +24,7 @@ class ProfileListBaseView(LoginRequiredMixin, ListView):
     template_name = 'accounts/profile_list.html'
     model = Profile
     paginate_by = 12
+    paginator_class = WindowedPaginator
     context_object_name = 'profiles'
 
 
@@ -26,7 +33,8 @@ class ProfileTopListView(ProfileListBaseView):
     extra_context = {'title': 'People worth following'}
 
     def get_queryset(self):
-        return self.model.objects.top()
+        qs = self.model.objects.with_viewer_state(self.request.user)
+        return Leaderboard(qs)
 
 
 class ProfileFollowersListView(ProfileListBaseView):
@@ -41,7 +49,8 @@ class ProfileFollowersListView(ProfileListBaseView):
         username = self.kwargs.get('username')
         profile = get_object_or_404(self.model, user__username=username)
 
-        followers = profile.followers.all().with_diaries_followers_count()
+        followers = profile.followers.all()
+        followers = followers.with_viewer_state(self.request.user)
         return followers
 
 
@@ -58,7 +67,7 @@ class ProfileFollowingListView(ProfileListBaseView):
         profile = get_object_or_404(self.model, user__username=username)
 
         followed_profiles = profile.followed_profiles.all()\
-            .with_diaries_followers_count()
+            .with_viewer_state(self.request.user)
 
         return followed_profiles
 
@@ -88,18 +97,33 @@ class ProfileDetailView(DetailView):
     template_name = 'accounts/profile_detail.html'
     slug_field = 'user__username'
     slug_url_kwarg = 'username'
+    paginate_by = 9
 
     def get_object(self):
-        obj = Profile.objects.with_diaries_followers_count().filter(
+        obj = Profile.objects.filter(
             user__username=self.kwargs[self.slug_url_kwarg]
-        )
+        ).with_viewer_state(self.request.user)
         if not obj:
             raise Http404
         return obj.first()
 
     def get_context_data(self, *args, **kwargs):
         cx = super().get_context_data(*args, **kwargs)
-        cx['diaries'] = self.object.written_diaries.active(self.request.user)
+        feeling_form = FeelingFilterForm(self.request.GET)
+        feeling = feeling_form.get_feeling()
+        diaries = Diary.objects.written_by(self.object, self.request.user)
+        diaries = diaries.with_feeling(feeling).for_cards()
+        diaries = diaries.with_viewer_state(self.request.user)
+        paginator = WindowedPaginator(diaries, self.paginate_by)
+        page = paginator.get_page(self.request.GET.get('page'))
+        cx.update({
+            'diaries': page.object_list,
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'feeling': feeling,
+            'feeling_filters': feeling_form.get_filters(),
+        })
         return cx
 
 
@@ -113,7 +137,7 @@ class ProfileFollowView(LoginRequiredMixin, View):
         current_profile = request.user.profile
 
         if profile != current_profile:
-            if current_profile in profile.followers.all():
+            if profile.followers.filter(pk=current_profile.pk).exists():
                 profile.followers.remove(current_profile)
             else:
                 profile.followers.add(current_profile)
@@ -122,6 +146,11 @@ class ProfileFollowView(LoginRequiredMixin, View):
                     recipient=profile.user,
                     verb='Started following you'
                 )
-            profile.save()
             return redirect(profile)
         return redirect(profile)
+
+
+class ProfileAutocompleteView(View):
+    def get(self, request):
+        suggestions = get_profile_suggestions(request.GET.get('q', ''))
+        return JsonResponse({'results': suggestions})
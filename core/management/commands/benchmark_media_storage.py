@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+from time import perf_counter
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.storage import CachedRemoteStorageDouble, RemoteStorageDouble
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the media urls and reads served by a remote storage '
+        'stand-in (each API call taking --latency seconds) with and without '
+        'the url cache and the local mirror, on a skewed popularity. Runs '
+        'in temporary directories.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=200)
+        parser.add_argument('--size', type=int, default=50 * 1024,
+                            help='Size of the files in bytes.')
+        parser.add_argument('--requests', type=int, default=1000,
+                            help='Number of urls resolved, one file in ten '
+                                 'is also read.')
+        parser.add_argument('--latency', type=float, default=0.01,
+                            help='Duration of an API call in seconds.')
+        parser.add_argument('--mirror-size', type=int, default=None,
+                            help='Size of the mirror in bytes, a quarter of '
+                                 'the files by default.')
+
+    def handle(self, *args, **options):
+        names = ['benchmark/{}.jpg'.format(i) for i in range(options['files'])]
+        # The first files are requested far more often than the last ones.
+        weights = [1 / (i + 1) for i in range(len(names))]
+        requests = random.Random(0).choices(
+            names, weights, k=options['requests'])
+        mirror_size = options['mirror_size']
+        if mirror_size is None:
+            mirror_size = options['size'] * options['files'] // 4
+
+        for storage_class in (RemoteStorageDouble, CachedRemoteStorageDouble):
+            with tempfile.TemporaryDirectory() as location, \
+                    tempfile.TemporaryDirectory() as mirror_root, \
+                    override_settings(
+                        MEDIA_MIRROR_ROOT=mirror_root,
+                        MEDIA_MIRROR_MAX_SIZE=mirror_size):
+                storage = storage_class(location, '/media/')
+                content = os.urandom(options['size'])
+                for name in names:
+                    storage._save(name, ContentFile(content))
+                storage.latency = options['latency']
+                storage.calls = dict.fromkeys(storage.calls, 0)
+
+                start = perf_counter()
+                for i, name in enumerate(requests):
+                    storage.url(name)
+                    if i % 10 == 0:
+                        with storage.open(name) as media_file:
+                            media_file.read()
+                duration = perf_counter() - start
+
+                storage.latency = 0
+                for name in names:
+                    storage.delete(name)
+
+            reads = len(range(0, len(requests), 10))
+            self.stdout.write(
+                '{:<26} {:>9.1f} ms   {:>5} url calls for {} urls   {:>4} '
+                'downloads for {} reads'.format(
+                    storage_class.__name__, duration * 1000,
+                    storage.calls['url'], len(requests),
+                    storage.calls['open'], reads))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.utils import COUNTED_CACHES, get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show the hits and misses of the application caches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='Only show these caches ({}).'.format(
+                ', '.join(COUNTED_CACHES)))
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after showing them.')
+
+    def handle(self, *args, **options):
+        for name in options['names'] or COUNTED_CACHES:
+            hits, misses = get_cache_stats(name)
+            total = hits + misses
+            ratio = hits / total * 100 if total else 0
+            self.stdout.write(
+                '{:<16} hits {:>10}   misses {:>10}   hit ratio {:>5.1f}%'
+                .format(name, hits, misses, ratio))
+            if options['reset']:
+                reset_cache_stats(name)
@@ -0,0 +1,54 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import Profile
+from core.thumbnails import create_executor, generate_thumbnails
+from diaries.models import Diary
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate the thumbnails the templates show of the existing diaries '
+        'and profiles images, in parallel. Thumbnails that already exist '
+        'are only looked up.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of worker processes.')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of images read per query.')
+
+    def get_chunks(self, model, chunk_size):
+        """Yields the names of the images of model by chunks"""
+        qs = model.objects.exclude(image='').exclude(image=None)
+        qs = qs.order_by('pk').values_list('pk', 'image')
+        last_pk = 0
+        while True:
+            chunk = list(qs.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            yield [name for pk, name in chunk]
+            last_pk = chunk[-1][0]
+
+    def handle(self, *args, **options):
+        images = generated = 0
+        with create_executor(options['workers']) as executor:
+            for model in (Diary, Profile):
+                for names in self.get_chunks(model, options['chunk_size']):
+                    results = executor.map(
+                        generate_thumbnails,
+                        names,
+                        [model.THUMBNAILS] * len(names))
+                    generated += sum(results)
+                    images += len(names)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Generated {} thumbnails of {} images.'.format(
+                generated, images)))
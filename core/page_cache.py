@@ -0,0 +1,102 @@
+"""Full page cache of the public pages served to anonymous visitors, whose
+   responses are the same for everyone. Requests carrying a session or a
+   messages cookie always run the view. Every cached page is dropped at once
+   when a diary, a comment or a profile changes: the pages are keyed on a
+   version that invalidate_anonymous_pages() replaces.
+   The bodies are stored gzipped along with the plain ones, so that hits are
+   served compressed without compressing them on every request (misses are
+   left to the view).
+"""
+import gzip
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .utils import count_cache_access
+
+PAGES_VERSION_KEY = 'anonymous-pages:version'
+PAGE_CACHE_KEY = 'anonymous-pages:{}:{}'
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def invalidate_anonymous_pages():
+    cache.set(PAGES_VERSION_KEY, time.time(), None)
+
+
+def get_page_cache_key(request):
+    version = cache.get_or_set(PAGES_VERSION_KEY, time.time, None)
+    url = '{}{}'.format(request.get_host(), request.get_full_path())
+    return PAGE_CACHE_KEY.format(
+        version, hashlib.md5(url.encode('utf-8')).hexdigest())
+
+
+def is_anonymous_request(request):
+    # Only the session can authenticate a visitor, so there's no need to
+    # load it to know whether the visitor is anonymous.
+    return (
+        request.method in ('GET', 'HEAD') and
+        settings.SESSION_COOKIE_NAME not in request.COOKIES and
+        CookieStorage.cookie_name not in request.COOKIES)
+
+
+def get_page(response):
+    """Returns what's cached of response, or None if it can't be shared"""
+    if response.status_code != 200 or response.streaming:
+        return None
+    if response.cookies or response.has_header('Content-Encoding'):
+        return None
+    content = response.content
+    return {
+        'content_type': response['Content-Type'],
+        'content': content,
+        'gzip_content': gzip.compress(content),
+    }
+
+
+def get_page_response(request, page):
+    if ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response = HttpResponse(
+            page['gzip_content'], content_type=page['content_type'])
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(
+            page['content'], content_type=page['content_type'])
+    response['Content-Length'] = len(response.content)
+    response['Vary'] = 'Cookie, Accept-Encoding'
+    return response
+
+
+def cache_anonymous_page(view):
+    """Serves the responses of view to anonymous visitors from the cache for
+       ANONYMOUS_PAGE_CACHE_TIMEOUT seconds
+    """
+    @wraps(view)
+    def wrapped_view(request, *args, **kwargs):
+        timeout = settings.ANONYMOUS_PAGE_CACHE_TIMEOUT
+        if not timeout or not is_anonymous_request(request):
+            return view(request, *args, **kwargs)
+
+        key = get_page_cache_key(request)
+        page = cache.get(key)
+        if page is not None:
+            count_cache_access('anonymous_page', hits=1)
+            return get_page_response(request, page)
+
+        count_cache_access('anonymous_page', misses=1)
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        page = get_page(response)
+        if page is not None:
+            cache.set(key, page, timeout)
+            patch_vary_headers(response, ('Cookie', 'Accept-Encoding'))
+        return response
+    return wrapped_view
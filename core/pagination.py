@@ -0,0 +1,60 @@
+"""Paginator of the HTML list views. Counting a large table (or the rows of
+   a feed) on every page view is as expensive as reading it, so querysets
+   counts are cached for PAGINATOR_COUNT_CACHE_TIMEOUT seconds. Pages only
+   link to a fixed window of pages around them, a stale count is only
+   visible on the last pages.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.core.exceptions import EmptyResultSet
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+COUNT_CACHE_KEY = 'pagination:count:{}'
+
+
+def get_queryset_count(queryset):
+    using = queryset.db
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    query = '{}:{}:{!r}'.format(using, sql, params)
+    key = COUNT_CACHE_KEY.format(
+        hashlib.md5(query.encode('utf-8')).hexdigest())
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATOR_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class WindowedPage(Page):
+
+    @property
+    def page_window(self):
+        """Returns the numbers of the pages linked from this one, it and
+           up to window pages on each side.
+        """
+        window = self.paginator.window
+        num_pages = self.paginator.num_pages
+        first = max(1, min(self.number - window, num_pages - 2 * window))
+        last = min(num_pages, first + 2 * window)
+        return range(first, last + 1)
+
+
+class WindowedPaginator(Paginator):
+    # Number of pages linked on each side of the current page.
+    window = 2
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            return get_queryset_count(self.object_list)
+        return super().count
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
@@ -0,0 +1,223 @@
+"""Read-through cache in front of a remote file storage (Dropbox in
+   production), where resolving the url of a file, checking that it exists
+   and reading it are API calls:
+   - the urls are cached for MEDIA_URL_CACHE_TIMEOUT seconds, which plus
+     the timeouts of the cached fragments and pages embedding them is less
+     than the lifetime of the Dropbox temporary links they are,
+   - the files known to exist are cached until they're deleted (only the
+     positive answers: saves rely on exists() to pick unused names),
+   - the files read or saved, but those larger than MEDIA_MIRROR_MAX_SIZE
+     bytes, are mirrored in MEDIA_MIRROR_ROOT, the least recently used
+     ones being removed once the mirror is larger than that. The mirror is
+     shared by the processes of a host, the modification times of its
+     files are their last use.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from shutil import copyfileobj
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from storages.backends.dropbox import DropBoxStorage
+
+from .utils import count_cache_access
+
+URL_CACHE_KEY = 'storage:url:{}'
+EXISTS_CACHE_KEY = 'storage:exists:{}'
+
+
+def get_name_hash(name):
+    return hashlib.md5(name.encode('utf-8')).hexdigest()
+
+
+class CachedStorageMixin:
+
+    def get_mirror_path(self, name):
+        extension = os.path.splitext(name)[1]
+        return os.path.join(
+            settings.MEDIA_MIRROR_ROOT, get_name_hash(name) + extension)
+
+    def url(self, name):
+        key = URL_CACHE_KEY.format(get_name_hash(name))
+        url = cache.get(key)
+        if url is not None:
+            count_cache_access('media_url', hits=1)
+            return url
+        count_cache_access('media_url', misses=1)
+        url = super().url(name)
+        cache.set(key, url, settings.MEDIA_URL_CACHE_TIMEOUT)
+        return url
+
+    def exists(self, name):
+        key = EXISTS_CACHE_KEY.format(get_name_hash(name))
+        if cache.get(key):
+            return True
+        exists = super().exists(name)
+        if exists:
+            cache.set(key, True, None)
+        return exists
+
+    def fits_mirror(self, content):
+        return content.size <= settings.MEDIA_MIRROR_MAX_SIZE
+
+    def _open(self, name, mode='rb'):
+        if not settings.MEDIA_MIRROR_MAX_SIZE or 'w' in mode:
+            return super()._open(name, mode)
+        path = self.get_mirror_path(name)
+        try:
+            mirrored = open(path, mode)
+        except FileNotFoundError:
+            count_cache_access('media_mirror', misses=1)
+        else:
+            count_cache_access('media_mirror', hits=1)
+            # Its last use, for the eviction (unless it was just evicted,
+            # the opened file can still be read).
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            return File(mirrored, name)
+        remote_file = super()._open(name, mode)
+        try:
+            if self.fits_mirror(remote_file):
+                self.mirror(name, remote_file)
+                mirrored = open(path, mode)
+            else:
+                mirrored = None
+        except FileNotFoundError:
+            # Evicted by another process since it was copied.
+            mirrored = None
+        except BaseException:
+            remote_file.close()
+            raise
+        if mirrored is None:
+            remote_file.seek(0)
+            return remote_file
+        remote_file.close()
+        return File(mirrored, name)
+
+    def _save(self, name, content):
+        mirrored = bool(
+            settings.MEDIA_MIRROR_MAX_SIZE and self.fits_mirror(content))
+        if mirrored:
+            # The thumbnails are generated from it right after.
+            content.open()
+            self.mirror(name, content)
+            content.seek(0)
+        saved_name = super()._save(name, content)
+        if mirrored and saved_name != name:
+            try:
+                os.replace(
+                    self.get_mirror_path(name),
+                    self.get_mirror_path(saved_name))
+            except FileNotFoundError:
+                # Evicted by another process since it was copied.
+                pass
+        name = saved_name
+        cache.set(EXISTS_CACHE_KEY.format(get_name_hash(name)), True, None)
+        return name
+
+    def delete(self, name):
+        super().delete(name)
+        name_hash = get_name_hash(name)
+        cache.delete_many([
+            URL_CACHE_KEY.format(name_hash),
+            EXISTS_CACHE_KEY.format(name_hash)])
+        try:
+            os.remove(self.get_mirror_path(name))
+        except FileNotFoundError:
+            pass
+
+    def mirror(self, name, content):
+        """Copies content to the mirror, atomically as the other processes
+           may read it, then evicts the least recently used files
+        """
+        os.makedirs(settings.MEDIA_MIRROR_ROOT, exist_ok=True)
+        path = self.get_mirror_path(name)
+        fd, temporary_path = tempfile.mkstemp(dir=settings.MEDIA_MIRROR_ROOT)
+        try:
+            with os.fdopen(fd, 'wb') as mirrored:
+                copyfileobj(content, mirrored)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Removes the least recently used files of the mirror until it's
+           no larger than MEDIA_MIRROR_MAX_SIZE, but keep
+        """
+        files = []
+        total_size = 0
+        for entry in os.scandir(settings.MEDIA_MIRROR_ROOT):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            total_size += stat.st_size
+            if entry.path != keep:
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        for mtime, size, path in files:
+            if total_size <= settings.MEDIA_MIRROR_MAX_SIZE:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+@deconstructible
+class CachedDropBoxStorage(CachedStorageMixin, DropBoxStorage):
+    pass
+
+
+@deconstructible
+class RemoteStorageDouble(FileSystemStorage):
+    """Stands for the Dropbox storage in the tests and the benchmarks: a
+       local storage counting the calls that would reach the API, each one
+       taking latency seconds, whose urls are temporary links.
+    """
+    REMOTE_CALLS = ('url', 'exists', 'open', 'save', 'delete')
+
+    def __init__(self, location=None, base_url=None, latency=0):
+        super().__init__(location, base_url)
+        self.latency = latency
+        self.calls = dict.fromkeys(self.REMOTE_CALLS, 0)
+
+    def call(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def url(self, name):
+        self.call('url')
+        return '{}?token={}'.format(super().url(name), os.urandom(8).hex())
+
+    def exists(self, name):
+        self.call('exists')
+        return super().exists(name)
+
+    def _open(self, name, mode='rb'):
+        self.call('open')
+        return super()._open(name, mode)
+
+    def _save(self, name, content):
+        self.call('save')
+        return super()._save(name, content)
+
+    def delete(self, name):
+        self.call('delete')
+        super().delete(name)
+
+
+@deconstructible
+class CachedRemoteStorageDouble(CachedStorageMixin, RemoteStorageDouble):
+    pass
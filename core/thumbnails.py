@@ -0,0 +1,67 @@
+"""Thumbnails of the uploaded images, generated as soon as an image is saved
+   by a pool of worker processes, so that the first page showing it doesn't
+   download the original from the storage, resize it and upload the
+   thumbnail while the visitor waits. sorl-thumbnail records them in its key
+   value store, where the {% thumbnail %} tags find them.
+   The workers are spawned rather than forked: they don't inherit the
+   database connections nor the threads of the web process.
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def create_executor(max_workers):
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = create_executor(settings.THUMBNAIL_WORKERS)
+    return _executor
+
+
+def generate_thumbnails(name, thumbnails):
+    """Generates the thumbnails, (geometry, options) pairs, of the image
+       stored under name and returns how many were generated (or already
+       existed). Those that fail are left to the templates.
+    """
+    generated = 0
+    for geometry, options in thumbnails:
+        try:
+            get_thumbnail(name, geometry, **options)
+        except Exception:
+            logger.exception(
+                'Could not generate the %s thumbnail of %s', geometry, name)
+        else:
+            generated += 1
+    return generated
+
+
+def schedule_thumbnails(image, thumbnails):
+    """Generates the thumbnails of image once the current transaction is
+       committed, in the worker pool, or in the calling process when
+       THUMBNAIL_WORKERS is 0
+    """
+    if not image:
+        return
+    name = image.name
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(
+                generate_thumbnails, name, thumbnails))
+    else:
+        transaction.on_commit(lambda: generate_thumbnails(name, thumbnails))
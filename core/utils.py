@@ -2,6 +2,15 @@ from random import choice
 import string
 from uuid import uuid4
 import os.path
+from time import perf_counter
+
+from django.core.cache import cache
+
+CACHE_STATS_KEY = 'cache-stats:{}:{}'
+# Caches whose hits and misses are counted, see the cache_stats command.
+COUNTED_CACHES = (
+    'diary_detail', 'diary_card', 'anonymous_page', 'media_url',
+    'media_mirror')
 
 
 def generate_random_string(
@@ -22,3 +31,46 @@ def get_ckeditor_image_upload_path(filename):
     new_file_name = f'{uuid4()}.{file_extention}'
     file_path = os.path.join('ckeditor', new_file_name)
     return file_path
+
+
+def measure(func, repeat=5):
+    '''Call func repeat times and return the (best, average) durations in
+       milliseconds.
+    '''
+    durations = []
+    for i in range(repeat):
+        start = perf_counter()
+        func()
+        durations.append((perf_counter() - start) * 1000)
+    return min(durations), sum(durations) / len(durations)
+
+
+def count_cache_access(name, hits=0, misses=0):
+    '''Adds to the hits and misses of the name cache. The counters live in
+       the cache so that all the workers count together.
+    '''
+    for counter, count in (('hits', hits), ('misses', misses)):
+        if not count:
+            continue
+        key = CACHE_STATS_KEY.format(name, counter)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            # The counter doesn't exist (yet, or anymore).
+            cache.set(key, count, None)
+
+
+def get_cache_stats(name):
+    '''Returns the (hits, misses) counted for the name cache'''
+    counters = cache.get_many([
+        CACHE_STATS_KEY.format(name, 'hits'),
+        CACHE_STATS_KEY.format(name, 'misses')])
+    return (
+        counters.get(CACHE_STATS_KEY.format(name, 'hits'), 0),
+        counters.get(CACHE_STATS_KEY.format(name, 'misses'), 0))
+
+
+def reset_cache_stats(name):
+    cache.delete_many([
+        CACHE_STATS_KEY.format(name, 'hits'),
+        CACHE_STATS_KEY.format(name, 'misses')])
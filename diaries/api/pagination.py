@@ -0,0 +1,134 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardPagination(PageNumberPagination):
+    page_size = 9
+
+
+class KeysetCursorPagination(BasePagination):
+    """Paginates with an opaque cursor holding the ordering values of the
+       last (or first) item of the current page, so that every page is an
+       index range scan and the table is never counted.
+
+       The ordering is a tuple of fields, the last one being unique (the id),
+       taken from view.get_cursor_ordering() if the view defines it.
+    """
+    page_size = 9
+    cursor_query_param = 'cursor'
+    ordering = ('-created_on', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, view):
+        if hasattr(view, 'get_cursor_ordering'):
+            return view.get_cursor_ordering()
+        return self.ordering
+
+    def encode_cursor(self, values, reverse):
+        # isoformat() keeps the microseconds that DjangoJSONEncoder drops.
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values]
+        data = json.dumps({'v': values, 'r': reverse})
+        return urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            values = [self.decode_value(value) for value in data['v']]
+            if len(values) != len(self.ordering_fields):
+                raise ValueError
+            return values, bool(data['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def decode_value(self, value):
+        if isinstance(value, str):
+            return parse_datetime(value) or value
+        return value
+
+    def get_position(self, obj):
+        return [getattr(obj, field) for field in self.ordering_fields]
+
+    def get_position_filter(self, values, reverse):
+        """Returns the filter of the items after values in the ordering
+           (before them if reverse), i.e. a lexicographic tuple comparison.
+        """
+        position_filter = Q()
+        for i, field in enumerate(self.ordering_fields):
+            descending = self.ordering[i].startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            branch = Q(**{'{}__{}'.format(field, lookup): values[i]})
+            for previous_field, value in zip(self.ordering_fields, values[:i]):
+                branch &= Q(**{previous_field: value})
+            position_filter |= branch
+        return position_filter
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(view)
+        self.ordering_fields = [field.lstrip('-') for field in self.ordering]
+
+        cursor = self.decode_cursor(request)
+        reverse = False
+        if cursor is not None:
+            values, reverse = cursor
+            queryset = queryset.filter(
+                self.get_position_filter(values, reverse))
+
+        if reverse:
+            ordering = [
+                field[1:] if field.startswith('-') else '-' + field
+                for field in self.ordering]
+        else:
+            ordering = self.ordering
+        queryset = queryset.order_by(*ordering)
+
+        # Fetch one more item to know whether there's a page after this one.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self.get_position(self.page[-1]), False)
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        cursor = self.encode_cursor(self.get_position(self.page[0]), True)
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
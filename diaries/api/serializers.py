@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
-from ..models import Diary, Comment
+from ..models import Diary, DiaryRevision, Comment
+from ..sanitizer import sanitize_rich_text
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -49,3 +51,31 @@ class DiaryDetailSerializer(serializers.ModelSerializer):
                   'comments']
         read_only_fields = ['slug', 'created_on', 'likes_count',
                             'comments_count']
+
+    def validate_content(self, value):
+        # The stored content is already sanitized.
+        if self.instance is not None and value == self.instance.content:
+            return value
+        return sanitize_rich_text(value)
+
+
+class DiaryRevisionSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DiaryRevision
+        fields = ['url', 'number', 'title', 'is_snapshot', 'created_on']
+
+    def get_url(self, revision):
+        return reverse(
+            'diaries_api:diary_revision_detail',
+            args=[revision.diary.slug, revision.number],
+            request=self.context.get('request'))
+
+
+class DiaryRevisionDetailSerializer(DiaryRevisionSerializer):
+    # Rebuilt by DiaryRevision.objects.get_version().
+    content = serializers.CharField(read_only=True)
+
+    class Meta(DiaryRevisionSerializer.Meta):
+        fields = DiaryRevisionSerializer.Meta.fields + ['content']
@@ -6,8 +6,30 @@ from .import views
 app_name = 'diaries_api'
 urlpatterns = [
     path('', views.DiaryListCreateAPIView.as_view(), name='diary_list'),
+    path(
+        'feelings/counts',
+        views.DiaryFeelingCountAPIView.as_view(),
+        name='feeling_count_list'),
+    # Three segments ending with diaries: no url of a diary slugged
+    # profiles matches it.
+    path(
+        'profiles/<str:username>/diaries',
+        views.ProfileDiaryListAPIView.as_view(),
+        name='profile_diary_list'),
     path(
         '<str:diary_slug>',
         views.DiaryRetrieveUpdateDestroyAPIView.as_view(),
         name='diary_detail'),
+    path(
+        '<str:diary_slug>/revisions',
+        views.DiaryRevisionListAPIView.as_view(),
+        name='diary_revision_list'),
+    path(
+        '<str:diary_slug>/revisions/<int:number>',
+        views.DiaryRevisionRetrieveAPIView.as_view(),
+        name='diary_revision_detail'),
+    path(
+        '<str:diary_slug>/revisions/<int:number>/restore',
+        views.DiaryRevisionRestoreAPIView.as_view(),
+        name='diary_revision_restore'),
 ]
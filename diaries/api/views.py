@@ -1,13 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.http import Http404
 from rest_framework import generics
-from rest_framework.pagination import PageNumberPagination
 from rest_framework import permissions
+from rest_framework import status
+from rest_framework import views
+from rest_framework.response import Response
 
-from .serializers import DiaryListSerializer, DiaryDetailSerializer
-from ..models import Diary
-
-
-class StandardPagination(PageNumberPagination):
-    page_size = 9
+from .pagination import StandardPagination, KeysetCursorPagination
+from .serializers import (
+    DiaryListSerializer, DiaryDetailSerializer, DiaryRevisionSerializer,
+    DiaryRevisionDetailSerializer)
+from ..discover import DiscoverFeed, get_discover_diary_ids
+from ..forms import FeelingFilterForm
+from ..models import Diary, DiaryFeelingCount, DiaryRevision
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -24,6 +29,30 @@ class DiaryListCreateAPIView(generics.ListCreateAPIView):
     model = Diary
     page_size = 9
     pagination_class = StandardPagination
+    cursor_pagination_class = KeysetCursorPagination
+
+    @property
+    def paginator(self):
+        """?pagination=cursor selects the keyset pagination, that doesn't
+           count the diaries nor scan the skipped ones. The discover feed is
+           always paginated by page number as it is a list of ids in memory.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if (params.get('pagination') == 'cursor' and
+                    params.get('order_by') != 'discover'):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_cursor_ordering(self):
+        order_by = self.request.query_params.get('order_by', None)
+        if order_by == 'popularity':
+            return ('-popularity_score', '-id')
+        elif order_by != 'discover' and self.request.user.is_authenticated:
+            return ('-timeline_created_on', '-id')
+        return ('-created_on', '-id')
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user.profile)
@@ -35,25 +64,44 @@ class DiaryListCreateAPIView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         order_by = self.request.query_params.get('order_by', None)
+        feeling = FeelingFilterForm(self.request.query_params).get_feeling()
         if order_by == 'popularity':
             qs = self.model.objects.popular()
         elif order_by == 'discover':
-            qs = self.model.objects.all()
-            qs = qs.active(self.request.user)
+            diary_ids = get_discover_diary_ids(self.request.user, feeling)
+            return DiscoverFeed(diary_ids, self.model.objects.for_cards())
         else:
             if self.request.user.is_authenticated:
-                followed_profiles_diaries = Diary.objects\
-                    .by_followed_profiles(self.request.user.profile).order_by()
+                qs = self.model.objects.timeline(self.request.user.profile)
+            else:
+                qs = self.model.objects.active(self.request.user)
+        return qs.with_feeling(feeling).for_cards()
 
-                current_profile_diaries = Diary.objects.filter(
-                    author=self.request.user.profile
-                ).order_by()
 
-                qs = followed_profiles_diaries.union(current_profile_diaries)
-                qs = qs.order_by('-created_on')
-            else:
-                qs = self.model.objects.all()
-        return qs
+class ProfileDiaryListAPIView(generics.ListAPIView):
+    """The diaries of a profile by pages of keyset pagination, the next
+       pages of the profile page.
+    """
+    serializer_class = DiaryListSerializer
+    pagination_class = KeysetCursorPagination
+
+    def get_queryset(self):
+        user = generics.get_object_or_404(
+            get_user_model().objects.select_related('profile'),
+            username=self.kwargs['username'])
+        qs = Diary.objects.written_by(user.profile, self.request.user)
+        feeling = FeelingFilterForm(self.request.query_params).get_feeling()
+        return qs.with_feeling(feeling).for_cards()
+
+
+class DiaryFeelingCountAPIView(views.APIView):
+    """The number of public diaries of every feeling"""
+
+    def get(self, request):
+        counts = DiaryFeelingCount.objects.get_counts()
+        return Response([
+            {'feeling': feeling, 'name': name, 'count': counts[feeling]}
+            for feeling, name in Diary.FEELINGS_CHOICES])
 
 
 class DiaryRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -65,3 +113,60 @@ class DiaryRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         qs = Diary.objects.active(self.request.user)
         return qs
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
+
+class DiaryRevisionMixin:
+    """The revisions of a diary are only available to its author"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_diary(self):
+        return generics.get_object_or_404(
+            Diary,
+            slug=self.kwargs['diary_slug'],
+            author=self.request.user.profile)
+
+
+class DiaryRevisionListAPIView(DiaryRevisionMixin, generics.ListAPIView):
+    serializer_class = DiaryRevisionSerializer
+    pagination_class = StandardPagination
+
+    def get_queryset(self):
+        qs = self.get_diary().revisions.select_related('diary')
+        return qs.defer('data', 'diary__content')
+
+
+class DiaryRevisionRetrieveAPIView(DiaryRevisionMixin,
+                                   generics.RetrieveAPIView):
+    serializer_class = DiaryRevisionDetailSerializer
+
+    def get_object(self):
+        try:
+            revision, content = DiaryRevision.objects.get_version(
+                self.get_diary(), self.kwargs['number'])
+        except DiaryRevision.DoesNotExist:
+            raise Http404
+        revision.content = content
+        return revision
+
+
+class DiaryRevisionRestoreAPIView(DiaryRevisionMixin, generics.GenericAPIView):
+    serializer_class = DiaryRevisionSerializer
+
+    def post(self, request, *args, **kwargs):
+        """Saves the revision back as the current version of the diary and
+           returns the revision it created, or the latest revision if the
+           diary is already at that version
+        """
+        diary = self.get_diary()
+        try:
+            revision = diary.restore_revision(self.kwargs['number'])
+        except DiaryRevision.DoesNotExist:
+            raise Http404
+        if revision is None:
+            serializer = self.get_serializer(diary.revisions.first())
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = self.get_serializer(revision)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,114 @@
+"""Helpers used by the benchmark management commands to fill a scratch
+   database. They bypass the save hooks, so never point them at a database
+   holding real data.
+"""
+import random
+
+from django.contrib.auth import get_user_model
+
+from accounts.models import Profile
+from .models import Diary, DiaryFeelingCount
+
+USERNAME_PREFIX = 'benchmark-'
+
+RICH_TEXT_WORDS = (
+    'morning coffee rain walk school exam friend family travel beach city '
+    'night dream book movie music song garden winter summer work office'
+).split()
+
+
+def rich_text(size):
+    """Returns about size characters of ckeditor like html"""
+    paragraphs = []
+    length = 0
+    while length < size:
+        words = [random.choice(RICH_TEXT_WORDS) for _ in range(40)]
+        words[3] = '<b>{}</b>'.format(words[3])
+        words[10] = '<a href="https://example.com/{0}">{0}</a>'.format(
+            words[10])
+        words[20] = '<i>{}</i>&nbsp;'.format(words[20])
+        paragraph = '<p style="text-align: justify;">{}</p>\n'.format(
+            ' '.join(words))
+        paragraphs.append(paragraph)
+        length += len(paragraph)
+    return ''.join(paragraphs)
+
+
+def benchmark_profiles():
+    return Profile.objects.filter(user__username__startswith=USERNAME_PREFIX)
+
+
+def seed(profiles_count, diaries_count, follows_per_profile, content='',
+         batch_size=5000, stdout=None):
+    """Bulk create benchmark users, their profiles, follow relations and
+       diaries (90% public, 10% drafts). content is either the content of
+       every diary or a function called with the diary number that returns
+       it. Returns the profiles ids.
+    """
+    def log(msg):
+        if stdout is not None:
+            stdout.write(msg)
+
+    User = get_user_model()
+    User.objects.bulk_create(
+        (User(username='{}{}'.format(USERNAME_PREFIX, i), password='!')
+         for i in range(profiles_count)),
+        batch_size=batch_size)
+    users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+    Profile.objects.bulk_create(
+        (Profile(user_id=user_id, name=username)
+         for user_id, username in users.values_list('id', 'username')),
+        batch_size=batch_size)
+    profile_ids = list(benchmark_profiles().values_list('id', flat=True))
+    log('Created {} profiles.'.format(len(profile_ids)))
+
+    Follow = Profile.followers.through
+    follows = []
+    for profile_id in profile_ids:
+        followed = random.sample(
+            profile_ids, min(follows_per_profile, len(profile_ids)))
+        for followed_id in followed:
+            if followed_id != profile_id:
+                follows.append(Follow(
+                    from_profile_id=followed_id,
+                    to_profile_id=profile_id))
+        if len(follows) >= batch_size:
+            Follow.objects.bulk_create(follows)
+            follows = []
+    Follow.objects.bulk_create(follows)
+    log('Created follow relations.')
+
+    diaries = []
+    for i in range(diaries_count):
+        if random.random() < 0.9:
+            is_visible = Diary.ALL_CHOICE
+        else:
+            is_visible = Diary.NO_ONE_CHOICE
+        diary_content = content(i) if callable(content) else content
+        diaries.append(Diary(
+            title='Benchmark diary {}'.format(i),
+            slug='benchmark-diary-{}'.format(i),
+            content=diary_content,
+            description=diary_content[:255],
+            is_visible=is_visible,
+            feeling=random.choice(Diary.FEELINGS_CHOICES)[0],
+            likes_count=random.randint(0, 100),
+            comments_count=random.randint(0, 20),
+            author_id=random.choice(profile_ids)))
+        if len(diaries) >= batch_size:
+            Diary.objects.bulk_create(diaries)
+            diaries = []
+            log('Created {} diaries...'.format(i + 1))
+    Diary.objects.bulk_create(diaries)
+    log('Created {} diaries.'.format(diaries_count))
+    # Deleting the diaries decrements the counters, keep them right.
+    benchmark_profiles().refresh_counters()
+    DiaryFeelingCount.objects.refresh()
+
+    return profile_ids
+
+
+def cleanup():
+    """Delete everything created by seed()"""
+    get_user_model().objects.filter(
+        username__startswith=USERNAME_PREFIX).delete()
@@ -0,0 +1,88 @@
+"""The discover feed is served from a pool of recent public diaries kept in
+   the cache, shuffled for each user and without the diaries of the user and
+   of the profiles he follows. It costs the same whatever the size of the
+   diaries table.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Diary
+
+# The pool entries are (id, author_id, feeling) since version 2.
+DISCOVER_POOL_CACHE_KEY = 'diaries:discover_pool:2'
+
+
+def build_discover_pool():
+    """Stores the (id, author_id, feeling) of the most recent public
+       diaries in the cache and returns the pool.
+    """
+    qs = Diary.objects.filter(is_visible=Diary.ALL_CHOICE)
+    qs = qs.order_by('-created_on').values_list('id', 'author_id', 'feeling')
+    pool = {
+        'version': int(time.time()),
+        'diaries': list(qs[:settings.DISCOVER_POOL_SIZE]),
+    }
+    cache.set(DISCOVER_POOL_CACHE_KEY, pool, settings.DISCOVER_POOL_TIMEOUT)
+    return pool
+
+
+def get_discover_pool():
+    pool = cache.get(DISCOVER_POOL_CACHE_KEY)
+    if pool is None:
+        pool = build_discover_pool()
+    return pool
+
+
+def get_discover_diary_ids(user, feeling=None):
+    """Returns the ids of the pool diaries that user should discover, only
+       those of feeling if it's given. The order is random but stable for a
+       user as long as the pool is the same, so that he can go through the
+       pages.
+    """
+    pool = get_discover_pool()
+    diaries = pool['diaries']
+    if feeling is not None:
+        diaries = [d for d in diaries if d[2] == feeling]
+    seed = str(pool['version'])
+    if user.is_authenticated:
+        profile = user.profile
+        excluded = set(profile.followed_profiles.values_list('id', flat=True))
+        excluded.add(profile.id)
+        diaries = [d for d in diaries if d[1] not in excluded]
+        seed = '{}:{}'.format(seed, user.pk)
+    diary_ids = [d[0] for d in diaries]
+    random.Random(seed).shuffle(diary_ids)
+    return diary_ids
+
+
+class DiscoverFeed:
+    """Sequence of diaries whose ids are known in advance. Slicing it only
+       fetches the diaries of the slice, so it can be given to paginators in
+       place of a queryset.
+    """
+
+    def __init__(self, diary_ids, queryset=None):
+        if queryset is None:
+            queryset = Diary.objects.all()
+        self.diary_ids = diary_ids
+        # Diaries that were hidden since the pool was built are skipped.
+        self.queryset = queryset.filter(is_visible=Diary.ALL_CHOICE)
+
+    def __len__(self):
+        return len(self.diary_ids)
+
+    def count(self):
+        return len(self.diary_ids)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            diary_ids = self.diary_ids[key]
+            diaries = self.queryset.in_bulk(diary_ids)
+            return [diaries[i] for i in diary_ids if i in diaries]
+        return self[key:key + 1][0]
+
+    def __iter__(self):
+        return iter(self[:])
@@ -0,0 +1,117 @@
+"""Rich text field whose value is stored zlib compressed once it's larger
+   than DIARY_CONTENT_COMPRESSION_THRESHOLD bytes (smaller ones are stored as
+   is, compressing them saves next to nothing). The column is binary, the
+   first byte of the stored value telling how the rest is encoded.
+   The stored value is only decompressed when the attribute is read: an
+   instance that is loaded then saved without reading it writes back the
+   same bytes. values() and values_list() return CompressedText objects,
+   str() decompresses them.
+"""
+import zlib
+
+from ckeditor_uploader.fields import RichTextUploadingField
+from django.conf import settings
+from django.db.models.query_utils import DeferredAttribute
+
+RAW_PREFIX = b'r'
+ZLIB_PREFIX = b'z'
+
+
+def compress_text(text):
+    data = text.encode('utf-8')
+    if len(data) >= settings.DIARY_CONTENT_COMPRESSION_THRESHOLD:
+        compressed = zlib.compress(data)
+        if len(compressed) < len(data):
+            return ZLIB_PREFIX + compressed
+    return RAW_PREFIX + data
+
+
+def decompress_text(data):
+    prefix, data = data[:1], data[1:]
+    if prefix == ZLIB_PREFIX:
+        data = zlib.decompress(data)
+    elif prefix != RAW_PREFIX:
+        raise ValueError('Unknown compressed text prefix {!r}'.format(prefix))
+    return data.decode('utf-8')
+
+
+class CompressedText:
+    """Text as it's stored, decompressed (once) when it's first needed"""
+    __slots__ = ('data', '_text')
+
+    def __init__(self, data):
+        self.data = data
+        self._text = None
+
+    def decompress(self):
+        if self._text is None:
+            self._text = decompress_text(self.data)
+        return self._text
+
+    @property
+    def is_compressed(self):
+        return self.data[:1] == ZLIB_PREFIX
+
+    def __str__(self):
+        return self.decompress()
+
+    def __repr__(self):
+        return '<CompressedText: {} bytes>'.format(len(self.data))
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """Loads the field if it's deferred, and replaces the stored value by
+       the text the first time it's read. It's a data descriptor, otherwise
+       the value in the instance dict would be read without it.
+    """
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if isinstance(value, CompressedText):
+            value = value.decompress()
+            instance.__dict__[self.field_name] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field_name] = value
+
+
+class CompressedRichTextField(RichTextUploadingField):
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super().contribute_to_class(cls, name, *args, **kwargs)
+        setattr(cls, self.attname, CompressedTextDescriptor(self.attname))
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return CompressedText(bytes(value))
+
+    def to_python(self, value):
+        if isinstance(value, CompressedText):
+            return value.decompress()
+        return super().to_python(value)
+
+    def pre_save(self, model_instance, add):
+        # Read the instance dict, the descriptor would decompress it.
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, CompressedText):
+            return value
+        return super().pre_save(model_instance, add)
+
+    def get_prep_value(self, value):
+        if isinstance(value, CompressedText):
+            return value.data
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return compress_text(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is not None:
+            return connection.Database.Binary(value)
+        return value
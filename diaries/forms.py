@@ -1,7 +1,7 @@
 from django import forms
-from bleach.sanitizer import Cleaner
 
 from .models import Diary, Comment
+from .sanitizer import sanitize_rich_text
 
 
 class DiaryForm(forms.ModelForm):
@@ -18,21 +18,10 @@ class DiaryForm(forms.ModelForm):
 
     def clean_content(self):
         content = self.cleaned_data['content']
-        cleaner = Cleaner(
-            tags=[
-                'p', 'u', 's', 'i', 'b', 'a', 'sub', 'sup', 'img', 'div',
-                'ul', 'li', 'ol', 'em', 'strong', 'h1', 'h2', 'h3', 'h4',
-                'h5', 'h6', 'pre', 'address', 'caption'
-            ],
-            attributes={
-                'a': ['href', 'target'],
-                'img': ['src', 'style', 'alt'],
-            },
-            styles=['height', 'width'],
-            protocols=['http', 'https', 'mailto']
-        )
-        content = cleaner.clean(content)
-        return content
+        # The stored content is already sanitized.
+        if self.instance.pk and content == self.instance.content:
+            return content
+        return sanitize_rich_text(content)
 
 
 class CommentForm(forms.ModelForm):
@@ -49,3 +38,26 @@ class SearchForm(forms.Form):
         label='',
         choices=(('diary', 'diaries'), ('profile', 'Profiles')),
         widget=forms.RadioSelect)
+
+
+class FeelingFilterForm(forms.Form):
+    feeling = forms.ChoiceField(
+        choices=Diary.FEELINGS_CHOICES,
+        required=False)
+
+    def get_feeling(self):
+        """Returns the feeling to filter the diaries by, None if there's
+           none or it's not a valid one
+        """
+        if self.is_valid():
+            return self.cleaned_data['feeling'] or None
+        return None
+
+    def get_filters(self, counts=None):
+        """Returns the (feeling, name, count) of the feeling filter links,
+           the counts being looked up in counts if it's given
+        """
+        counts = counts or {}
+        return [
+            (feeling, name, counts.get(feeling))
+            for feeling, name in Diary.FEELINGS_CHOICES]
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.utils import measure
+from diaries.benchmarks import seed, cleanup, benchmark_profiles
+from diaries.models import Diary
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the requests per second of the public pages served to '
+        'anonymous visitors with and without the anonymous pages cache. '
+        'Seeds benchmark data, so only run it against a scratch database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=100)
+        parser.add_argument('--diaries', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Requests timed per page.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Reuse the data of a previous run.')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete the benchmark data when done.')
+
+    def handle(self, *args, **options):
+        if not options['no_seed']:
+            seed(
+                options['profiles'],
+                options['diaries'],
+                0,
+                content='<p>Benchmark diary</p>',
+                stdout=self.stdout)
+
+        diary = Diary.objects.filter(
+            author__user__username__startswith='benchmark-',
+            is_visible=Diary.ALL_CHOICE).first()
+        profile = benchmark_profiles().select_related('user').first()
+        urls = {
+            'home': reverse('diaries:diary_list'),
+            'popular': reverse('diaries:popular_diary_list'),
+            'discover': reverse('diaries:discover_diary_list'),
+            'diary': diary.get_absolute_url(),
+            'profile': profile.get_absolute_url(),
+        }
+        client = Client(HTTP_ACCEPT_ENCODING='gzip')
+        count = options['requests']
+
+        def get_pages(url):
+            for i in range(count):
+                client.get(url)
+
+        timeouts = {
+            'uncached': 0,
+            'cached': settings.ANONYMOUS_PAGE_CACHE_TIMEOUT or 60,
+        }
+        # The test client requests are sent to the 'testserver' host.
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, url in urls.items():
+                for mode, timeout in timeouts.items():
+                    cache.clear()
+                    with override_settings(
+                            ANONYMOUS_PAGE_CACHE_TIMEOUT=timeout):
+                        best, average = measure(
+                            lambda: get_pages(url), options['repeat'])
+                    self.stdout.write(
+                        '{:<10} {:<10} best {:>9.1f} req/s   '
+                        'average {:>9.1f} req/s'.format(
+                            name, mode, count * 1000 / best,
+                            count * 1000 / average))
+
+        if options['cleanup']:
+            cleanup()
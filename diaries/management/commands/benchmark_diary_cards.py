@@ -0,0 +1,61 @@
+import tracemalloc
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+
+from core.utils import measure
+from diaries.benchmarks import seed, cleanup, rich_text
+from diaries.models import Diary
+
+
+def peak_memory(func):
+    """Returns the peak of the memory allocated by func in KB"""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the latency and the memory of reading a list of diaries '
+        'with large contents as full rows and with the for_cards() '
+        'projection. Seeds benchmark data, so only run it against a scratch '
+        'database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--diaries', type=int, default=500)
+        parser.add_argument('--size', type=int, default=100 * 1024,
+                            help='Size of the diaries content in bytes.')
+        parser.add_argument('--limit', type=int, default=100,
+                            help='Number of diaries read by each list.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        seed(
+            10,
+            options['diaries'],
+            0,
+            content=rich_text(options['size']),
+            stdout=self.stdout)
+
+        qs = Diary.objects.active(AnonymousUser()).filter(
+            author__user__username__startswith='benchmark-')
+        limit = options['limit']
+        lists = [
+            ('full rows', qs.select_related('author__user')[:limit]),
+            ('for_cards()', qs.for_cards()[:limit]),
+        ]
+        for name, list_qs in lists:
+            # all() clones the queryset, so that nothing is reused between
+            # the runs.
+            best, average = measure(
+                lambda: list(list_qs.all()), options['repeat'])
+            memory = peak_memory(lambda: list(list_qs.all()))
+            self.stdout.write(
+                '{:<12} best {:>9.2f} ms   average {:>9.2f} ms   '
+                'peak memory {:>10.1f} KB'.format(
+                    name, best, average, memory))
+
+        cleanup()
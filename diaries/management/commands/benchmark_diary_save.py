@@ -0,0 +1,66 @@
+import bleach
+from django.core.management.base import BaseCommand
+
+from core.utils import measure
+from diaries.benchmarks import seed, cleanup, benchmark_profiles, rich_text
+from diaries.models import Diary
+from diaries.utils import extract_text
+
+
+def bleach_loop_description(content):
+    """The description as it was built before the text extractor"""
+    start_length = 500
+    total_position = len(content)
+    text_description = bleach.clean(
+        content[:start_length], strip=True, tags=[], attributes=[]).strip()
+    while len(text_description) < 245 & start_length < total_position:
+        text_description += bleach.clean(
+            content[start_length:start_length + 50],
+            strip=True, tags=[], attributes=[]).strip()
+        start_length += 50
+    return text_description[:255]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the cost of deriving the description, words count and '
+        'reading time of large rich text diaries, and the latency of saving '
+        'them. Seeds benchmark data, so only run it against a scratch '
+        'database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100 * 1024,
+                            help='Size of the diaries content in bytes.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        contents = [rich_text(options['size']) for _ in range(2)]
+        seed(1, 1, 0, content=contents[0])
+        diary = Diary.objects.get(author__in=benchmark_profiles())
+
+        def save():
+            contents.reverse()
+            diary.content = contents[0]
+            diary.save()
+
+        results = [
+            ('bleach loop (description only)',
+             measure(lambda: bleach_loop_description(contents[0]),
+                     options['repeat'])),
+            ('bleach full clean (search text)',
+             measure(lambda: bleach.clean(
+                 contents[0], strip=True, tags=[], attributes=[]),
+                 options['repeat'])),
+            ('text extractor',
+             measure(lambda: extract_text(contents[0]), options['repeat'])),
+            ('Diary.save (content changed)',
+             measure(save, options['repeat'])),
+            ('Diary.save (content unchanged)',
+             measure(diary.save, options['repeat'])),
+        ]
+        self.stdout.write('Content of {} bytes'.format(len(contents[0])))
+        for name, (best, average) in results:
+            self.stdout.write('{:<32} best {:>9.2f} ms   average {:>9.2f} ms'
+                              .format(name, best, average))
+
+        cleanup()
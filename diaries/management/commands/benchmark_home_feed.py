@@ -0,0 +1,75 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.utils import measure
+from diaries.benchmarks import seed, cleanup, benchmark_profiles
+from diaries.models import Diary, TimelineEntry
+from diaries.views import DIARIES_PER_PAGE
+
+
+def union_home_feed(profile):
+    """The home feed as it was built before materialized timelines"""
+    followed_profiles_diaries = Diary.objects\
+        .by_followed_profiles(profile).order_by()
+    current_profile_diaries = Diary.objects.filter(author=profile).order_by()
+    qs = followed_profiles_diaries.union(current_profile_diaries)
+    return qs.order_by('-created_on')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the latency of the home feed read from the materialized '
+        'timeline against the UNION query. Seeds benchmark data, so only run '
+        'it against a scratch database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=10000)
+        parser.add_argument('--diaries', type=int, default=1000000)
+        parser.add_argument('--follows', type=int, default=50,
+                            help='Profiles followed by each profile.')
+        parser.add_argument('--samples', type=int, default=20,
+                            help='Number of profiles whose feed is timed.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page', type=int, default=1)
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Reuse the data of a previous run.')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete the benchmark data when done.')
+
+    def handle(self, *args, **options):
+        if not options['no_seed']:
+            seed(
+                options['profiles'],
+                options['diaries'],
+                options['follows'],
+                stdout=self.stdout)
+            for profile in benchmark_profiles().iterator():
+                with transaction.atomic():
+                    TimelineEntry.objects.rebuild(profile)
+            self.stdout.write('Built timelines.')
+
+        profiles = list(benchmark_profiles())
+        profiles = random.sample(
+            profiles, min(options['samples'], len(profiles)))
+        offset = (options['page'] - 1) * DIARIES_PER_PAGE
+        limit = offset + DIARIES_PER_PAGE
+
+        results = {'union': [], 'timeline': []}
+        for profile in profiles:
+            union_qs = union_home_feed(profile)
+            timeline_qs = Diary.objects.timeline(profile)
+            results['union'].append(measure(
+                lambda: list(union_qs[offset:limit]), options['repeat']))
+            results['timeline'].append(measure(
+                lambda: list(timeline_qs[offset:limit]), options['repeat']))
+
+        for name, timings in results.items():
+            best = min(t[0] for t in timings)
+            average = sum(t[1] for t in timings) / len(timings)
+            self.stdout.write('{:<10} best {:>9.2f} ms   average {:>9.2f} ms'
+                              .format(name, best, average))
+
+        if options['cleanup']:
+            cleanup()
@@ -0,0 +1,79 @@
+from bleach.sanitizer import Cleaner
+from django.core.management.base import BaseCommand
+
+from core.utils import measure
+from diaries.benchmarks import rich_text
+from diaries.sanitizer import (
+    RICH_TEXT_ATTRIBUTES, RICH_TEXT_PROTOCOLS, RICH_TEXT_STYLES,
+    RICH_TEXT_TAGS, get_rich_text_cleaner, sanitize_rich_text,
+    sanitized_memo)
+
+
+def nested_html(depth):
+    """Deeply nested allowed and disallowed tags, never closed"""
+    return ''.join(
+        '<div><span onclick="x()"><b><i>{}'.format(i)
+        for i in range(depth))
+
+
+def attributes_html(count):
+    """A paragraph crowded with attributes and dangerous urls"""
+    attributes = ' '.join(
+        'data-{0}="{0}" onmouseover="x({0})"'.format(i)
+        for i in range(count))
+    links = ''.join(
+        '<a href="javascript:x({0})" {1}>{0}</a>'.format(i, attributes)
+        for i in range(20))
+    return '<p>{}</p>'.format(links)
+
+
+def per_call_cleaner(content):
+    """How DiaryForm.clean_content sanitized before the shared cleaner"""
+    cleaner = Cleaner(
+        tags=RICH_TEXT_TAGS,
+        attributes=RICH_TEXT_ATTRIBUTES,
+        styles=RICH_TEXT_STYLES,
+        protocols=RICH_TEXT_PROTOCOLS
+    )
+    return cleaner.clean(content)
+
+
+def memoized(content):
+    sanitized_memo.clear()
+    sanitized = sanitize_rich_text(content)
+    return lambda: sanitize_rich_text(sanitized)
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmarks of the diaries HTML sanitization on typical and '
+        'adversarial content. It doesn\'t touch the database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--depth', type=int, default=500,
+                            help='Nesting depth of the adversarial html.')
+
+    def handle(self, *args, **options):
+        samples = [
+            ('typical 5 KB', rich_text(5 * 1024)),
+            ('typical 100 KB', rich_text(100 * 1024)),
+            ('nested x{}'.format(options['depth']),
+             nested_html(options['depth'])),
+            ('attributes', attributes_html(50)),
+        ]
+        repeat = options['repeat']
+        cleaner = get_rich_text_cleaner()
+        for name, content in samples:
+            self.stdout.write('{} ({} bytes)'.format(name, len(content)))
+            results = [
+                ('Cleaner per call',
+                 measure(lambda: per_call_cleaner(content), repeat)),
+                ('shared Cleaner',
+                 measure(lambda: cleaner.clean(content), repeat)),
+                ('memo hit', measure(memoized(content), repeat)),
+            ]
+            for label, (best, average) in results:
+                self.stdout.write(
+                    '  {:<18} best {:>9.3f} ms   average {:>9.3f} ms'
+                    .format(label, best, average))
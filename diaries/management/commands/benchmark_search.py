@@ -0,0 +1,78 @@
+import random
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+
+from core.utils import measure
+from diaries.benchmarks import seed, cleanup
+from diaries.models import Diary
+from diaries.search import reindex
+from diaries.views import DIARIES_PER_PAGE
+
+WORDS = (
+    'morning coffee rain walk school exam friend family travel beach city '
+    'night dream book movie music song garden winter summer work office '
+    'tired happy lonely party birthday kitchen dinner train station letter '
+    'market river mountain forest hospital doctor teacher holiday weekend'
+).split()
+
+
+def random_content(i):
+    paragraphs = (
+        ' '.join(random.choice(WORDS) for _ in range(60))
+        for _ in range(5))
+    return ''.join('<p>{}</p>'.format(p) for p in paragraphs)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the latency of the full text diary search against the '
+        'title__contains lookup it replaced. Seeds benchmark data, so only '
+        'run it against a scratch database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=1000)
+        parser.add_argument('--diaries', type=int, default=100000)
+        parser.add_argument('--samples', type=int, default=20,
+                            help='Number of search terms timed.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Reuse the data of a previous run.')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete the benchmark data when done.')
+
+    def handle(self, *args, **options):
+        if not options['no_seed']:
+            seed(
+                options['profiles'],
+                options['diaries'],
+                0,
+                content=random_content,
+                stdout=self.stdout)
+            indexed = reindex(Diary.objects.filter(
+                author__user__username__startswith='benchmark-'))
+            self.stdout.write('Indexed {} diaries.'.format(indexed))
+
+        user = AnonymousUser()
+        terms = random.sample(WORDS, min(options['samples'], len(WORDS)))
+
+        results = {'contains': [], 'full text': []}
+        for term in terms:
+            contains_qs = Diary.objects.active(user).filter(
+                title__contains=term)
+            search_qs = Diary.objects.active(user).search(term)
+            results['contains'].append(measure(
+                lambda: list(contains_qs[:DIARIES_PER_PAGE]),
+                options['repeat']))
+            results['full text'].append(measure(
+                lambda: list(search_qs[:DIARIES_PER_PAGE]),
+                options['repeat']))
+
+        for name, timings in results.items():
+            best = min(t[0] for t in timings)
+            average = sum(t[1] for t in timings) / len(timings)
+            self.stdout.write('{:<10} best {:>9.2f} ms   average {:>9.2f} ms'
+                              .format(name, best, average))
+
+        if options['cleanup']:
+            cleanup()
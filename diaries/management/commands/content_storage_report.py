@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from diaries.models import Diary
+
+
+class Command(BaseCommand):
+    help = (
+        'Report the size of the diaries content as stored (compressed above '
+        'DIARY_CONTENT_COMPRESSION_THRESHOLD bytes) against its plain size.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of diaries loaded per query.')
+
+    def handle(self, *args, **options):
+        diaries = Diary.objects.order_by('id').values_list('id', 'content')
+        count = compressed = stored_size = plain_size = 0
+        last_id = 0
+        while True:
+            chunk = list(
+                diaries.filter(id__gt=last_id)[:options['chunk_size']])
+            if not chunk:
+                break
+            for diary_id, content in chunk:
+                count += 1
+                compressed += content.is_compressed
+                stored_size += len(content.data)
+                plain_size += len(content.decompress().encode('utf-8'))
+            last_id = chunk[-1][0]
+
+        saved = plain_size - stored_size
+        ratio = saved / plain_size * 100 if plain_size else 0
+        self.stdout.write(
+            '{} diaries, {} stored compressed'.format(count, compressed))
+        self.stdout.write(
+            'Content: {:.1f} KB stored for {:.1f} KB of text, {:.1f} KB '
+            '({:.1f}%) saved'.format(
+                stored_size / 1024, plain_size / 1024, saved / 1024, ratio))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from diaries.models import Diary
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the time decayed popularity score of the public diaries. '
+        'Run it periodically so that old diaries sink in the popular feed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of diaries updated per query.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        chunk_size = options['chunk_size']
+        # Diaries without likes nor comments have a score of 0 whatever their
+        # age.
+        qs = Diary.objects.filter(
+            is_visible=Diary.ALL_CHOICE,
+            popularity_score__gt=0)
+        qs = qs.only('likes_count', 'comments_count', 'created_on')
+        qs = qs.order_by('pk')
+
+        updated = 0
+        last_pk = 0
+        while True:
+            chunk = list(qs.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            for diary in chunk:
+                diary.popularity_score = diary.get_popularity_score(now)
+            Diary.objects.bulk_update(chunk, ['popularity_score'])
+            updated += len(chunk)
+            last_pk = chunk[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(
+            'Decayed the popularity score of {} diaries.'.format(updated)))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from diaries.models import Diary
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the diaries flagged as deleted, with their images, likes, '
+        'comments and notifications. Schedule it, deleting a diary only '
+        'flags it.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Number of diaries deleted per transaction.')
+
+    def handle(self, *args, **options):
+        qs = Diary.all_objects.filter(is_deleted=True).order_by('pk')
+        purged = 0
+        while True:
+            diary_ids = list(
+                qs.values_list('pk', flat=True)[:options['chunk_size']])
+            if not diary_ids:
+                break
+            # The delete handlers delete the notifications (and the images
+            # once the chunk is committed), the likes and comments are
+            # cascaded.
+            with transaction.atomic():
+                Diary.all_objects.filter(pk__in=diary_ids).delete()
+            purged += len(diary_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Purged {} deleted diaries.'.format(purged)))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Profile
+from diaries.models import TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized home timelines of profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Only rebuild the timelines of these users.')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of profiles loaded per query.')
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.order_by('pk')
+        if options['usernames']:
+            profiles = profiles.filter(user__username__in=options['usernames'])
+
+        rebuilt = 0
+        for profile in profiles.iterator(chunk_size=options['chunk_size']):
+            with transaction.atomic():
+                TimelineEntry.objects.rebuild(profile)
+            rebuilt += 1
+            if rebuilt % options['chunk_size'] == 0:
+                self.stdout.write('{} timelines rebuilt...'.format(rebuilt))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt {} timelines.'.format(rebuilt)))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from diaries.discover import build_discover_pool
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pool of recent public diaries of the discover feed.'
+
+    def handle(self, *args, **options):
+        pool = build_discover_pool()
+        self.stdout.write(self.style.SUCCESS(
+            'Discover pool rebuilt with {} diaries.'.format(
+                len(pool['diaries']))))
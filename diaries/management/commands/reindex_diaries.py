@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from diaries.models import Diary
+from diaries.search import reindex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full text search documents of diaries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'slugs',
+            nargs='*',
+            help='Only reindex the diaries with these slugs.')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of diaries loaded per query.')
+
+    def handle(self, *args, **options):
+        diaries = Diary.objects.all()
+        if options['slugs']:
+            diaries = diaries.filter(slug__in=options['slugs'])
+
+        indexed = reindex(diaries, chunk_size=options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Reindexed {} diaries.'.format(indexed)))
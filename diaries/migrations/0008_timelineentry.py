@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_assign_default_image_to_profile_without_one'),
+        ('diaries', '0007_auto_20190220_1400'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='diary',
+            name='is_commentable',
+            field=models.CharField(blank=True, choices=[('all', 'All'), ('no_one', 'No One')], default='all', help_text='Who can comment on this diary?', max_length=7),
+        ),
+        migrations.AlterField(
+            model_name='diary',
+            name='is_visible',
+            field=models.CharField(blank=True, choices=[('all', 'All'), ('no_one', 'No One')], default='all', help_text='Who can see this diary?', max_length=7),
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_on', models.DateTimeField()),
+                ('diary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='diaries.Diary')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='accounts.Profile')),
+            ],
+            options={
+                'verbose_name_plural': 'timeline entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['profile', '-created_on'], name='diaries_tim_profile_eb89d3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='timelineentry',
+            unique_together={('profile', 'diary')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def populate_timelines(apps, schema_editor):
+    Profile = apps.get_model('accounts', 'Profile')
+    Diary = apps.get_model('diaries', 'Diary')
+    TimelineEntry = apps.get_model('diaries', 'TimelineEntry')
+    for profile in Profile.objects.all():
+        diaries = Diary.objects.filter(author=profile) | Diary.objects.filter(
+            author__in=profile.followed_profiles.all(),
+            is_visible='all')
+        entries = [
+            TimelineEntry(
+                profile=profile,
+                diary_id=diary_id,
+                created_on=created_on)
+            for diary_id, created_on in diaries.values_list('id', 'created_on')
+        ]
+        TimelineEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_timelines, migrations.RunPython.noop)
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:16
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from ..utils import get_popularity_score
+
+
+def set_popularity_scores(apps, schema_editor):
+    Diary = apps.get_model('diaries', 'Diary')
+    now = timezone.now()
+    diaries = Diary.objects.filter(is_visible='all').only(
+        'likes_count', 'comments_count', 'created_on', 'popularity_score')
+    for d in diaries.iterator():
+        d.popularity_score = get_popularity_score(
+            d.likes_count + d.comments_count, d.created_on, now)
+        d.save(update_fields=['popularity_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0009_populate_timelines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diary',
+            name='popularity_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(
+            set_popularity_scores,
+            migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(fields=['is_visible', '-popularity_score', '-id'], name='diaries_dia_is_visi_b81fce_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0010_diary_popularity_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(fields=['is_visible', '-created_on'], name='diaries_dia_is_visi_5dd9f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(fields=['author', '-created_on'], name='diaries_dia_author__f8656b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(fields=['-created_on'], name='diaries_dia_created_516bb7_idx'),
+        ),
+    ]
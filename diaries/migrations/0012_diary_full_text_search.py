@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# The search documents are written by 0022_diary_search_documents, once the
+# descriptions are rewritten by 0013_diary_reading_metadata.
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE diaries_diary ADD COLUMN search_vector tsvector')
+        schema_editor.execute(
+            'CREATE INDEX diaries_diary_search_vector_idx ON diaries_diary '
+            'USING GIN (search_vector)')
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE diaries_diary_fts '
+            'USING fts5(title, description, body)')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE diaries_diary DROP COLUMN search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE diaries_diary_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0011_diary_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+from ..utils import extract_text, get_reading_time
+
+
+def set_reading_metadata(apps, schema_editor):
+    Diary = apps.get_model('diaries', 'Diary')
+    diaries = Diary.objects.only('content')
+    for d in diaries.iterator(chunk_size=500):
+        text, d.words_count = extract_text(d.content)
+        d.description = text[:255]
+        d.reading_time = get_reading_time(d.words_count)
+        d.save(update_fields=['description', 'words_count', 'reading_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0012_diary_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diary',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='diary',
+            name='words_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            set_reading_metadata,
+            migrations.RunPython.noop
+        ),
+    ]
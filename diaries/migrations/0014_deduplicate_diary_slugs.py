@@ -0,0 +1,46 @@
+from django.db import migrations, transaction
+from django.db.models import Count, Min
+
+from core.utils import generate_random_string
+
+CHUNK_SIZE = 500
+
+
+def deduplicate_slugs(apps, schema_editor):
+    """Every diary but the oldest of those sharing a slug gets a random
+       suffix, so that the unique index can be created. The duplicated slugs
+       are fixed by chunks, each in its own transaction.
+    """
+    Diary = apps.get_model('diaries', 'Diary')
+    db_alias = schema_editor.connection.alias
+    diaries = Diary.objects.using(db_alias)
+    duplicates = diaries.order_by().values('slug').annotate(
+        count=Count('id'), first_id=Min('id')).filter(count__gt=1)
+    while True:
+        chunk = list(duplicates[:CHUNK_SIZE])
+        if not chunk:
+            break
+        with transaction.atomic(using=db_alias):
+            for duplicate in chunk:
+                base_slug = duplicate['slug'] or 'diary'
+                qs = diaries.filter(slug=duplicate['slug']).exclude(
+                    id=duplicate['first_id'])
+                for diary_id in qs.values_list('id', flat=True):
+                    slug = '{}-{}'.format(base_slug, generate_random_string())
+                    while diaries.filter(slug=slug).exists():
+                        slug = '{}-{}'.format(
+                            base_slug, generate_random_string())
+                    diaries.filter(id=diary_id).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+    # Each chunk is committed on its own.
+    atomic = False
+
+    dependencies = [
+        ('diaries', '0013_diary_reading_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+    ]
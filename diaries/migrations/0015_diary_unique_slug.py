@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0014_deduplicate_diary_slugs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='diary',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, max_length=275, unique=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+import ckeditor_uploader.fields
+import diaries.fields
+
+
+class Migration(migrations.Migration):
+    # The content is copied by 0016_diary_compressed_content_copy, then the
+    # columns are swapped by 0016_diary_compressed_content_swap: only the
+    # copy is committed by chunks, the schema changes are atomic.
+
+    dependencies = [
+        ('diaries', '0015_diary_unique_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diary',
+            name='compressed_content',
+            field=diaries.fields.CompressedRichTextField(null=True),
+        ),
+        # Nullable so that the column can be added back (then filled) when
+        # the migration is reversed.
+        migrations.AlterField(
+            model_name='diary',
+            name='content',
+            field=ckeditor_uploader.fields.RichTextUploadingField(null=True),
+        ),
+    ]
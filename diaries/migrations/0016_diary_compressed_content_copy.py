@@ -0,0 +1,45 @@
+from django.db import migrations, transaction
+
+CHUNK_SIZE = 500
+
+
+def copy_content(apps, schema_editor, source, target):
+    """Copies the source field of the diaries to the target one by chunks of
+       ids, each in its own transaction. The fields take care of compressing
+       and decompressing.
+    """
+    Diary = apps.get_model('diaries', 'Diary')
+    db_alias = schema_editor.connection.alias
+    diaries = Diary.objects.using(db_alias).order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(
+            diaries.filter(id__gt=last_id).only('id', source)[:CHUNK_SIZE])
+        if not chunk:
+            break
+        for diary in chunk:
+            setattr(diary, target, str(getattr(diary, source)))
+        with transaction.atomic(using=db_alias):
+            Diary.objects.using(db_alias).bulk_update(chunk, [target])
+        last_id = chunk[-1].id
+
+
+def compress_content(apps, schema_editor):
+    copy_content(apps, schema_editor, 'content', 'compressed_content')
+
+
+def decompress_content(apps, schema_editor):
+    copy_content(apps, schema_editor, 'compressed_content', 'content')
+
+
+class Migration(migrations.Migration):
+    # Each chunk is committed on its own.
+    atomic = False
+
+    dependencies = [
+        ('diaries', '0016_diary_compressed_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(compress_content, decompress_content),
+    ]
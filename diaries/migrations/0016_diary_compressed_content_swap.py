@@ -0,0 +1,27 @@
+from django.db import migrations
+
+import diaries.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0016_diary_compressed_content_copy'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='diary',
+            name='content',
+        ),
+        migrations.RenameField(
+            model_name='diary',
+            old_name='compressed_content',
+            new_name='content',
+        ),
+        migrations.AlterField(
+            model_name='diary',
+            name='content',
+            field=diaries.fields.CompressedRichTextField(),
+        ),
+    ]
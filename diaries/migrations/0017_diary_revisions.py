@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0016_diary_compressed_content_swap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaryRevision',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('data', models.BinaryField()),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('diary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='diaries.Diary')),
+            ],
+            options={
+                'ordering': ['-number'],
+                'unique_together': {('diary', 'number')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, transaction
+
+from diaries.revisions import encode_snapshot
+
+CHUNK_SIZE = 500
+
+
+def create_initial_revisions(apps, schema_editor):
+    """The current version of every diary becomes its first revision, a
+       snapshot. Written by chunks, each in its own transaction.
+    """
+    Diary = apps.get_model('diaries', 'Diary')
+    DiaryRevision = apps.get_model('diaries', 'DiaryRevision')
+    db_alias = schema_editor.connection.alias
+    diaries = Diary.objects.using(db_alias).filter(revisions=None)
+    diaries = diaries.order_by('id').only('id', 'title', 'content')
+    last_id = 0
+    while True:
+        chunk = list(diaries.filter(id__gt=last_id)[:CHUNK_SIZE])
+        if not chunk:
+            break
+        with transaction.atomic(using=db_alias):
+            DiaryRevision.objects.using(db_alias).bulk_create(
+                DiaryRevision(
+                    diary_id=diary.id,
+                    number=1,
+                    title=diary.title,
+                    is_snapshot=True,
+                    data=encode_snapshot(diary.content))
+                for diary in chunk)
+        last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+    # Each chunk is committed on its own.
+    atomic = False
+
+    dependencies = [
+        ('diaries', '0017_diary_revisions'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_initial_revisions, migrations.RunPython.noop),
+    ]
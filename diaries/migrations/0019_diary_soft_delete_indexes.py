@@ -0,0 +1,49 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0018_initial_diary_revisions'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='diary',
+            name='diaries_dia_is_visi_b81fce_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='diary',
+            name='diaries_dia_is_visi_5dd9f4_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='diary',
+            name='diaries_dia_author__f8656b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='diary',
+            name='diaries_dia_created_516bb7_idx',
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['is_visible', '-popularity_score', '-id'], name='diary_visible_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['is_visible', '-created_on'], name='diary_visible_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['author', '-created_on'], name='diary_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['-created_on'], name='diary_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(condition=models.Q(is_deleted=True), fields=['id'], name='diary_deleted_idx'),
+        ),
+    ]
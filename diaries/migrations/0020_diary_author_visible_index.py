@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0019_diary_soft_delete_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['author', 'is_visible', '-created_on', '-id'], name='diary_author_visible_idx'),
+        ),
+    ]
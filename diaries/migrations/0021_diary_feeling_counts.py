@@ -0,0 +1,48 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:04
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_feelings(apps, schema_editor):
+    """Counts the public diaries of every feeling, the diaries handlers
+       keep the counts up to date from then on.
+    """
+    Diary = apps.get_model('diaries', 'Diary')
+    DiaryFeelingCount = apps.get_model('diaries', 'DiaryFeelingCount')
+    db_alias = schema_editor.connection.alias
+    qs = Diary.objects.using(db_alias).filter(
+        is_visible='all',
+        is_deleted=False,
+        feeling__isnull=False).exclude(feeling='')
+    qs = qs.values_list('feeling').annotate(count=Count('id')).order_by()
+    DiaryFeelingCount.objects.using(db_alias).bulk_create([
+        DiaryFeelingCount(feeling=feeling, count=count)
+        for feeling, count in qs])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0020_diary_author_visible_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaryFeelingCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feeling', models.CharField(choices=[('0', 'Angry'), ('1', 'Happy'), ('2', 'Excited'), ('3', 'Sad'), ('LOVE', 'Love'), ('SATISFIED', 'Satisfied'), ('MAD', 'Mad'), ('TIRED', 'Tired'), ('SURPRISED', 'Surprised'), ('AFRAID', 'Afraid')], max_length=15, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['feeling', 'is_visible', '-created_on', '-id'], name='diary_feeling_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diary',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['feeling', 'is_visible', '-popularity_score', '-id'], name='diary_feeling_popular_idx'),
+        ),
+        migrations.RunPython(count_feelings, migrations.RunPython.noop),
+    ]
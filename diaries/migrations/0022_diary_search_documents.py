@@ -0,0 +1,67 @@
+import html
+import re
+
+from django.conf import settings
+from django.db import migrations
+
+CHUNK_SIZE = 500
+
+TAG_RE = re.compile(r'<[^>]*>')
+
+
+def get_plain_text(content):
+    return ' '.join(html.unescape(TAG_RE.sub(' ', content)).split())
+
+
+def write_search_documents(apps, schema_editor):
+    """Writes the search documents of the existing diaries, Diary.save()
+       keeps them up to date from then on
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return
+    Diary = apps.get_model('diaries', 'Diary')
+    db_alias = schema_editor.connection.alias
+    diaries = Diary.objects.using(db_alias).order_by('id')
+    diaries = diaries.only('id', 'title', 'description', 'content')
+    config = settings.DIARY_SEARCH_CONFIG
+    last_id = 0
+    while True:
+        chunk = list(diaries.filter(id__gt=last_id)[:CHUNK_SIZE])
+        if not chunk:
+            break
+        for diary in chunk:
+            params = [
+                diary.title,
+                diary.description or '',
+                get_plain_text(str(diary.content))]
+            if vendor == 'postgresql':
+                schema_editor.execute(
+                    'UPDATE diaries_diary SET search_vector = '
+                    "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                    "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                    "setweight(to_tsvector(%s::regconfig, %s), 'C') "
+                    'WHERE id = %s',
+                    [config, params[0], config, params[1], config, params[2],
+                     diary.id])
+            else:
+                schema_editor.execute(
+                    'DELETE FROM diaries_diary_fts WHERE rowid = %s',
+                    [diary.id])
+                schema_editor.execute(
+                    'INSERT INTO diaries_diary_fts '
+                    '(rowid, title, description, body) '
+                    'VALUES (%s, %s, %s, %s)',
+                    [diary.id] + params)
+        last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0021_diary_feeling_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(write_search_documents, migrations.RunPython.noop),
+    ]
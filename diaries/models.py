@@ -1,17 +1,26 @@
-import bleach
-from django.db import models
-from django.db.models import F, Q
-from django.db.models.signals import post_save, post_delete
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    BooleanField, Count, Exists, F, OuterRef, Q, Subquery, Value)
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils.text import slugify
 from django.urls import reverse
-from ckeditor_uploader.fields import RichTextUploadingField
 from notifications.models import Notification
 from notifications.signals import notify
 
 from accounts.models import Profile
+from core.thumbnails import schedule_thumbnails
+from core.page_cache import invalidate_anonymous_pages
 from core.utils import get_image_upload_path, generate_random_string
-from .utils import delete_ckeditor_rich_text_images
+from . import revisions, search
+from .fields import CompressedRichTextField, CompressedText
+from .rendering import delete_detail_parts
+from .sanitizer import sanitize_rich_text
+from .utils import (
+    delete_ckeditor_rich_text_images, delete_media_files, extract_text,
+    get_popularity_score, get_reading_time)
 
 
 class DiaryQuerySet(models.QuerySet):
@@ -22,16 +31,53 @@ class DiaryQuerySet(models.QuerySet):
            If he's authencated he can also see his private diaries
         """
         if user.is_authenticated:
-            # User can see his non-visible diaries.
+            # User can see his non-visible diaries. Both conditions are on the
+            # diaries table so there's no duplicate to remove with distinct(),
+            # and each one has its own index.
             qs = self.filter(
                 Q(author=user.profile) |
                 Q(is_visible=Diary.ALL_CHOICE))
-            qs = qs.distinct()
         else:
             qs = self.filter(is_visible=Diary.ALL_CHOICE)
         qs = qs.select_related('author')
         return qs
 
+    def with_viewer_state(self, user):
+        """Annotates is_liked: whether user likes the diary. It's computed by
+           the same query that fetches the diaries.
+        """
+        if not user.is_authenticated:
+            return self.annotate(
+                is_liked=Value(False, output_field=BooleanField()))
+        likes = DiaryLike.objects.filter(
+            diary=OuterRef('pk'),
+            user=user.profile)
+        return self.annotate(is_liked=Exists(likes))
+
+    def for_cards(self):
+        """Loads what the diary cards and the list API show: the content,
+           that can be very large, is deferred, and the author comes with
+           its user (the urls of its profile are built from the username).
+        """
+        return self.defer('content').select_related('author__user')
+
+    def written_by(self, profile, user):
+        """Returns the diaries of profile that user can see, newest first:
+           all of them for their author, a range of the (author, created_on)
+           index, the public ones otherwise, a range of the (author,
+           is_visible, created_on, id) index.
+        """
+        qs = self.filter(author=profile)
+        if profile.user_id != user.pk:
+            qs = qs.filter(is_visible=Diary.ALL_CHOICE)
+        return qs.order_by('-created_on', '-id')
+
+    def with_feeling(self, feeling):
+        """Returns the diaries of feeling, all of them if it's None"""
+        if feeling is None:
+            return self
+        return self.filter(feeling=feeling)
+
     def by_followed_profiles(self, profile):
         """Returns diaries of followed profiles"""
         followed_profiles = profile.followed_profiles.all()
@@ -41,13 +87,37 @@ class DiaryQuerySet(models.QuerySet):
         return qs
 
     def popular(self):
-        """Order the diaries based on number of comments and likes"""
-        qs = self.annotate(
-            ranking_factor=F('comments_count') + F('likes_count')
-        )
-        qs = qs.filter(is_visible=Diary.ALL_CHOICE).order_by('-ranking_factor')
+        """Order the diaries based on their time decayed number of comments
+           and likes
+        """
+        qs = self.filter(is_visible=Diary.ALL_CHOICE)
+        qs = qs.order_by('-popularity_score', '-id')
+        return qs
+
+    def timeline(self, profile):
+        """Returns the diaries of profile and the public diaries of the
+           profiles he follows, read from his materialized timeline.
+        """
+        qs = self.filter(timeline_entries__profile=profile)
+        qs = qs.annotate(timeline_created_on=F('timeline_entries__created_on'))
+        qs = qs.order_by('-timeline_created_on')
         return qs
 
+    def search(self, q):
+        """Returns the diaries matching q (full text search on their title,
+           description and content) ordered by relevance
+        """
+        return search.search(self, q)
+
+
+class DiaryManager(models.Manager.from_queryset(DiaryQuerySet)):
+    """Leaves out the diaries flagged as deleted, they're waiting for
+       purge_deleted_diaries
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
 
 class Diary(models.Model):
     ALL_CHOICE = 'all'
@@ -81,8 +151,12 @@ class Diary(models.Model):
         (AFRAID_FEELING, 'Afraid'),)
 
     title = models.CharField(max_length=255)
-    slug = models.SlugField(max_length=275, blank=True, allow_unicode=True)
-    content = RichTextUploadingField()
+    slug = models.SlugField(
+        max_length=275,
+        blank=True,
+        unique=True,
+        allow_unicode=True)
+    content = CompressedRichTextField()
     description = models.CharField(max_length=255, null=True, blank=True)
     image = models.ImageField(
         upload_to=get_image_upload_path,
@@ -116,52 +190,236 @@ class Diary(models.Model):
         through_fields=('diary', 'user'))
     likes_count = models.PositiveIntegerField(default=0)
     comments_count = models.PositiveIntegerField(default=0)
+    popularity_score = models.FloatField(default=0)
+    words_count = models.PositiveIntegerField(default=0)
+    # In minutes
+    reading_time = models.PositiveSmallIntegerField(default=0)
     author = models.ForeignKey(
         Profile,
         related_name='written_diaries',
         on_delete=models.CASCADE)
 
-    objects = DiaryQuerySet.as_manager()
+    objects = DiaryManager()
+    # Including the diaries flagged as deleted.
+    all_objects = DiaryQuerySet.as_manager()
+
+    # The description is derived from the content.
+    SEARCH_FIELDS = ('title', 'content')
+    # Inserts tried before giving up on finding an unused slug.
+    SLUG_ATTEMPTS = 5
+    # Fields the cached parts of the detail page are rendered from.
+    DETAIL_PARTS_FIELDS = ('content', 'image', 'author')
+    # Fields whose changes don't drop the anonymous pages cache, they're
+    # stale for ANONYMOUS_PAGE_CACHE_TIMEOUT seconds at most.
+    COUNTER_FIELDS = ('likes_count', 'comments_count')
+    # Thumbnails of the image shown by the templates, generated when it's
+    # saved.
+    THUMBNAILS = (('350x180', {'crop': 'center'}),)
+    # Fields that decide which feeling count a diary is part of.
+    FEELING_COUNT_FIELDS = ('feeling', 'is_visible', 'is_deleted')
 
     class Meta:
         verbose_name_plural = 'diaries'
         ordering = ['-created_on']
+        # Partial indexes: the queries go through Diary.objects, which
+        # leaves the deleted diaries out, so they're not indexed.
+        indexes = [
+            models.Index(
+                fields=['is_visible', '-popularity_score', '-id'],
+                name='diary_visible_popular_idx',
+                condition=Q(is_deleted=False)),
+            models.Index(
+                fields=['is_visible', '-created_on'],
+                name='diary_visible_created_idx',
+                condition=Q(is_deleted=False)),
+            models.Index(
+                fields=['author', '-created_on'],
+                name='diary_author_created_idx',
+                condition=Q(is_deleted=False)),
+            models.Index(
+                fields=['author', 'is_visible', '-created_on', '-id'],
+                name='diary_author_visible_idx',
+                condition=Q(is_deleted=False)),
+            models.Index(
+                fields=['feeling', 'is_visible', '-created_on', '-id'],
+                name='diary_feeling_created_idx',
+                condition=Q(is_deleted=False)),
+            models.Index(
+                fields=['feeling', 'is_visible', '-popularity_score', '-id'],
+                name='diary_feeling_popular_idx',
+                condition=Q(is_deleted=False)),
+            models.Index(
+                fields=['-created_on'],
+                name='diary_created_idx',
+                condition=Q(is_deleted=False)),
+            # The diaries waiting for purge_deleted_diaries.
+            models.Index(
+                fields=['id'],
+                name='diary_deleted_idx',
+                condition=Q(is_deleted=True)),
+        ]
 
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if(not self.id):
-            title_slug = slugify(self.title, allow_unicode=True)
-            new_slug = '{}'.format(title_slug)
-
-            while Diary.objects.filter(slug=new_slug).exists():
-                new_slug = '{}-{}'.format(title_slug, generate_random_string())
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Diary, cls).from_db(db, field_names, values)
+        # Keep the loaded values around so that save handlers can tell what
+        # changed (visibility for instance) without querying the database.
+        instance._loaded_values = dict(zip(field_names, values))
+        if set(cls.FEELING_COUNT_FIELDS) <= set(field_names):
+            instance._loaded_values['counted_feeling'] = (
+                instance.counted_feeling)
+        return instance
 
-            self.slug = new_slug
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding:
+            self.slug = self.get_available_slug()
 
         # self.description is supposed to be plain text so that it's displayed
-        # in the diary list page
-        start_length = 500
-        total_position = len(self.content)
-        text_description = bleach.clean(
-            self.content[:start_length],
-            strip=True,
-            tags=[],
-            attributes=[]
-        ).strip()
-        # If 500 non-clean characters is not enough, add 50 every time
-        while len(text_description) < 245 & start_length < total_position:
-            text_description += bleach.clean(
-                self.content[start_length:start_length + 50],
-                strip=True,
-                tags=[],
-                attributes=[]
-            ).strip()
-            start_length += 50
-        self.description = text_description[:255]
-
-        return super(Diary, self).save(*args, **kwargs)
+        # in the diary list page. The content is only parsed (once, in full)
+        # when it changed.
+        update_fields = kwargs.get('update_fields')
+        changed_fields = self.get_changed_fields(
+            self.SEARCH_FIELDS, update_fields)
+        text = None
+        if 'content' in changed_fields:
+            text, self.words_count = extract_text(self.content)
+            # Forms and serializers sanitized it already, the sanitizer
+            # remembers it and returns it as is then.
+            self.content = sanitize_rich_text(self.content)
+            self.description = text[:255]
+            self.reading_time = get_reading_time(self.words_count)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {
+                    'description', 'words_count', 'reading_time'}
+
+        # Counters are F() expressions when they're incremented in place,
+        # update_popularity_score() takes care of the score then.
+        counters = (self.likes_count, self.comments_count)
+        if not any(hasattr(c, 'resolve_expression') for c in counters):
+            self.popularity_score = self.get_popularity_score()
+
+        # The save handlers update the timelines and the author counters,
+        # they should succeed or fail with the diary, so does its search
+        # document.
+        using = kwargs.get('using') or 'default'
+        with transaction.atomic(using=using):
+            if adding:
+                result = self._insert_with_available_slug(*args, **kwargs)
+            else:
+                result = super(Diary, self).save(*args, **kwargs)
+            if changed_fields:
+                search.index_diary(self, using=using, text=text)
+                DiaryRevision.objects.using(using).record(self)
+        loaded_values = getattr(self, '_loaded_values', {})
+        for field in self.SEARCH_FIELDS:
+            # Not getattr(), that would load deferred fields and decompress
+            # the content.
+            if field in self.__dict__:
+                loaded_values[field] = self.__dict__[field]
+        self._loaded_values = loaded_values
+        return result
+
+    def get_base_slug(self):
+        return slugify(self.title, allow_unicode=True) or 'diary'
+
+    def get_available_slug(self):
+        """The slug of the title if no diary has it yet, otherwise the slug
+           followed by a random suffix. Costs one query.
+        """
+        base_slug = self.get_base_slug()
+        # The deleted diaries keep their slug until they're purged.
+        if Diary.all_objects.filter(slug=base_slug).exists():
+            return '{}-{}'.format(base_slug, generate_random_string())
+        return base_slug
+
+    def _insert_with_available_slug(self, *args, **kwargs):
+        """Inserts the diary, another one may have taken its slug since it
+           was picked: the unique index rejects the insert and it's retried
+           with a new random suffix.
+        """
+        using = kwargs.get('using') or 'default'
+        for attempt in range(self.SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic(using=using):
+                    return super(Diary, self).save(*args, **kwargs)
+            except IntegrityError:
+                slug_taken = Diary.all_objects.using(using).filter(
+                    slug=self.slug).exists()
+                if not slug_taken or attempt == self.SLUG_ATTEMPTS - 1:
+                    raise
+                self.slug = '{}-{}'.format(
+                    self.get_base_slug(), generate_random_string())
+
+    def get_changed_fields(self, fields, update_fields=None):
+        """Returns the set of fields that changed since the diary was
+           loaded (all of them for a new diary)
+        """
+        if update_fields is not None:
+            return set(update_fields) & set(fields)
+        loaded_values = getattr(self, '_loaded_values', {})
+        changed_fields = set()
+        for field in fields:
+            if field not in loaded_values:
+                changed_fields.add(field)
+                continue
+            loaded_value = loaded_values[field]
+            # The content wasn't even read (nor decompressed).
+            if self.__dict__.get(field) is loaded_value:
+                continue
+            if isinstance(loaded_value, CompressedText):
+                loaded_value = loaded_value.decompress()
+            if loaded_value != getattr(self, field):
+                changed_fields.add(field)
+        return changed_fields
+
+    @property
+    def counted_feeling(self):
+        """The feeling whose count includes the diary: only the public
+           diaries with a feeling are counted (the API may save it blank)
+        """
+        if self.is_visible != Diary.ALL_CHOICE or self.is_deleted:
+            return None
+        return self.feeling or None
+
+    def get_popularity_score(self, now=None):
+        return get_popularity_score(
+            self.likes_count + self.comments_count,
+            self.created_on,
+            now)
+
+    def update_popularity_score(self):
+        """Recomputes the score from the stored counters and saves it"""
+        self.refresh_from_db(fields=['likes_count', 'comments_count'])
+        self.popularity_score = self.get_popularity_score()
+        Diary.objects.filter(pk=self.pk).update(
+            popularity_score=self.popularity_score)
+
+    def soft_delete(self):
+        """Flags the diary as deleted, it's left out of every query from
+           then on. purge_deleted_diaries deletes it later, with its images,
+           likes, comments and notifications.
+        """
+        if self.is_deleted:
+            return
+        self.is_deleted = True
+        self.save(update_fields=['is_deleted'])
+
+    def restore_revision(self, number):
+        """Saves the title and content of the revision number of the diary
+           back, as a new revision. Returns the new revision, or None if the
+           diary already had that title and content.
+        """
+        revision, content = DiaryRevision.objects.get_version(self, number)
+        if self.title == revision.title and self.content == content:
+            return None
+        self.title = revision.title
+        self.content = content
+        self.save()
+        return self.revisions.first()
 
     def get_absolute_url(self):
         return reverse(
@@ -169,10 +427,411 @@ class Diary(models.Model):
             kwargs={'diary_slug': self.slug})
 
 
+class TimelineEntryQuerySet(models.QuerySet):
+    BATCH_SIZE = 1000
+
+    def _add_entries(self, profile_ids, diary_rows):
+        """Creates an entry for every (profile, diary) pair, diary_rows being
+           (diary_id, created_on) tuples. Existing entries are left untouched.
+        """
+        entries = []
+        for profile_id in profile_ids:
+            for diary_id, created_on in diary_rows:
+                entries.append(TimelineEntry(
+                    profile_id=profile_id,
+                    diary_id=diary_id,
+                    created_on=created_on))
+                if len(entries) >= self.BATCH_SIZE:
+                    self.bulk_create(entries, ignore_conflicts=True)
+                    entries = []
+        if entries:
+            self.bulk_create(entries, ignore_conflicts=True)
+
+    def fan_out(self, diary):
+        """Pushes diary to the timeline of its author, and to the timelines
+           of his followers if the diary is public.
+        """
+        profile_ids = [diary.author_id]
+        if diary.is_visible == Diary.ALL_CHOICE:
+            # profile.followers rows go from the followed profile to the
+            # follower.
+            followers = Profile.followers.through.objects.filter(
+                from_profile_id=diary.author_id)
+            profile_ids += followers.values_list('to_profile_id', flat=True)
+        self._add_entries(profile_ids, [(diary.id, diary.created_on)])
+
+    def retract(self, diary):
+        """Removes diary from every timeline but its author's"""
+        self.filter(diary=diary).exclude(profile_id=diary.author_id).delete()
+
+    def follow(self, follower_id, author_id):
+        """Pushes the public diaries of author to the follower timeline"""
+        diaries = Diary.objects.filter(
+            author_id=author_id,
+            is_visible=Diary.ALL_CHOICE).order_by()
+        diary_rows = diaries.values_list('id', 'created_on').iterator()
+        self._add_entries([follower_id], diary_rows)
+
+    def unfollow(self, follower_id, author_id):
+        """Removes the diaries of author from the follower timeline"""
+        self.filter(
+            profile_id=follower_id,
+            diary__author_id=author_id).delete()
+
+    def rebuild(self, profile):
+        """Recomputes the whole timeline of profile from the diaries table"""
+        self.filter(profile=profile).delete()
+        own_diaries = Diary.objects.filter(author=profile).order_by()
+        self._add_entries(
+            [profile.id],
+            own_diaries.values_list('id', 'created_on').iterator())
+        followed_diaries = Diary.objects.by_followed_profiles(profile)
+        self._add_entries(
+            [profile.id],
+            followed_diaries.order_by().values_list(
+                'id', 'created_on').iterator())
+
+
+class TimelineEntry(models.Model):
+    """A diary that should appear in the home feed of a profile.
+
+       Entries are written when diaries are published or change visibility
+       and when profiles follow each other, so that reading a home feed is a
+       range scan over the (profile, created_on) index.
+    """
+    profile = models.ForeignKey(
+        Profile,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries')
+    diary = models.ForeignKey(
+        Diary,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries')
+    # Copy of diary.created_on so that the feed is ordered by the index.
+    created_on = models.DateTimeField()
+
+    objects = TimelineEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'timeline entries'
+        unique_together = ['profile', 'diary']
+        indexes = [models.Index(fields=['profile', '-created_on'])]
+
+    def __str__(self):
+        return '{} : {}'.format(self.profile, self.diary)
+
+
+class DiaryRevisionQuerySet(models.QuerySet):
+
+    def get_chain(self, diary, number=None):
+        """Returns the revisions needed to rebuild the revision number of
+           diary (the latest one if None), in order: the last snapshot up to
+           it and the deltas after it. Costs one query.
+        """
+        qs = self.filter(diary=diary)
+        if number is not None:
+            qs = qs.filter(number__lte=number)
+        snapshots = qs.filter(is_snapshot=True).order_by('-number')
+        qs = qs.filter(number__gte=Subquery(snapshots.values('number')[:1]))
+        return list(qs.order_by('number'))
+
+    def get_version(self, diary, number=None):
+        """Returns the revision number of diary (the latest one if None) and
+           its content. Raises DiaryRevision.DoesNotExist if there's none.
+        """
+        chain = self.get_chain(diary, number)
+        if not chain or number not in (None, chain[-1].number):
+            raise DiaryRevision.DoesNotExist
+        content = None
+        for revision in chain:
+            content = revision.get_content(content)
+        return chain[-1], content
+
+    def record(self, diary):
+        """Creates the revision of the current title and content of diary, a
+           snapshot every DIARY_REVISION_SNAPSHOT_INTERVAL revisions and a
+           delta against the previous revision otherwise. The diary row is
+           locked first so that concurrent saves of the diary number their
+           revisions one after the other.
+        """
+        with transaction.atomic(using=self.db):
+            list(Diary.all_objects.using(self.db).select_for_update().filter(
+                pk=diary.pk).values_list('pk'))
+            chain = self.get_chain(diary)
+            revision = DiaryRevision(
+                diary=diary,
+                number=chain[-1].number + 1 if chain else 1,
+                title=diary.title)
+            interval = settings.DIARY_REVISION_SNAPSHOT_INTERVAL
+            if chain and len(chain) < interval:
+                previous = None
+                for previous_revision in chain:
+                    previous = previous_revision.get_content(previous)
+                revision.data = revisions.encode_delta(
+                    previous, diary.content)
+            else:
+                revision.is_snapshot = True
+                revision.data = revisions.encode_snapshot(diary.content)
+            revision.save(using=self.db)
+        return revision
+
+
+class DiaryRevision(models.Model):
+    """A version of the title and content of a diary, written every time
+       one of them changes. The content is stored as a delta against the
+       previous revision, or in full every DIARY_REVISION_SNAPSHOT_INTERVAL
+       revisions so that any version is rebuilt from a bounded number of
+       revisions (see revisions.py).
+    """
+    diary = models.ForeignKey(
+        Diary,
+        on_delete=models.CASCADE,
+        related_name='revisions')
+    number = models.PositiveIntegerField()
+    title = models.CharField(max_length=255)
+    is_snapshot = models.BooleanField(default=False)
+    data = models.BinaryField()
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    objects = DiaryRevisionQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ['diary', 'number']
+        ordering = ['-number']
+
+    def __str__(self):
+        return '{} (revision {})'.format(self.diary, self.number)
+
+    def get_content(self, previous=None):
+        """Returns the content of the revision, previous being the content
+           of the revision before it (unused by snapshots)
+        """
+        if self.is_snapshot:
+            return revisions.decode(self.data)
+        return revisions.decode(self.data, previous)
+
+
+class DiaryFeelingCountQuerySet(models.QuerySet):
+
+    def get_counts(self):
+        """Returns the number of public diaries of every feeling"""
+        counts = dict.fromkeys(dict(Diary.FEELINGS_CHOICES), 0)
+        counts.update(self.values_list('feeling', 'count'))
+        return counts
+
+    def add(self, feeling, delta):
+        """Adds delta to the count of feeling. The count doesn't go below 0:
+           it may have drifted (bulk_create doesn't send the signals) and
+           a diary delete mustn't fail on it.
+        """
+        qs = self.filter(feeling=feeling)
+        count = Greatest(F('count') + delta, 0)
+        if qs.update(count=count):
+            return
+        feeling_count, created = self.get_or_create(
+            feeling=feeling,
+            defaults={'count': max(delta, 0)})
+        if not created:
+            qs.update(count=count)
+
+    def refresh(self):
+        """Recounts the public diaries of every feeling"""
+        qs = Diary.objects.filter(
+            is_visible=Diary.ALL_CHOICE,
+            feeling__isnull=False).exclude(feeling='')
+        qs = qs.values_list('feeling').annotate(count=Count('id'))
+        counts = [
+            self.model(feeling=feeling, count=count)
+            for feeling, count in qs.order_by()]
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            self.bulk_create(counts)
+        return counts
+
+
+class DiaryFeelingCount(models.Model):
+    """The number of public diaries of a feeling, kept up to date by the
+       save and delete handlers of the diaries so that the feed filters
+       show them without counting the diaries.
+    """
+    feeling = models.CharField(
+        max_length=15,
+        choices=Diary.FEELINGS_CHOICES,
+        unique=True)
+    count = models.PositiveIntegerField(default=0)
+
+    objects = DiaryFeelingCountQuerySet.as_manager()
+
+    def __str__(self):
+        return '{}: {}'.format(self.get_feeling_display(), self.count)
+
+
+@receiver(post_save, sender=Diary)
+def diary_visibility_handler(sender, instance, created, **kwargs):
+    """Updates the timelines and the author counters when a diary is
+       published or changes visibility.
+    """
+    loaded_values = getattr(instance, '_loaded_values', {})
+    is_public = instance.is_visible == Diary.ALL_CHOICE
+    author = Profile.objects.filter(pk=instance.author_id)
+    if created:
+        TimelineEntry.objects.fan_out(instance)
+        author.update(
+            written_diaries_count=F('written_diaries_count') + 1,
+            visible_written_diaries_count=(
+                F('visible_written_diaries_count') + int(is_public)))
+    elif loaded_values.get('is_visible') != instance.is_visible:
+        if is_public:
+            TimelineEntry.objects.fan_out(instance)
+        else:
+            TimelineEntry.objects.retract(instance)
+        if 'is_visible' in loaded_values:
+            # Floored: the counter may be off (a missed signal) and mustn't
+            # fail the save.
+            author.update(
+                visible_written_diaries_count=Greatest(
+                    F('visible_written_diaries_count') +
+                    (1 if is_public else -1), 0))
+        else:
+            # The previous visibility wasn't loaded, recount.
+            author.refresh_counters()
+    loaded_values['is_visible'] = instance.is_visible
+    instance._loaded_values = loaded_values
+
+
+@receiver(post_save, sender=Diary)
+def diary_detail_cache_handler(sender, instance, created, update_fields,
+                               **kwargs):
+    # The cached detail page parts are keyed on updated_on, drop those of the
+    # previous version.
+    loaded_values = getattr(instance, '_loaded_values', {})
+    if update_fields is not None:
+        if not set(update_fields) & set(Diary.DETAIL_PARTS_FIELDS):
+            return
+    if loaded_values.get('updated_on') is not None:
+        delete_detail_parts(instance.id, loaded_values['updated_on'])
+    loaded_values['updated_on'] = instance.updated_on
+    instance._loaded_values = loaded_values
+
+
+@receiver(post_delete, sender=Diary)
+def diary_detail_cache_delete_handler(sender, instance, **kwargs):
+    delete_detail_parts(instance.id, instance.updated_on)
+
+
+def remove_from_author_counters(diary):
+    # Floored at 0, like the feeling counts: a counter that is off mustn't
+    # fail the delete.
+    is_public = diary.is_visible == Diary.ALL_CHOICE
+    Profile.objects.filter(pk=diary.author_id).update(
+        written_diaries_count=Greatest(F('written_diaries_count') - 1, 0),
+        visible_written_diaries_count=Greatest(
+            F('visible_written_diaries_count') - int(is_public), 0))
+
+
+@receiver(post_save, sender=Diary)
+def diary_soft_delete_handler(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'is_deleted' not in update_fields:
+        return
+    if instance.is_deleted:
+        remove_from_author_counters(instance)
+
+
+@receiver(post_save, sender=Diary)
+def diary_feeling_count_handler(sender, instance, created, update_fields,
+                                **kwargs):
+    if update_fields is not None:
+        if not set(update_fields) & set(Diary.FEELING_COUNT_FIELDS):
+            return
+    loaded_values = getattr(instance, '_loaded_values', {})
+    counted_feeling = instance.counted_feeling
+    if created:
+        previous_feeling = None
+    elif 'counted_feeling' in loaded_values:
+        previous_feeling = loaded_values['counted_feeling']
+    else:
+        # The previous feeling and visibility weren't loaded, recount.
+        DiaryFeelingCount.objects.refresh()
+        previous_feeling = counted_feeling
+    if previous_feeling != counted_feeling:
+        if previous_feeling is not None:
+            DiaryFeelingCount.objects.add(previous_feeling, -1)
+        if counted_feeling is not None:
+            DiaryFeelingCount.objects.add(counted_feeling, 1)
+    loaded_values['counted_feeling'] = counted_feeling
+    instance._loaded_values = loaded_values
+
+
+@receiver(post_delete, sender=Diary)
+def diary_feeling_count_delete_handler(sender, instance, **kwargs):
+    # Soft deleted diaries left their count when they were flagged.
+    if instance.counted_feeling is not None:
+        DiaryFeelingCount.objects.add(instance.counted_feeling, -1)
+
+
+@receiver(post_delete, sender=Diary)
+def diary_counters_delete_handler(sender, instance, **kwargs):
+    # Soft deleted diaries left the counters when they were flagged.
+    if not instance.is_deleted:
+        remove_from_author_counters(instance)
+
+
+@receiver(m2m_changed, sender=Profile.followers.through)
+def followers_timeline_handler(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    # profile.followers.add(follower) is sent with the followed profile as
+    # instance, follower.followed_profiles.add(profile) with the follower.
+    if action == 'post_add':
+        for pk in pk_set:
+            if reverse:
+                TimelineEntry.objects.follow(instance.pk, pk)
+            else:
+                TimelineEntry.objects.follow(pk, instance.pk)
+    elif action == 'post_remove':
+        for pk in pk_set:
+            if reverse:
+                TimelineEntry.objects.unfollow(instance.pk, pk)
+            else:
+                TimelineEntry.objects.unfollow(pk, instance.pk)
+    elif action == 'post_clear':
+        if reverse:
+            qs = TimelineEntry.objects.filter(profile=instance)
+            qs = qs.exclude(diary__author=instance)
+        else:
+            qs = TimelineEntry.objects.filter(diary__author=instance)
+            qs = qs.exclude(profile=instance)
+        qs.delete()
+
+
+@receiver(post_save, sender=Diary)
+def diary_thumbnails_handler(sender, instance, created, update_fields,
+                             **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    loaded_values = getattr(instance, '_loaded_values', {})
+    if created or loaded_values.get('image') != instance.image.name:
+        schedule_thumbnails(instance.image, Diary.THUMBNAILS)
+    loaded_values['image'] = instance.image.name
+    instance._loaded_values = loaded_values
+
+
+@receiver(post_delete, sender=Diary)
+def diary_search_delete_handler(sender, instance, using, **kwargs):
+    search.unindex_diary(instance.id, using=using)
+
+
 @receiver(post_delete, sender=Diary)
 def diary_pictures_delete(sender, instance, **kwargs):
-    instance.image.delete(False)
-    delete_ckeditor_rich_text_images(instance.content)
+    # Once the delete is committed: a rolled back delete keeps its pictures,
+    # and a picture that can't be deleted doesn't roll the delete back.
+    image_name = instance.image.name
+    content = instance.content
+
+    def delete_pictures():
+        delete_media_files(image_name)
+        delete_ckeditor_rich_text_images(content)
+
+    transaction.on_commit(delete_pictures)
 
 
 class DiaryLike(models.Model):
@@ -260,3 +919,18 @@ def comment_create_handler(sender, instance, created, **kwargs):
 def delete_notifications_when_diary_is_deleted(sender, instance, **kwargs):
     qs = Notification.objects.filter(target_object_id=instance.id)
     qs.delete()
+
+
+@receiver(post_save, sender=Diary)
+def diary_page_cache_handler(sender, instance, update_fields, **kwargs):
+    if update_fields is not None:
+        if set(update_fields) <= set(Diary.COUNTER_FIELDS):
+            return
+    invalidate_anonymous_pages()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Diary)
+@receiver(post_delete, sender=Comment)
+def page_cache_handler(sender, instance, **kwargs):
+    invalidate_anonymous_pages()
@@ -0,0 +1,91 @@
+"""Cached rendering of the parts of the diary pages and cards that are the
+   same for every viewer: the images and author thumbnails, whose urls can
+   cost a request to the storage, the author links and the content. They're
+   cached under the id and the last update time of the diary and depend on
+   the card_version of its author, so that editing either renders them
+   again.
+   The templates render the viewer specific bits (like state, counters, edit
+   buttons, comment form, relative dates) around them.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.utils import count_cache_access
+
+DETAIL_PARTS_CACHE_KEY = 'diaries:detail:{}:{}'
+CARD_PARTS_CACHE_KEY = 'diaries:card:{}:{}:{}'
+
+DETAIL_PARTS_TEMPLATES = {
+    'image': 'diaries/snippets/diary_detail_image.html',
+    'author_image': 'diaries/snippets/diary_detail_author_image.html',
+    'content': 'diaries/snippets/diary_detail_content.html',
+}
+CARD_PARTS_TEMPLATES = {
+    'author_image': 'diaries/snippets/diary_card_author_image.html',
+    'author_link': 'diaries/snippets/diary_card_author_link.html',
+    'image': 'diaries/snippets/diary_card_image.html',
+}
+
+
+def get_detail_parts_cache_key(diary_id, updated_on):
+    return DETAIL_PARTS_CACHE_KEY.format(diary_id, updated_on.timestamp())
+
+
+def get_card_parts_cache_key(diary):
+    return CARD_PARTS_CACHE_KEY.format(
+        diary.id, diary.updated_on.timestamp(), diary.author.card_version)
+
+
+def render_parts(templates, diary):
+    return {
+        name: render_to_string(template_name, {'diary': diary})
+        for name, template_name in templates.items()}
+
+
+def mark_parts_safe(parts):
+    return {name: mark_safe(html) for name, html in parts.items()}
+
+
+def get_detail_parts(diary):
+    """Returns the rendered viewer independent parts of diary's page"""
+    key = get_detail_parts_cache_key(diary.id, diary.updated_on)
+    author_version = diary.author.card_version
+    cached = cache.get(key)
+    # The author version is stored with the parts rather than in the key so
+    # that the parts can be deleted without loading the author.
+    if cached is None or cached['author_version'] != author_version:
+        count_cache_access('diary_detail', misses=1)
+        cached = {
+            'author_version': author_version,
+            'parts': render_parts(DETAIL_PARTS_TEMPLATES, diary),
+        }
+        cache.set(key, cached, settings.DIARY_DETAIL_CACHE_TIMEOUT)
+    else:
+        count_cache_access('diary_detail', hits=1)
+    return mark_parts_safe(cached['parts'])
+
+
+def delete_detail_parts(diary_id, updated_on):
+    cache.delete(get_detail_parts_cache_key(diary_id, updated_on))
+
+
+def get_cards_parts(diaries):
+    """Returns the rendered viewer independent parts of the cards of
+       diaries, fetched from the cache together.
+    """
+    keys = [get_card_parts_cache_key(diary) for diary in diaries]
+    cached = cache.get_many(keys)
+    missing = {}
+    cards_parts = []
+    for key, diary in zip(keys, diaries):
+        parts = cached.get(key)
+        if parts is None:
+            parts = missing[key] = render_parts(CARD_PARTS_TEMPLATES, diary)
+        cards_parts.append(mark_parts_safe(parts))
+    if missing:
+        cache.set_many(missing, settings.DIARY_CARD_CACHE_TIMEOUT)
+    count_cache_access(
+        'diary_card', hits=len(keys) - len(missing), misses=len(missing))
+    return cards_parts
@@ -0,0 +1,65 @@
+"""Encoding of the diary revisions. A revision is either a snapshot, the
+   zlib compressed content, or a delta against the content of the previous
+   revision: the list of its operations, a [start, end] pair copying a range
+   of the previous content or a string inserting new text, JSON encoded then
+   zlib compressed.
+   The contents are diffed by tokens (tags, words and whitespace) so that
+   diffing a large diary stays cheap.
+"""
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+
+TOKEN_RE = re.compile(r'<[^>]*>|[^<\s]+|\s+|<')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text)
+
+
+def make_delta(previous, content):
+    previous_tokens = tokenize(previous)
+    tokens = tokenize(content)
+    offsets = [0]
+    for token in previous_tokens:
+        offsets.append(offsets[-1] + len(token))
+
+    operations = []
+    matcher = SequenceMatcher(None, previous_tokens, tokens)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([offsets[i1], offsets[i2]])
+        elif j1 != j2:
+            text = ''.join(tokens[j1:j2])
+            if operations and isinstance(operations[-1], str):
+                operations[-1] += text
+            else:
+                operations.append(text)
+    return operations
+
+
+def apply_delta(previous, operations):
+    return ''.join(
+        previous[op[0]:op[1]] if isinstance(op, list) else op
+        for op in operations)
+
+
+def encode_snapshot(content):
+    return zlib.compress(content.encode('utf-8'))
+
+
+def encode_delta(previous, content):
+    operations = make_delta(previous, content)
+    data = json.dumps(operations, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(data.encode('utf-8'))
+
+
+def decode(data, previous=None):
+    """Returns the content of a revision, previous being the content of the
+       revision before it when data is a delta
+    """
+    data = zlib.decompress(bytes(data)).decode('utf-8')
+    if previous is None:
+        return data
+    return apply_delta(previous, json.loads(data))
@@ -0,0 +1,93 @@
+"""Sanitization of the diaries rich text, shared by DiaryForm, the API
+   serializers and Diary.save() so that the content rendered with |safe
+   always went through the same allow-list. The cleaner is built once per
+   thread (its html5lib parser isn't thread safe), and the digests of the
+   latest sanitized contents are remembered so that a content that comes
+   back unchanged (the form then the save of the same diary) isn't parsed
+   again. The digests are SHA-256: a content colliding with a sanitized one
+   would be rendered without being sanitized.
+"""
+import hashlib
+from collections import OrderedDict
+from threading import Lock, local
+
+from bleach.sanitizer import Cleaner
+
+RICH_TEXT_TAGS = [
+    'p', 'u', 's', 'i', 'b', 'a', 'sub', 'sup', 'img', 'div',
+    'ul', 'li', 'ol', 'em', 'strong', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'pre', 'address', 'caption'
+]
+RICH_TEXT_ATTRIBUTES = {
+    'a': ['href', 'target'],
+    'img': ['src', 'style', 'alt'],
+}
+RICH_TEXT_STYLES = ['height', 'width']
+RICH_TEXT_PROTOCOLS = ['http', 'https', 'mailto']
+
+# Number of sanitized contents digests remembered.
+MEMO_SIZE = 1024
+
+_cleaners = local()
+
+
+def get_rich_text_cleaner():
+    cleaner = getattr(_cleaners, 'rich_text', None)
+    if cleaner is None:
+        cleaner = Cleaner(
+            tags=RICH_TEXT_TAGS,
+            attributes=RICH_TEXT_ATTRIBUTES,
+            styles=RICH_TEXT_STYLES,
+            protocols=RICH_TEXT_PROTOCOLS
+        )
+        _cleaners.rich_text = cleaner
+    return cleaner
+
+
+class SanitizedMemo:
+    """Bounded set of the digests of sanitized contents, the least recently
+       seen are forgotten first.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._digests = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def get_digest(content):
+        return hashlib.sha256(content.encode('utf-8')).digest()
+
+    def __contains__(self, digest):
+        with self._lock:
+            if digest in self._digests:
+                self._digests.move_to_end(digest)
+                return True
+            return False
+
+    def add(self, digest):
+        with self._lock:
+            self._digests[digest] = None
+            self._digests.move_to_end(digest)
+            if len(self._digests) > self.size:
+                self._digests.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._digests.clear()
+
+
+sanitized_memo = SanitizedMemo(MEMO_SIZE)
+
+
+def sanitize_rich_text(content):
+    """Returns content with only the allowed tags, attributes, styles and
+       protocols left.
+    """
+    digest = sanitized_memo.get_digest(content)
+    if digest in sanitized_memo:
+        return content
+    sanitized = get_rich_text_cleaner().clean(content)
+    if sanitized != content:
+        digest = sanitized_memo.get_digest(sanitized)
+    sanitized_memo.add(digest)
+    return sanitized
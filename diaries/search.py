@@ -0,0 +1,121 @@
+"""Full text search over the title, description and plain text content of
+   diaries. PostgreSQL keeps a weighted tsvector in diaries_diary.search_vector
+   behind a GIN index, SQLite an FTS5 table (diaries_diary_fts) whose rowid is
+   the diary id. Both are created by the 0012_diary_full_text_search migration
+   (the existing diaries are indexed by 0022_diary_search_documents) and kept
+   up to date by Diary.save(); other databases fall back to unindexed
+   icontains lookups.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+from .utils import get_plain_text
+
+FTS_TABLE = 'diaries_diary_fts'
+
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+    "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+    "setweight(to_tsvector(%s::regconfig, %s), 'C')"
+)
+
+
+def get_vendor(using):
+    return connections[using].vendor
+
+
+def get_fts_query(q):
+    """Quotes every word of q so that FTS5 matches the diaries containing all
+       of them, whatever the operators and punctuation they hold.
+    """
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""')) for word in q.split())
+
+
+def get_document(diary, text=None):
+    if text is None:
+        text = get_plain_text(diary.content)
+    return (diary.title, diary.description or '', text)
+
+
+def index_diary(diary, using='default', text=None):
+    """Writes the search document of diary, text being the plain text of
+       its content when it's already extracted
+    """
+    title, description, body = get_document(diary, text)
+    vendor = get_vendor(using)
+    with connections[using].cursor() as cursor:
+        if vendor == 'postgresql':
+            config = settings.DIARY_SEARCH_CONFIG
+            cursor.execute(
+                'UPDATE diaries_diary SET search_vector = {} '
+                'WHERE id = %s'.format(PG_SEARCH_VECTOR),
+                [config, title, config, description, config, body, diary.id])
+        elif vendor == 'sqlite':
+            cursor.execute(
+                'DELETE FROM {} WHERE rowid = %s'.format(FTS_TABLE),
+                [diary.id])
+            cursor.execute(
+                'INSERT INTO {} (rowid, title, description, body) '
+                'VALUES (%s, %s, %s, %s)'.format(FTS_TABLE),
+                [diary.id, title, description, body])
+
+
+def unindex_diary(diary_id, using='default'):
+    if get_vendor(using) == 'sqlite':
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {} WHERE rowid = %s'.format(FTS_TABLE),
+                [diary_id])
+
+
+def search(qs, q):
+    """Filters qs down to the diaries matching q, ordered by relevance
+       (annotated as search_rank, higher is better).
+    """
+    vendor = get_vendor(qs.db)
+    if vendor == 'postgresql':
+        config = settings.DIARY_SEARCH_CONFIG
+        qs = qs.extra(
+            select={'search_rank': (
+                'ts_rank(diaries_diary.search_vector, '
+                'plainto_tsquery(%s::regconfig, %s))')},
+            select_params=[config, q],
+            where=[
+                'diaries_diary.search_vector @@ '
+                'plainto_tsquery(%s::regconfig, %s)'],
+            params=[config, q])
+    elif vendor == 'sqlite':
+        # Joining the FTS5 table gives its bm25 rank, lower for better
+        # matches.
+        qs = qs.extra(
+            select={'search_rank': '-{}.rank'.format(FTS_TABLE)},
+            tables=[FTS_TABLE],
+            where=[
+                '{}.rowid = diaries_diary.id'.format(FTS_TABLE),
+                '{} MATCH %s'.format(FTS_TABLE)],
+            params=[get_fts_query(q)])
+    else:
+        # The content is stored compressed, it can't be searched in SQL.
+        return qs.filter(
+            Q(title__icontains=q) | Q(description__icontains=q))
+    return qs.order_by('-search_rank', '-id')
+
+
+def reindex(queryset, chunk_size=500):
+    """Rewrites the search documents of the diaries of queryset. Returns the
+       number of indexed diaries.
+    """
+    indexed = 0
+    last_pk = 0
+    queryset = queryset.order_by('pk')
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        for diary in chunk:
+            index_diary(diary, using=queryset.db)
+        indexed += len(chunk)
+        last_pk = chunk[-1].pk
+    return indexed
@@ -0,0 +1,25 @@
+from django import template
+
+from ..rendering import get_cards_parts
+
+register = template.Library()
+
+
+@register.simple_tag
+def load_cards_parts(diaries):
+    """Fetches the cached parts of the cards of diaries at once and attaches
+       them to the diaries for diary_card_parts.
+    """
+    diaries = list(diaries)
+    for diary, parts in zip(diaries, get_cards_parts(diaries)):
+        diary.card_parts = parts
+    return ''
+
+
+@register.simple_tag
+def diary_card_parts(diary):
+    """Returns the cached parts of the card of diary"""
+    parts = getattr(diary, 'card_parts', None)
+    if parts is None:
+        parts = get_cards_parts([diary])[0]
+    return parts
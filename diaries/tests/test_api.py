@@ -0,0 +1,267 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Profile
+from ..models import Diary
+
+
+class DiaryListCursorPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        get_user_model().objects.create_user(
+            username='user1',
+            email='user1@example.com',
+            password='user1pass'  # -_-
+        )
+        cls.profile1 = Profile.objects.get(id=1)
+        cls.diaries = []
+        for i in range(20):
+            cls.diaries.append(Diary.objects.create(
+                title=f'Diary N° {i + 1}',
+                content=f'Content of diary N° {i + 1}',
+                likes_count=i % 4,
+                author=cls.profile1))
+        cls.LIST_URL = reverse('diaries_api:diary_list')
+
+    def walk(self, url):
+        slugs = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            slugs += [diary['slug'] for diary in response.data['results']]
+            url = response.data['next']
+        return slugs
+
+    def test_page_number_pagination_is_the_default(self):
+        response = self.client.get(self.LIST_URL)
+        self.assertEqual(response.data['count'], 20)
+
+    def test_cursor_pages_cover_every_diary_once(self):
+        slugs = self.walk(self.LIST_URL + '?pagination=cursor')
+        expected = [d.slug for d in reversed(self.diaries)]
+        self.assertEqual(slugs, expected)
+
+    def test_cursor_pages_of_the_home_feed(self):
+        self.client.login(username='user1', password='user1pass')
+        slugs = self.walk(self.LIST_URL + '?pagination=cursor')
+        expected = [d.slug for d in reversed(self.diaries)]
+        self.assertEqual(slugs, expected)
+
+    def test_cursor_pages_of_popular_diaries(self):
+        slugs = self.walk(
+            self.LIST_URL + '?pagination=cursor&order_by=popularity')
+        expected = Diary.objects.order_by('-popularity_score', '-id')
+        self.assertEqual(slugs, [d.slug for d in expected])
+
+    def test_previous_cursor_returns_previous_page(self):
+        first_page = self.client.get(self.LIST_URL + '?pagination=cursor')
+        self.assertIsNone(first_page.data['previous'])
+
+        second_page = self.client.get(first_page.data['next'])
+        previous_page = self.client.get(second_page.data['previous'])
+        self.assertEqual(
+            previous_page.data['results'], first_page.data['results'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            self.LIST_URL + '?pagination=cursor&cursor=invalid')
+        self.assertEqual(response.status_code, 404)
+
+
+class DiarySanitizationAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+
+    def test_created_and_updated_content_is_sanitized(self):
+        self.client.force_login(DiarySanitizationAPITest.user)
+        response = self.client.post(reverse('diaries_api:diary_list'), {
+            'title': 'API diary',
+            'content': '<p>hi</p><script>alert(1)</script>',
+            'is_visible': Diary.ALL_CHOICE,
+            'is_commentable': Diary.ALL_CHOICE,
+            'feeling': Diary.EXCITED_FEELING,
+        })
+        self.assertEqual(response.status_code, 201)
+        diary = Diary.objects.get(title='API diary')
+        self.assertEqual(
+            diary.content, '<p>hi</p>&lt;script&gt;alert(1)&lt;/script&gt;')
+
+        response = self.client.patch(
+            reverse('diaries_api:diary_detail', args=[diary.slug]),
+            '{"content": "<p onclick=\\"x()\\">bye</p>"}',
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        diary.refresh_from_db()
+        self.assertEqual(diary.content, '<p>bye</p>')
+
+
+class DiaryRevisionAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_model = get_user_model()
+        cls.user1 = user_model.objects.create_user(
+            username='user1',
+            password='user1pass')
+        cls.user2 = user_model.objects.create_user(
+            username='user2',
+            password='user2pass')
+        cls.diary = Diary.objects.create(
+            title='First title',
+            content='<p>First content</p>',
+            author=cls.user1.profile)
+        cls.diary.title = 'Second title'
+        cls.diary.content = '<p>Second content</p>'
+        cls.diary.save()
+
+    def test_list_revisions(self):
+        self.client.force_login(DiaryRevisionAPITest.user1)
+        response = self.client.get(reverse(
+            'diaries_api:diary_revision_list', args=[self.diary.slug]))
+        self.assertEqual(response.status_code, 200)
+        numbers = [r['number'] for r in response.data['results']]
+        self.assertEqual(numbers, [2, 1])
+
+    def test_retrieve_revision(self):
+        self.client.force_login(DiaryRevisionAPITest.user1)
+        response = self.client.get(reverse(
+            'diaries_api:diary_revision_detail', args=[self.diary.slug, 1]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'First title')
+        self.assertEqual(response.data['content'], '<p>First content</p>')
+
+        response = self.client.get(reverse(
+            'diaries_api:diary_revision_detail', args=[self.diary.slug, 3]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_restore_revision(self):
+        self.client.force_login(DiaryRevisionAPITest.user1)
+        response = self.client.post(reverse(
+            'diaries_api:diary_revision_restore', args=[self.diary.slug, 1]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['number'], 3)
+        diary = Diary.objects.get(pk=self.diary.pk)
+        self.assertEqual(diary.title, 'First title')
+        self.assertEqual(diary.content, '<p>First content</p>')
+
+    def test_restore_the_current_version(self):
+        self.client.force_login(DiaryRevisionAPITest.user1)
+        response = self.client.post(reverse(
+            'diaries_api:diary_revision_restore', args=[self.diary.slug, 2]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['number'], 2)
+        self.assertEqual(self.diary.revisions.count(), 2)
+
+    def test_revisions_of_a_diary_slugged_like_a_route(self):
+        Diary.objects.filter(pk=self.diary.pk).update(slug='profiles')
+        self.client.force_login(DiaryRevisionAPITest.user1)
+        response = self.client.get(reverse(
+            'diaries_api:diary_revision_list', args=['profiles']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_revisions_are_only_available_to_the_author(self):
+        urls = [
+            reverse('diaries_api:diary_revision_list', args=[self.diary.slug]),
+            reverse(
+                'diaries_api:diary_revision_detail',
+                args=[self.diary.slug, 1]),
+        ]
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(DiaryRevisionAPITest.user2)
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.post(reverse(
+            'diaries_api:diary_revision_restore', args=[self.diary.slug, 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ProfileDiaryListAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_model = get_user_model()
+        cls.user1 = user_model.objects.create_user(
+            username='user1',
+            password='user1pass')
+        cls.user2 = user_model.objects.create_user(
+            username='user2',
+            password='user2pass')
+        cls.diaries = []
+        for i in range(12):
+            cls.diaries.append(Diary.objects.create(
+                title=f'Diary N° {i + 1}',
+                content=f'Content of diary N° {i + 1}',
+                is_visible=(
+                    Diary.NO_ONE_CHOICE if i % 4 == 0 else Diary.ALL_CHOICE),
+                author=cls.user1.profile))
+        Diary.objects.create(
+            title='Diary of user2',
+            content='Content',
+            author=cls.user2.profile)
+        cls.URL = reverse('diaries_api:profile_diary_list', args=['user1'])
+
+    def walk(self, url):
+        slugs = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            slugs += [diary['slug'] for diary in response.data['results']]
+            url = response.data['next']
+        return slugs
+
+    def test_author_pages_through_all_their_diaries(self):
+        self.client.force_login(ProfileDiaryListAPITest.user1)
+        expected = [diary.slug for diary in reversed(self.diaries)]
+        self.assertEqual(self.walk(self.URL), expected)
+
+    def test_others_page_through_public_diaries(self):
+        expected = [
+            diary.slug for diary in reversed(self.diaries)
+            if diary.is_visible == Diary.ALL_CHOICE]
+        self.assertEqual(self.walk(self.URL), expected)
+
+    def test_unknown_profile(self):
+        response = self.client.get(
+            reverse('diaries_api:profile_diary_list', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
+
+
+class DiaryFeelingAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        profile = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass').profile
+        for i in range(6):
+            Diary.objects.create(
+                title=f'Diary N° {i + 1}',
+                content=f'Content of diary N° {i + 1}',
+                feeling=Diary.HAPPY_FEELING if i % 2 else Diary.SAD_FEELING,
+                author=profile)
+
+    def test_list_is_filtered_by_feeling(self):
+        url = reverse('diaries_api:diary_list')
+        for order_by in ('', 'popularity', 'discover'):
+            response = self.client.get(
+                url, {'feeling': Diary.HAPPY_FEELING, 'order_by': order_by})
+            feelings = [d['feeling'] for d in response.data['results']]
+            self.assertEqual(feelings, [Diary.HAPPY_FEELING] * 3)
+
+        response = self.client.get(
+            reverse('diaries_api:profile_diary_list', args=['user1']),
+            {'feeling': Diary.SAD_FEELING})
+        feelings = [d['feeling'] for d in response.data['results']]
+        self.assertEqual(feelings, [Diary.SAD_FEELING] * 3)
+
+    def test_feeling_counts(self):
+        response = self.client.get(
+            reverse('diaries_api:feeling_count_list'))
+        counts = {d['feeling']: d['count'] for d in response.data}
+        self.assertEqual(counts[Diary.HAPPY_FEELING], 3)
+        self.assertEqual(counts[Diary.SAD_FEELING], 3)
+        self.assertEqual(counts[Diary.ANGRY_FEELING], 0)
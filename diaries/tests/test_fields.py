@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ..fields import CompressedText
+from ..models import Diary
+
+LONG_CONTENT = '<p>{}</p>'.format('Dear diary, ' * 500)
+
+
+class CompressedRichTextFieldTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        cls.short_diary = Diary.objects.create(
+            title='Short diary',
+            content='<p>Short</p>',
+            author=user.profile)
+        cls.long_diary = Diary.objects.create(
+            title='Long diary',
+            content=LONG_CONTENT,
+            author=user.profile)
+
+    def get_stored_content(self, diary):
+        return Diary.objects.values_list('content', flat=True).get(
+            pk=diary.pk)
+
+    def test_only_large_contents_are_compressed(self):
+        short = self.get_stored_content(self.short_diary)
+        long = self.get_stored_content(self.long_diary)
+        self.assertFalse(short.is_compressed)
+        self.assertTrue(long.is_compressed)
+        self.assertLess(len(long.data), len(LONG_CONTENT) / 10)
+        self.assertEqual(str(long), LONG_CONTENT)
+
+    def test_content_is_decompressed_when_read(self):
+        diary = Diary.objects.get(pk=CompressedRichTextFieldTest.long_diary.pk)
+        self.assertIsInstance(diary.__dict__['content'], CompressedText)
+        self.assertEqual(diary.content, LONG_CONTENT)
+        self.assertEqual(diary.__dict__['content'], LONG_CONTENT)
+
+    def test_unread_content_is_saved_as_is(self):
+        diary = Diary.objects.get(pk=CompressedRichTextFieldTest.long_diary.pk)
+        diary.feeling = Diary.HAPPY_FEELING
+        with mock.patch('diaries.fields.decompress_text') as decompress:
+            diary.save()
+        decompress.assert_not_called()
+        self.assertEqual(
+            str(self.get_stored_content(diary)), LONG_CONTENT)
+
+    def test_changed_content_is_extracted_again(self):
+        diary = Diary.objects.get(pk=CompressedRichTextFieldTest.long_diary.pk)
+        diary.content = '<p>New content</p>'
+        diary.save()
+        diary = Diary.objects.get(pk=diary.pk)
+        self.assertEqual(diary.content, '<p>New content</p>')
+        self.assertEqual(diary.description, 'New content')
@@ -1,8 +1,26 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import F
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from notifications.models import Notification
 
-from ..models import Diary
+from .. import revisions
+from ..models import (
+    Comment, Diary, DiaryFeelingCount, DiaryLike, DiaryRevision,
+    TimelineEntry)
 from accounts.models import Profile
+from core.thumbnails import generate_thumbnails
+from sorl.thumbnail import default as thumbnail_default
 
 
 class DiaryModelTest(TestCase):
@@ -61,6 +79,26 @@ class DiaryModelTest(TestCase):
         duplicate_slug_regex = r'يومية-للاختبار\-[a-zA-Z0-9_-]{10}'
         self.assertRegex(second_diary.slug, duplicate_slug_regex)
 
+    def test_slug_taken_concurrently_is_replaced(self):
+        Diary.objects.create(
+            title='Race', content='test content',
+            author=DiaryModelTest.profile)
+        diary = Diary(
+            title='Race', content='test content',
+            author=DiaryModelTest.profile)
+        # As if another worker inserted the slug after it was picked.
+        with mock.patch.object(
+                Diary, 'get_available_slug', return_value='race'):
+            diary.save()
+        self.assertRegex(diary.slug, r'race\-[a-zA-Z0-9_-]{10}')
+        self.assertEqual(Diary.objects.filter(title='Race').count(), 2)
+
+    def test_diary_with_an_empty_slug_title_gets_a_slug(self):
+        diary = Diary.objects.create(
+            title='!!!', content='test content',
+            author=DiaryModelTest.profile)
+        self.assertEqual(diary.slug, 'diary')
+
     def test_diary_is_assigned_plain_text_description_on_creation(self):
         diary = Diary.objects.create(
             title='A test diary',
@@ -71,6 +109,30 @@ class DiaryModelTest(TestCase):
             author=DiaryModelTest.profile)
         self.assertEqual(diary.description, 'test content')
 
+    def test_long_content_description_is_cut_to_255_characters(self):
+        diary = Diary.objects.create(
+            title='A test diary',
+            content='<p>{}</p>'.format('<b>word</b> ' * 300),
+            author=DiaryModelTest.profile)
+        self.assertEqual(len(diary.description), 255)
+        self.assertTrue(diary.description.startswith('word word'))
+
+    def test_diary_words_count_and_reading_time(self):
+        diary = Diary.objects.create(
+            title='A test diary',
+            content='<p>{}</p><p>wo<b>rd</b>&nbsp;end</p>'.format(
+                'word ' * 399),
+            author=DiaryModelTest.profile)
+        self.assertEqual(diary.words_count, 401)
+        self.assertEqual(diary.reading_time, 3)
+
+        diary.content = '<p>short</p>'
+        diary.save()
+        diary.refresh_from_db()
+        self.assertEqual(
+            (diary.description, diary.words_count, diary.reading_time),
+            ('short', 1, 1))
+
     def test_get_absolute_url(self):
         diary = Diary.objects.create(
             title='A test diary',
@@ -82,3 +144,526 @@ class DiaryModelTest(TestCase):
 
         expected_url = '/diary/a-test-diary/'
         self.assertEqual(diary.get_absolute_url(), expected_url)
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(1, 4):
+            get_user_model().objects.create_user(
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                password=f'user{i}pass'  # -_-
+            )
+        cls.profile1 = Profile.objects.get(id=1)
+        cls.profile2 = Profile.objects.get(id=2)
+        cls.profile3 = Profile.objects.get(id=3)
+        # profile2 follows profile1
+        cls.profile1.followers.add(cls.profile2)
+
+    def create_diary(self, author, is_visible=Diary.ALL_CHOICE):
+        return Diary.objects.create(
+            title='A test diary',
+            content='test content',
+            is_visible=is_visible,
+            author=author)
+
+    def test_public_diary_is_pushed_to_author_and_followers(self):
+        diary = self.create_diary(TimelineTest.profile1)
+        self.assertIn(diary, Diary.objects.timeline(TimelineTest.profile1))
+        self.assertIn(diary, Diary.objects.timeline(TimelineTest.profile2))
+        self.assertNotIn(diary, Diary.objects.timeline(TimelineTest.profile3))
+
+    def test_draft_diary_is_only_pushed_to_author(self):
+        diary = self.create_diary(
+            TimelineTest.profile1, is_visible=Diary.NO_ONE_CHOICE)
+        self.assertIn(diary, Diary.objects.timeline(TimelineTest.profile1))
+        self.assertNotIn(diary, Diary.objects.timeline(TimelineTest.profile2))
+
+    def test_visibility_change_updates_followers_timelines(self):
+        diary = self.create_diary(TimelineTest.profile1)
+
+        diary = Diary.objects.get(id=diary.id)
+        diary.is_visible = Diary.NO_ONE_CHOICE
+        diary.save()
+        self.assertIn(diary, Diary.objects.timeline(TimelineTest.profile1))
+        self.assertNotIn(diary, Diary.objects.timeline(TimelineTest.profile2))
+
+        diary.is_visible = Diary.ALL_CHOICE
+        diary.save()
+        self.assertIn(diary, Diary.objects.timeline(TimelineTest.profile2))
+
+    def test_follow_and_unfollow_update_follower_timeline(self):
+        public_diary = self.create_diary(TimelineTest.profile3)
+        draft_diary = self.create_diary(
+            TimelineTest.profile3, is_visible=Diary.NO_ONE_CHOICE)
+
+        TimelineTest.profile3.followers.add(TimelineTest.profile1)
+        timeline = Diary.objects.timeline(TimelineTest.profile1)
+        self.assertIn(public_diary, timeline)
+        self.assertNotIn(draft_diary, timeline)
+
+        TimelineTest.profile1.followed_profiles.remove(TimelineTest.profile3)
+        timeline = Diary.objects.timeline(TimelineTest.profile1)
+        self.assertNotIn(public_diary, timeline)
+
+    def test_timeline_is_ordered_by_creation_date(self):
+        diaries = [self.create_diary(TimelineTest.profile1) for i in range(3)]
+        timeline = Diary.objects.timeline(TimelineTest.profile2)
+        self.assertEqual(list(timeline), diaries[::-1])
+
+    def test_rebuild_restores_timeline(self):
+        diary = self.create_diary(TimelineTest.profile1)
+        TimelineEntry.objects.filter(profile=TimelineTest.profile2).delete()
+        TimelineEntry.objects.rebuild(TimelineTest.profile2)
+        self.assertIn(diary, Diary.objects.timeline(TimelineTest.profile2))
+
+
+class DiaryPopularityScoreTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        get_user_model().objects.create_user(
+            username='user1',
+            email='user1@example.com',
+            password='user1pass'  # -_-
+        )
+        cls.profile = Profile.objects.get(id=1)
+
+    def create_diary(self, likes_count=0, comments_count=0):
+        return Diary.objects.create(
+            title='A test diary',
+            content='test content',
+            likes_count=likes_count,
+            comments_count=comments_count,
+            author=DiaryPopularityScoreTest.profile)
+
+    def test_score_is_computed_on_save(self):
+        diary = self.create_diary(likes_count=3, comments_count=1)
+        self.assertGreater(diary.popularity_score, 0)
+        self.assertEqual(self.create_diary().popularity_score, 0)
+
+    def test_score_decays_with_time(self):
+        diary = self.create_diary(likes_count=3, comments_count=1)
+        later = diary.created_on + timedelta(days=1)
+        self.assertLess(
+            diary.get_popularity_score(later), diary.popularity_score)
+
+    def test_update_popularity_score_reads_incremented_counters(self):
+        diary = self.create_diary()
+        diary.likes_count = F('likes_count') + 1
+        diary.save()
+        diary.update_popularity_score()
+        diary.refresh_from_db()
+        self.assertEqual(diary.likes_count, 1)
+        self.assertGreater(diary.popularity_score, 0)
+
+    def test_popular_orders_by_score(self):
+        low = self.create_diary(likes_count=1)
+        high = self.create_diary(likes_count=5)
+        self.assertEqual(list(Diary.objects.popular()), [high, low])
+
+    def test_decay_command_lowers_old_scores(self):
+        diary = self.create_diary(likes_count=3)
+        Diary.objects.filter(pk=diary.pk).update(
+            created_on=diary.created_on - timedelta(days=30))
+        call_command('decay_popularity_scores', stdout=StringIO())
+        diary_score = Diary.objects.get(pk=diary.pk).popularity_score
+        self.assertLess(diary_score, diary.popularity_score)
+
+
+class DiarySearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        other_user = get_user_model().objects.create_user(
+            username='user2',
+            password='user2pass')
+        cls.user = user
+        cls.profile = user.profile
+        cls.other_profile = other_user.profile
+
+    def create_diary(self, title, content, author=None,
+                     is_visible=Diary.ALL_CHOICE):
+        return Diary.objects.create(
+            title=title,
+            content=content,
+            is_visible=is_visible,
+            author=author or DiarySearchTest.profile)
+
+    def test_search_matches_title_and_content(self):
+        by_title = self.create_diary('Rainy day', '<p>nothing</p>')
+        by_content = self.create_diary('Monday', '<p>It was <b>rainy</b></p>')
+        self.create_diary('Sunny day', '<p>dry</p>')
+        self.assertCountEqual(
+            Diary.objects.search('rainy'), [by_title, by_content])
+
+    def test_search_requires_every_word(self):
+        both = self.create_diary('Coffee', '<p>coffee and rain</p>')
+        self.create_diary('Coffee', '<p>coffee only</p>')
+        self.assertEqual(list(Diary.objects.search('rain coffee')), [both])
+
+    def test_search_orders_by_relevance(self):
+        content_only = self.create_diary('Monday', '<p>a long walk</p>')
+        in_title = self.create_diary('Walk', '<p>a long walk</p>')
+        self.assertEqual(
+            list(Diary.objects.search('walk')), [in_title, content_only])
+
+    def test_search_ignores_query_syntax(self):
+        diary = self.create_diary('Quotes', '<p>he said "hello"</p>')
+        self.assertEqual(list(Diary.objects.search('"hello" OR (')), [])
+        self.assertEqual(list(Diary.objects.search('"hello"')), [diary])
+
+    def test_search_is_maintained_on_save_and_delete(self):
+        diary = self.create_diary('Draft', '<p>first version</p>')
+        diary.content = '<p>second version</p>'
+        diary.save()
+        self.assertEqual(list(Diary.objects.search('first')), [])
+        self.assertEqual(list(Diary.objects.search('second')), [diary])
+        diary.delete()
+        self.assertEqual(list(Diary.objects.search('second')), [])
+
+    def test_search_respects_visibility(self):
+        own_draft = self.create_diary(
+            'Secret', '<p>secret</p>', is_visible=Diary.NO_ONE_CHOICE)
+        self.create_diary(
+            'Secret', '<p>secret</p>', author=DiarySearchTest.other_profile,
+            is_visible=Diary.NO_ONE_CHOICE)
+        results = Diary.objects.active(DiarySearchTest.user).search('secret')
+        self.assertEqual(list(results), [own_draft])
+
+    def test_reindex_command_rebuilds_documents(self):
+        diary = self.create_diary('Garden', '<p>roses</p>')
+        Diary.objects.filter(pk=diary.pk).update(
+            content='<p>tulips</p>', description='tulips')
+        call_command('reindex_diaries', stdout=StringIO())
+        self.assertEqual(list(Diary.objects.search('tulips')), [diary])
+        self.assertEqual(list(Diary.objects.search('roses')), [])
+
+
+class DiaryRevisionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        cls.profile = user.profile
+
+    def create_diary(self, versions):
+        diary = Diary.objects.create(
+            title='Version 0',
+            content=versions[0],
+            author=self.profile)
+        for i, content in enumerate(versions[1:], 1):
+            diary.title = 'Version {}'.format(i)
+            diary.content = content
+            diary.save()
+        return diary
+
+    def test_delta_round_trip(self):
+        previous = '<p>Dear diary, today was <b>good</b>.</p>'
+        content = '<p>Dear diary, today was <i>great</i>!</p><p>Bye</p>'
+        data = revisions.encode_delta(previous, content)
+        self.assertEqual(revisions.decode(data, previous), content)
+
+    def test_revision_is_recorded_when_content_changes(self):
+        diary = self.create_diary(['<p>First</p>', '<p>Second</p>'])
+        diary.feeling = Diary.HAPPY_FEELING
+        diary.save()
+        self.assertEqual(
+            list(diary.revisions.values_list('number', 'is_snapshot')),
+            [(2, False), (1, True)])
+
+    @override_settings(DIARY_REVISION_SNAPSHOT_INTERVAL=3)
+    def test_snapshot_every_interval(self):
+        versions = ['<p>Version {}</p>'.format(i) for i in range(7)]
+        diary = self.create_diary(versions)
+        snapshots = diary.revisions.filter(is_snapshot=True)
+        self.assertEqual(
+            list(snapshots.values_list('number', flat=True)), [7, 4, 1])
+
+        with self.assertNumQueries(1):
+            chain = DiaryRevision.objects.get_chain(diary, 6)
+        self.assertEqual([revision.number for revision in chain], [4, 5, 6])
+
+    @override_settings(DIARY_REVISION_SNAPSHOT_INTERVAL=3)
+    def test_get_version(self):
+        versions = ['<p>{}</p>'.format(' word' * i) for i in range(7)]
+        diary = self.create_diary(versions)
+        for i, content in enumerate(versions):
+            revision, version = DiaryRevision.objects.get_version(
+                diary, i + 1)
+            self.assertEqual(revision.title, 'Version {}'.format(i))
+            self.assertEqual(version, content)
+
+        revision, version = DiaryRevision.objects.get_version(diary)
+        self.assertEqual(revision.number, 7)
+        with self.assertRaises(DiaryRevision.DoesNotExist):
+            DiaryRevision.objects.get_version(diary, 8)
+
+    def test_restore_revision(self):
+        diary = self.create_diary(['<p>First</p>', '<p>Second</p>'])
+        revision = diary.restore_revision(1)
+        self.assertEqual(revision.number, 3)
+        diary = Diary.objects.get(pk=diary.pk)
+        self.assertEqual(diary.title, 'Version 0')
+        self.assertEqual(diary.content, '<p>First</p>')
+        self.assertEqual(diary.revisions.count(), 3)
+
+        self.assertIsNone(diary.restore_revision(3))
+        self.assertEqual(diary.revisions.count(), 3)
+
+
+def run_now(func, using=None):
+    # The test transaction is never committed.
+    func()
+
+
+class DiarySoftDeleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_model = get_user_model()
+        cls.profile1 = user_model.objects.create_user(
+            username='user1',
+            password='user1pass').profile
+        cls.profile2 = user_model.objects.create_user(
+            username='user2',
+            password='user2pass').profile
+
+    def setUp(self):
+        self.diary = Diary.objects.create(
+            title='A diary',
+            content='<p>Content</p>',
+            author=DiarySoftDeleteTest.profile1)
+        DiaryLike.objects.create(
+            diary=self.diary,
+            user=DiarySoftDeleteTest.profile2)
+        Comment.objects.create(
+            diary=self.diary,
+            author=DiarySoftDeleteTest.profile2,
+            content='A comment')
+
+    def test_soft_deleted_diary_is_left_out(self):
+        # The flag and the author counters updates in a savepoint, whatever
+        # the size of the diary.
+        with self.assertNumQueries(4):
+            self.diary.soft_delete()
+        self.assertFalse(Diary.objects.filter(pk=self.diary.pk).exists())
+        self.assertFalse(
+            DiarySoftDeleteTest.profile1.written_diaries.exists())
+        self.assertFalse(
+            Diary.objects.timeline(DiarySoftDeleteTest.profile1).exists())
+        self.assertTrue(Diary.all_objects.filter(pk=self.diary.pk).exists())
+
+        profile = Profile.objects.get(pk=DiarySoftDeleteTest.profile1.pk)
+        self.assertEqual(profile.written_diaries_count, 0)
+        self.assertEqual(profile.visible_written_diaries_count, 0)
+
+    def test_new_diary_does_not_take_the_slug_of_a_deleted_one(self):
+        self.diary.soft_delete()
+        diary = Diary.objects.create(
+            title='A diary',
+            content='<p>Content</p>',
+            author=DiarySoftDeleteTest.profile1)
+        self.assertNotEqual(diary.slug, self.diary.slug)
+
+    def test_purge_deleted_diaries(self):
+        kept_diary = Diary.objects.create(
+            title='Kept diary',
+            content='<p>Content</p>',
+            author=DiarySoftDeleteTest.profile1)
+        self.diary.soft_delete()
+        self.assertTrue(
+            Notification.objects.filter(
+                target_object_id=self.diary.pk).exists())
+
+        with mock.patch(
+                'diaries.models.delete_ckeditor_rich_text_images') as unlink, \
+                mock.patch('django.db.transaction.on_commit', run_now):
+            call_command('purge_deleted_diaries', stdout=StringIO())
+        unlink.assert_called_once_with('<p>Content</p>')
+        self.assertEqual(
+            list(Diary.all_objects.values_list('pk', flat=True)),
+            [kept_diary.pk])
+        self.assertFalse(DiaryLike.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(
+            Notification.objects.filter(
+                target_object_id=self.diary.pk).exists())
+
+        profile = Profile.objects.get(pk=DiarySoftDeleteTest.profile1.pk)
+        self.assertEqual(profile.written_diaries_count, 1)
+
+    def test_purge_skips_missing_pictures(self):
+        image = 'uploads/user1/2020/01/01/{}.png'
+        missing = image.format('00000000-0000-0000-0000-000000000000')
+        existing = image.format('11111111-1111-1111-1111-111111111111')
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with override_settings(MEDIA_ROOT=media_root):
+            for name in (existing, existing.replace('.png', '_thumb.png')):
+                os.makedirs(os.path.dirname(os.path.join(media_root, name)),
+                            exist_ok=True)
+                open(os.path.join(media_root, name), 'wb').close()
+            self.diary.content = ''.join(
+                '<p><img src="/media/{}"></p>'.format(name)
+                for name in (missing, existing))
+            self.diary.save()
+            self.diary.soft_delete()
+
+            with mock.patch('django.db.transaction.on_commit', run_now):
+                call_command('purge_deleted_diaries', stdout=StringIO())
+            self.assertFalse(Diary.all_objects.exists())
+            self.assertEqual(os.listdir(os.path.join(
+                media_root, 'uploads/user1/2020/01/01')), [])
+
+
+class DiaryFeelingCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass').profile
+
+    def create_diary(self, **kwargs):
+        return Diary.objects.create(
+            title='A diary',
+            content='Content',
+            author=DiaryFeelingCountTest.profile,
+            **kwargs)
+
+    def assertCounts(self, **expected):
+        counts = DiaryFeelingCount.objects.get_counts()
+        self.assertEqual(
+            {feeling: count for feeling, count in counts.items() if count},
+            expected)
+        DiaryFeelingCount.objects.refresh()
+        self.assertEqual(DiaryFeelingCount.objects.get_counts(), counts)
+
+    def test_counts_follow_diaries_changes(self):
+        happy_diary = self.create_diary(feeling=Diary.HAPPY_FEELING)
+        self.create_diary(feeling=Diary.HAPPY_FEELING)
+        self.create_diary(
+            feeling=Diary.SAD_FEELING,
+            is_visible=Diary.NO_ONE_CHOICE)
+        self.create_diary()
+        self.assertCounts(**{Diary.HAPPY_FEELING: 2})
+
+        happy_diary = Diary.objects.get(pk=happy_diary.pk)
+        happy_diary.feeling = Diary.SAD_FEELING
+        happy_diary.save()
+        self.assertCounts(
+            **{Diary.HAPPY_FEELING: 1, Diary.SAD_FEELING: 1})
+
+        happy_diary.is_visible = Diary.NO_ONE_CHOICE
+        happy_diary.save()
+        self.assertCounts(**{Diary.HAPPY_FEELING: 1})
+
+    def test_deleted_diaries_are_not_counted(self):
+        soft_deleted_diary = self.create_diary(feeling=Diary.LOVE_FEELING)
+        deleted_diary = self.create_diary(feeling=Diary.LOVE_FEELING)
+        self.create_diary(feeling=Diary.LOVE_FEELING)
+
+        soft_deleted_diary.soft_delete()
+        deleted_diary.delete()
+        self.assertCounts(**{Diary.LOVE_FEELING: 1})
+
+        call_command('purge_deleted_diaries', stdout=StringIO())
+        self.assertCounts(**{Diary.LOVE_FEELING: 1})
+
+    def test_blank_feelings_are_not_counted(self):
+        self.create_diary(feeling='')
+        self.assertCounts()
+        self.assertFalse(DiaryFeelingCount.objects.filter(feeling=''))
+
+    def test_drifted_counts_do_not_go_below_zero(self):
+        diary = self.create_diary(feeling=Diary.LOVE_FEELING)
+        DiaryFeelingCount.objects.update(count=0)
+        diary.delete()
+        self.assertCounts()
+
+
+class InProcessExecutor:
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        # The uploaded images and their thumbnails.
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # Saved with the default image.
+        cls.profile = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass').profile
+
+    def setUp(self):
+        # What's tested is where the thumbnails are recorded, not resizing.
+        patcher = mock.patch.object(
+            thumbnail_default.engine, '_scale',
+            side_effect=lambda image, width, height: image)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_diary(self):
+        with open(ThumbnailsTest.profile.image.path, 'rb') as image:
+            return Diary.objects.create(
+                title='A diary',
+                content='Content',
+                image=SimpleUploadedFile('image.png', image.read()),
+                author=ThumbnailsTest.profile)
+
+    def test_thumbnails_are_scheduled_when_the_image_changes(self):
+        with mock.patch('diaries.models.schedule_thumbnails') as schedule:
+            diary = self.create_diary()
+            schedule.assert_called_once_with(diary.image, Diary.THUMBNAILS)
+
+            schedule.reset_mock()
+            diary = Diary.objects.get(pk=diary.pk)
+            diary.title = 'New title'
+            diary.save()
+            schedule.assert_not_called()
+
+            diary.image = ThumbnailsTest.profile.image.name
+            diary.save()
+            schedule.assert_called_once_with(diary.image, Diary.THUMBNAILS)
+
+    def test_templates_use_the_generated_thumbnails(self):
+        diary = self.create_diary()
+        self.assertEqual(
+            generate_thumbnails(diary.image.name, Diary.THUMBNAILS), 1)
+
+        template = Template(
+            '{% load thumbnail %}'
+            '{% thumbnail diary.image "350x180" crop="center" as img %}'
+            '{{ img.url }}{% endthumbnail %}')
+        with mock.patch(
+                'sorl.thumbnail.base.ThumbnailBackend._create_thumbnail') \
+                as create:
+            self.assertTrue(template.render(Context({'diary': diary})))
+        create.assert_not_called()
+
+    def test_generate_thumbnails_command(self):
+        self.create_diary()
+        stdout = StringIO()
+        with mock.patch(
+                'core.management.commands.generate_thumbnails.'
+                'create_executor', InProcessExecutor):
+            call_command('generate_thumbnails', stdout=stdout)
+        self.assertIn('Generated 3 thumbnails of 2 images.', stdout.getvalue())
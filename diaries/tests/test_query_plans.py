@@ -0,0 +1,115 @@
+import re
+from itertools import cycle
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory, TestCase
+
+from accounts.models import Profile
+from ..models import Diary
+from ..views import DIARIES_PER_PAGE, DiaryListView
+
+
+class FeedQueryPlanTest(TestCase):
+    """Fails when one of the feed or detail queries has no index to use and
+       falls back to a sequential scan of a table.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(20):
+            get_user_model().objects.create_user(
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                password=f'user{i}pass')
+        cls.profiles = list(Profile.objects.order_by('pk'))
+        cls.profile = cls.profiles[0]
+        cls.user = cls.profile.user
+        for profile in cls.profiles[1:6]:
+            profile.followers.add(cls.profile)
+
+        profiles_cycle = cycle(cls.profiles)
+        visibility_cycle = cycle([Diary.ALL_CHOICE] * 3 + [Diary.NO_ONE_CHOICE])
+        for i in range(200):
+            Diary.objects.create(
+                title=f'Diary N° {i + 1}',
+                content=f'Content of diary N° {i + 1}',
+                is_visible=next(visibility_cycle),
+                author=next(profiles_cycle))
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tables this small are cheaper to scan, make the planner show
+            # whether an index could be used at all.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def get_sequential_scans(self, plan):
+        if connection.vendor == 'postgresql':
+            return re.findall(r'Seq Scan on (\w+)', plan)
+        scans = []
+        for line in plan.splitlines():
+            match = re.search(r'\bSCAN (?:TABLE )?(\w+)', line)
+            if match and 'USING' not in line:
+                scans.append(match.group(1))
+        return scans
+
+    def assertUsesIndexes(self, qs):
+        plan = qs.explain()
+        self.assertEqual(
+            self.get_sequential_scans(plan), [],
+            msg=f'Sequential scan in the plan of:\n{qs.query}\n{plan}')
+
+    def get_feed(self, user, order_by=None, feeling=None):
+        """Returns the first page of the feed as DiaryListView queries it"""
+        request = RequestFactory().get('/')
+        request.user = user
+        view = DiaryListView(order_by=order_by)
+        view.setup(request)
+        view.feeling = feeling
+        return view.get_queryset()[:DIARIES_PER_PAGE]
+
+    def test_home_feed(self):
+        self.assertUsesIndexes(self.get_feed(FeedQueryPlanTest.user))
+
+    def test_anonymous_feed(self):
+        self.assertUsesIndexes(self.get_feed(AnonymousUser()))
+
+    def test_popular_feed(self):
+        for user in (FeedQueryPlanTest.user, AnonymousUser()):
+            self.assertUsesIndexes(self.get_feed(user, 'popularity'))
+
+    def test_discover_pool(self):
+        qs = Diary.objects.filter(is_visible=Diary.ALL_CHOICE)
+        qs = qs.order_by('-created_on').values_list('id', 'author_id')
+        self.assertUsesIndexes(qs[:100])
+
+    def test_active_diaries(self):
+        self.assertUsesIndexes(
+            Diary.objects.active(FeedQueryPlanTest.user)[:9])
+        self.assertUsesIndexes(Diary.objects.active(AnonymousUser())[:9])
+
+    def test_feeling_feeds(self):
+        for user in (FeedQueryPlanTest.user, AnonymousUser()):
+            for order_by in (None, 'popularity'):
+                self.assertUsesIndexes(
+                    self.get_feed(user, order_by, Diary.HAPPY_FEELING))
+
+    def test_diary_detail(self):
+        diary = Diary.objects.first()
+        qs = Diary.objects.filter(slug=diary.slug)
+        self.assertUsesIndexes(qs.active(FeedQueryPlanTest.user))
+        self.assertUsesIndexes(qs.active(AnonymousUser()))
+
+    def test_profile_diaries(self):
+        profile = FeedQueryPlanTest.profiles[1]
+        self.assertUsesIndexes(
+            profile.written_diaries.active(FeedQueryPlanTest.user)[:9])
+        self.assertUsesIndexes(
+            profile.written_diaries.active(AnonymousUser())[:9])
+        for user in (profile.user, FeedQueryPlanTest.user, AnonymousUser()):
+            self.assertUsesIndexes(
+                Diary.objects.written_by(profile, user).for_cards()[:9])
+
+    def test_profile_search(self):
+        self.assertUsesIndexes(Profile.objects.search('user1')[:12])
@@ -0,0 +1,28 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..sanitizer import sanitize_rich_text, sanitized_memo
+
+
+class SanitizeRichTextTest(SimpleTestCase):
+    def setUp(self):
+        sanitized_memo.clear()
+
+    def test_disallowed_markup_is_escaped_or_dropped(self):
+        self.assertEqual(
+            sanitize_rich_text(
+                '<img src="a.png" style="color: red; width: 10px">'
+                '<a href="javascript:x()" onclick="x()">b</a><iframe>'),
+            '<img src="a.png" style="width: 10px;"><a>b</a>&lt;iframe&gt;')
+
+    def test_sanitized_content_is_not_parsed_again(self):
+        sanitized = sanitize_rich_text('<p>a<script>x()</script></p>')
+        with mock.patch('diaries.sanitizer.Cleaner.clean') as clean:
+            self.assertEqual(sanitize_rich_text(sanitized), sanitized)
+        clean.assert_not_called()
+
+    def test_unsanitized_content_is_never_returned_as_is(self):
+        content = '<p>a<script>x()</script></p>'
+        sanitize_rich_text(content)
+        self.assertNotEqual(sanitize_rich_text(content), content)
@@ -0,0 +1,108 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from core.storage import CachedRemoteStorageDouble
+
+CONTENT = b'x' * 1000
+
+
+class CachedStorageTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        location = tempfile.TemporaryDirectory()
+        mirror_root = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        self.addCleanup(mirror_root.cleanup)
+        settings_override = override_settings(
+            MEDIA_MIRROR_ROOT=mirror_root.name,
+            MEDIA_MIRROR_MAX_SIZE=int(len(CONTENT) * 2.5))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = CachedRemoteStorageDouble(location.name, '/media/')
+
+    def save(self, name):
+        return self.storage.save(name, ContentFile(CONTENT))
+
+    def read(self, name):
+        with self.storage.open(name) as media_file:
+            return media_file.read()
+
+    def test_urls_are_cached_until_the_file_is_deleted(self):
+        name = self.save('image.png')
+        url = self.storage.url(name)
+        self.assertEqual(self.storage.url(name), url)
+        self.assertEqual(self.storage.calls['url'], 1)
+
+        self.storage.delete(name)
+        self.save(name)
+        self.assertNotEqual(self.storage.url(name), url)
+        self.assertEqual(self.storage.calls['url'], 2)
+
+    def test_only_existing_files_are_cached(self):
+        self.assertFalse(self.storage.exists('image.png'))
+        self.assertFalse(self.storage.exists('image.png'))
+        self.assertEqual(self.storage.calls['exists'], 2)
+
+        # Saving checked that the name was available.
+        name = self.save('image.png')
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.calls['exists'], 3)
+
+    def test_files_are_read_from_the_mirror(self):
+        name = self.save('image.png')
+        self.assertEqual(self.read(name), CONTENT)
+        self.assertEqual(self.storage.calls['open'], 0)
+
+        os.remove(self.storage.get_mirror_path(name))
+        self.assertEqual(self.read(name), CONTENT)
+        self.assertEqual(self.read(name), CONTENT)
+        self.assertEqual(self.storage.calls['open'], 1)
+
+    def test_files_evicted_right_after_the_copy_are_read_remotely(self):
+        name = self.save('image.png')
+        os.remove(self.storage.get_mirror_path(name))
+
+        mirror = self.storage.mirror
+
+        def mirror_then_evict(name, content):
+            mirror(name, content)
+            os.remove(self.storage.get_mirror_path(name))
+
+        with mock.patch.object(self.storage, 'mirror', mirror_then_evict):
+            self.assertEqual(self.read(name), CONTENT)
+        self.assertEqual(self.storage.calls['open'], 1)
+
+    def test_files_larger_than_the_mirror_are_not_mirrored(self):
+        name = self.storage.save('large.png', ContentFile(CONTENT * 3))
+        self.assertFalse(os.path.exists(self.storage.get_mirror_path(name)))
+        self.assertEqual(self.read(name), CONTENT * 3)
+        self.assertFalse(os.path.exists(self.storage.get_mirror_path(name)))
+        self.assertEqual(self.storage.calls['open'], 1)
+
+    def test_least_recently_used_files_are_evicted(self):
+        first = self.save('first.png')
+        second = self.save('second.png')
+        os.utime(self.storage.get_mirror_path(first), (1, 1))
+        os.utime(self.storage.get_mirror_path(second), (2, 2))
+        self.read(first)
+
+        third = self.save('third.png')
+        for name, mirrored in ((first, True), (second, False), (third, True)):
+            path = self.storage.get_mirror_path(name)
+            self.assertEqual(os.path.exists(path), mirrored)
+        self.assertEqual(self.storage.calls['open'], 0)
+
+    def test_cached_urls_are_served_before_they_expire(self):
+        longest_served = (
+            settings.MEDIA_URL_CACHE_TIMEOUT +
+            max(settings.DIARY_DETAIL_CACHE_TIMEOUT,
+                settings.DIARY_CARD_CACHE_TIMEOUT) +
+            max(settings.ANONYMOUS_PAGE_CACHE_TIMEOUT,
+                settings.PROFILE_AUTOCOMPLETE_CACHE_TIMEOUT))
+        self.assertLess(longest_served, settings.MEDIA_URL_LIFETIME)
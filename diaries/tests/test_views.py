@@ -1,13 +1,19 @@
+import gzip
 from itertools import cycle
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from accounts.models import Profile
+from core.pagination import WindowedPaginator
+from core.utils import get_cache_stats
 from ..forms import CommentForm, DiaryForm
-from ..models import Diary
+from ..models import Comment, Diary, DiaryLike
 from ..views import (DiaryListView, DiaryDetailView, DiaryCreateView,
                      DiaryUpdateView, DiaryDeleteView)
 
@@ -77,6 +83,9 @@ class DiaryListViewTest(TestCase):
             diaries.append(d)
         return diaries
 
+    def setUp(self):
+        cache.clear()
+
     def test_view_exists_at_desired_location(self):
         response = self.client.get('/')
         self.assertEqual(response.status_code, 200)
@@ -154,6 +163,92 @@ class DiaryListViewTest(TestCase):
         self.assertIn(self.profile3, authors)
         self.assertNotIn(self.profile2, authors)
 
+    def test_diaries_liked_by_logged_in_user_are_marked(self):
+        diaries = self.create_diaries(num=3)
+        DiaryLike.objects.create(diary=diaries[0], user=self.profile3)
+
+        self.client.login(username='user3', password='user3pass')
+        response = self.client.get(reverse('diaries:diary_list'))
+        liked = {d: d.is_liked for d in response.context['diaries']}
+        self.assertEqual(liked, {diaries[0]: True, diaries[2]: False})
+        self.assertContains(response, 'class="oi text-danger"', count=1)
+
+    def test_like_state_doesnt_cost_a_query_per_diary(self):
+        self.create_diaries(num=9)
+        self.client.login(username='user3', password='user3pass')
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('diaries:diary_list'))
+        likes_queries = [
+            q for q in context.captured_queries
+            if 'diaries_diarylike' in q['sql']]
+        # The page query and the paginator count, whatever the page size.
+        self.assertLessEqual(len(likes_queries), 2)
+
+
+# The pool itself is tested, not the anonymous pages cache.
+@override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+class DiscoverDiaryListViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(1, 4):
+            get_user_model().objects.create_user(
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                password=f'user{i}pass'  # -_-
+            )
+        cls.profile1 = Profile.objects.get(id=1)
+        cls.profile2 = Profile.objects.get(id=2)
+        cls.profile3 = Profile.objects.get(id=3)
+        # profile1 follows profile2
+        cls.profile2.followers.add(cls.profile1)
+
+        cls.diaries = {}
+        for profile in (cls.profile1, cls.profile2, cls.profile3):
+            for is_visible in (Diary.ALL_CHOICE, Diary.NO_ONE_CHOICE):
+                cls.diaries[profile.id, is_visible] = Diary.objects.create(
+                    title=f'Diary of {profile}',
+                    content='Content of diary',
+                    is_visible=is_visible,
+                    author=profile)
+        cls.DISCOVER_URL = reverse('diaries:discover_diary_list')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unlogged_in_user_discovers_public_diaries(self):
+        response = self.client.get(DiscoverDiaryListViewTest.DISCOVER_URL)
+        self.assertEqual(response.status_code, 200)
+        diaries = set(response.context['diaries'])
+        expected = {
+            d for (profile_id, is_visible), d in self.diaries.items()
+            if is_visible == Diary.ALL_CHOICE}
+        self.assertEqual(diaries, expected)
+
+    def test_user_doesnt_discover_his_nor_followed_profiles_diaries(self):
+        self.client.login(username='user1', password='user1pass')
+        response = self.client.get(DiscoverDiaryListViewTest.DISCOVER_URL)
+        diaries = list(response.context['diaries'])
+        self.assertEqual(
+            diaries,
+            [self.diaries[DiscoverDiaryListViewTest.profile3.id,
+                          Diary.ALL_CHOICE]])
+
+    def test_diaries_hidden_after_the_pool_is_built_are_skipped(self):
+        self.client.get(DiscoverDiaryListViewTest.DISCOVER_URL)
+        diary = self.diaries[
+            DiscoverDiaryListViewTest.profile3.id, Diary.ALL_CHOICE]
+        Diary.objects.filter(pk=diary.pk).update(
+            is_visible=Diary.NO_ONE_CHOICE)
+        response = self.client.get(DiscoverDiaryListViewTest.DISCOVER_URL)
+        self.assertNotIn(diary, response.context['diaries'])
+
+    def test_order_is_stable_across_requests(self):
+        first = self.client.get(DiscoverDiaryListViewTest.DISCOVER_URL)
+        second = self.client.get(DiscoverDiaryListViewTest.DISCOVER_URL)
+        self.assertEqual(
+            list(first.context['diaries']),
+            list(second.context['diaries']))
+
 
 class DiaryDetailViewTest(TestCase):
     @classmethod
@@ -216,6 +311,9 @@ class DiaryDetailViewTest(TestCase):
             kwargs={'diary_slug': DiaryDetailViewTest.diary3.slug}
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_view_url_is_accessible_by_name(self):
         response = self.client.get(DiaryDetailViewTest.diary1_detail_url)
         self.assertEqual(response.status_code, 200)
@@ -300,6 +398,220 @@ class DiaryDetailViewTest(TestCase):
         self.assertContains(response, 'Comments are disabled for this diary.')
 
 
+class DiaryDetailCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        cls.user2 = get_user_model().objects.create_user(
+            username='user2',
+            password='user2pass')
+        cls.diary = Diary.objects.create(
+            title='Cached diary',
+            content='<p>First version</p>',
+            author=cls.user1.profile)
+
+    def setUp(self):
+        cache.clear()
+        self.url = DiaryDetailCacheTest.diary.get_absolute_url()
+
+    def test_parts_are_rendered_once(self):
+        self.client.get(self.url)
+        self.client.force_login(DiaryDetailCacheTest.user2)
+        response = self.client.get(self.url)
+        self.assertContains(response, '<p>First version</p>')
+        self.assertEqual(get_cache_stats('diary_detail'), (1, 1))
+
+    def test_viewer_specific_bits_are_not_cached(self):
+        self.client.force_login(DiaryDetailCacheTest.user1)
+        update_url = reverse(
+            'diaries:diary_update',
+            args=[DiaryDetailCacheTest.diary.slug])
+        self.assertContains(self.client.get(self.url), update_url)
+        self.client.force_login(DiaryDetailCacheTest.user2)
+        response = self.client.get(self.url)
+        self.assertNotContains(response, update_url)
+        self.assertTrue(response.context['comment_form'])
+
+    def test_parts_are_invalidated_on_save(self):
+        self.client.get(self.url)
+        diary = Diary.objects.get(pk=DiaryDetailCacheTest.diary.pk)
+        diary.content = '<p>Second version</p>'
+        diary.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, '<p>Second version</p>')
+        self.assertNotContains(response, 'First version')
+
+    def test_likes_keep_the_parts_cached(self):
+        self.client.get(self.url)
+        self.client.force_login(DiaryDetailCacheTest.user2)
+        self.client.post(reverse(
+            'diaries:diary_like', args=[DiaryDetailCacheTest.diary.slug]))
+        response = self.client.get(self.url)
+        self.assertTrue(response.context['diary'].is_liked)
+        self.assertEqual(get_cache_stats('diary_detail'), (1, 1))
+
+
+class DiaryCardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        cls.diary = Diary.objects.create(
+            title='Cached card',
+            content='<p>Card</p>',
+            author=cls.user1.profile)
+        DiaryLike.objects.create(diary=cls.diary, user=cls.user1.profile)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('diaries:diary_list')
+
+    def test_cards_are_rendered_once(self):
+        self.client.force_login(DiaryCardCacheTest.user1)
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'user1')
+        self.assertEqual(get_cache_stats('diary_card'), (1, 1))
+
+    def test_cards_are_invalidated_when_the_author_changes(self):
+        self.client.get(self.url)
+        profile = Profile.objects.get(pk=DiaryCardCacheTest.user1.profile.pk)
+        profile.name = 'Renamed author'
+        profile.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Renamed author')
+        self.assertEqual(get_cache_stats('diary_card'), (0, 2))
+
+    def test_viewer_specific_bits_are_not_cached(self):
+        self.client.force_login(DiaryCardCacheTest.user1)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'text-danger')
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'text-danger')
+        self.assertEqual(get_cache_stats('diary_card'), (1, 1))
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        cls.diary = Diary.objects.create(
+            title='Public diary',
+            content='<p>Public</p>',
+            author=cls.user1.profile)
+        cls.draft = Diary.objects.create(
+            title='Draft diary',
+            content='<p>Draft</p>',
+            is_visible=Diary.NO_ONE_CHOICE,
+            author=cls.user1.profile)
+
+    def setUp(self):
+        cache.clear()
+        self.url = AnonymousPageCacheTest.diary.get_absolute_url()
+
+    def test_anonymous_pages_are_served_from_the_cache(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertIn('Cookie', second['Vary'])
+        self.assertEqual(get_cache_stats('anonymous_page'), (1, 1))
+
+    def test_compressed_pages_are_served_to_gzip_clients(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(second.content), first.content)
+
+    def test_logged_in_users_are_not_served_from_the_cache(self):
+        self.client.get(self.url)
+        self.client.force_login(AnonymousPageCacheTest.user1)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'like-form')
+        self.assertEqual(get_cache_stats('anonymous_page'), (0, 1))
+
+    def test_pages_are_invalidated_by_comments(self):
+        self.client.get(self.url)
+        Comment.objects.create(
+            diary=AnonymousPageCacheTest.diary,
+            author=AnonymousPageCacheTest.user1.profile,
+            content='A new comment')
+        self.assertContains(self.client.get(self.url), 'A new comment')
+
+    def test_anonymous_home_feed_only_has_public_diaries(self):
+        response = self.client.get(reverse('diaries:diary_list'))
+        self.assertEqual(
+            list(response.context['diaries']), [AnonymousPageCacheTest.diary])
+
+
+class WindowedPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        for i in range(12):
+            Diary.objects.create(
+                title='Diary {}'.format(i),
+                content='<p>Diary</p>',
+                author=user.profile)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_are_cached(self):
+        qs = Diary.objects.filter(is_visible=Diary.ALL_CHOICE)
+        self.assertEqual(WindowedPaginator(qs, 5).count, 12)
+        with self.assertNumQueries(0):
+            self.assertEqual(WindowedPaginator(qs, 5).count, 12)
+
+    def test_pages_link_to_a_fixed_window(self):
+        paginator = WindowedPaginator(Diary.objects.all(), 1)
+        self.assertEqual(list(paginator.page(1).page_window), [1, 2, 3, 4, 5])
+        self.assertEqual(list(paginator.page(6).page_window), [4, 5, 6, 7, 8])
+        self.assertEqual(
+            list(paginator.page(12).page_window), [8, 9, 10, 11, 12])
+
+
+class DiaryCardsProjectionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        Diary.objects.create(
+            title='Long diary',
+            content='<p>{}</p>'.format('word ' * 1000),
+            author=cls.user1.profile)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(DiaryCardsProjectionTest.user1)
+
+    def assertContentNotLoaded(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            self.assertNotIn('"diaries_diary"."content"', query['sql'])
+
+    def test_lists_dont_load_the_content(self):
+        self.assertContentNotLoaded(reverse('diaries:diary_list'))
+        self.assertContentNotLoaded(reverse('diaries:popular_diary_list'))
+        self.assertContentNotLoaded(
+            DiaryCardsProjectionTest.user1.profile.get_absolute_url())
+        self.assertContentNotLoaded(
+            reverse('diaries:search') + '?q=long&model=diary')
+
+    def test_list_api_doesnt_load_the_content(self):
+        self.assertContentNotLoaded(reverse('diaries_api:diary_list'))
+
+
 class DiaryCreateViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -562,3 +874,105 @@ class DiaryDeleteViewTest(TestCase):
         expected_url = reverse('diaries:diary_list')
         self.assertRedirects(response, expected_url=expected_url)
         self.assertEqual(Diary.objects.count(), 0)
+        # Purged later by purge_deleted_diaries.
+        self.assertTrue(Diary.all_objects.get().is_deleted)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user1 = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        user2 = get_user_model().objects.create_user(
+            username='walker',
+            password='user2pass')
+        cls.user1 = user1
+        cls.profile1 = user1.profile
+        cls.profile2 = user2.profile
+        cls.profile2.followers.add(cls.profile1)
+
+    def test_diary_search_is_ranked_and_respects_visibility(self):
+        Diary.objects.create(
+            title='Walk', content='<p>walk</p>',
+            is_visible=Diary.NO_ONE_CHOICE, author=SearchViewTest.profile2)
+        content_match = Diary.objects.create(
+            title='Monday', content='<p>a long walk</p>',
+            author=SearchViewTest.profile2)
+        title_match = Diary.objects.create(
+            title='Walk', content='<p>a long walk</p>',
+            author=SearchViewTest.profile2)
+        response = self.client.get(
+            reverse('diaries:search'), {'q': 'walk', 'model': 'diary'})
+        self.assertEqual(
+            list(response.context['results']), [title_match, content_match])
+
+    def test_profile_search_matches_username_prefix(self):
+        self.client.force_login(SearchViewTest.user1)
+        response = self.client.get(
+            reverse('diaries:search'), {'q': 'WAL', 'model': 'profile'})
+        results = list(response.context['results'])
+        self.assertEqual(results, [SearchViewTest.profile2])
+        self.assertTrue(results[0].is_followed)
+
+
+@override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+class FeelingFilterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username='user1',
+            password='user1pass')
+        feelings = cycle([Diary.HAPPY_FEELING, Diary.SAD_FEELING, None])
+        for i in range(30):
+            Diary.objects.create(
+                title=f'Diary N° {i + 1}',
+                content=f'Content of diary N° {i + 1}',
+                feeling=next(feelings),
+                author=cls.user.profile)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertFeeling(self, url, feeling, count):
+        response = self.client.get(url + f'?feeling={feeling}')
+        diaries = list(response.context['diaries'])
+        self.assertEqual(response.context['feeling'], feeling)
+        self.assertEqual(response.context['paginator'].count, count)
+        self.assertTrue(diaries)
+        for diary in diaries:
+            self.assertEqual(diary.feeling, feeling)
+        self.assertContains(response, f'?feeling={feeling}&page=2')
+
+    def test_feeds_are_filtered_by_feeling(self):
+        urls = [
+            reverse('diaries:diary_list'),
+            reverse('diaries:popular_diary_list'),
+            reverse('diaries:discover_diary_list'),
+        ]
+        for url in urls:
+            self.assertFeeling(url, Diary.HAPPY_FEELING, 10)
+        self.client.force_login(FeelingFilterTest.user)
+        self.assertFeeling(urls[0], Diary.SAD_FEELING, 10)
+        self.assertFeeling(
+            reverse('accounts:profile_detail', args=['user1']),
+            Diary.SAD_FEELING, 10)
+
+    def test_invalid_feeling_is_ignored(self):
+        response = self.client.get(
+            reverse('diaries:popular_diary_list') + '?feeling=BORED')
+        self.assertIsNone(response.context['feeling'])
+        self.assertEqual(response.context['paginator'].count, 30)
+
+    def test_feeling_counts_are_not_computed_per_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('diaries:popular_diary_list'))
+        self.assertIn(
+            (Diary.HAPPY_FEELING, 'Happy', 10),
+            response.context['feeling_filters'])
+        self.assertIn(
+            (Diary.LOVE_FEELING, 'Love', 0),
+            response.context['feeling_filters'])
+        for query in queries:
+            self.assertNotIn(
+                'GROUP BY "diaries_diary"."feeling"', query['sql'])
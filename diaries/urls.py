@@ -1,27 +1,34 @@
 from django.urls import path, include
 
+from core.page_cache import cache_anonymous_page
 from . import views
 
 app_name = 'diaries'
 
 urlpatterns = [
-    path('', views.DiaryListView.as_view(), name='diary_list'),
+    path(
+        '',
+        cache_anonymous_page(views.DiaryListView.as_view()),
+        name='diary_list'),
     path(
         'popular',
-        views.DiaryListView.as_view(
+        cache_anonymous_page(views.DiaryListView.as_view(
             order_by='popularity',
             template_name='diaries/diary_list_popular.html'
-        ),
+        )),
         name='popular_diary_list'),
     path(
         'discover',
-        views.DiaryListView.as_view(
+        cache_anonymous_page(views.DiaryListView.as_view(
             order_by='discover',
             template_name='diaries/diary_list_discover.html'
-        ),
+        )),
         name='discover_diary_list'),
     path('diary/<str:diary_slug>/', include([
-        path('', views.DiaryDetailView.as_view(), name='diary_detail'),
+        path(
+            '',
+            cache_anonymous_page(views.DiaryDetailView.as_view()),
+            name='diary_detail'),
         path('like', views.DiaryLikeView.as_view(), name='diary_like'),
         path('update', views.DiaryUpdateView.as_view(), name='diary_update'),
         path('delete', views.DiaryDeleteView.as_view(), name='diary_delete'),
@@ -1,8 +1,33 @@
+import logging
+import math
 import os
 import re
+from html.parser import HTMLParser
 from urllib.parse import unquote
 
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# How fast the popularity of a diary fades away with time.
+POPULARITY_GRAVITY = 1.8
+
+
+def delete_media_files(*names):
+    '''Deletes the files names from the media storage. Those already gone
+       are ignored, and those that can't be deleted are only logged: the
+       diaries holding them are deleted already.
+    '''
+    for name in names:
+        if not name:
+            continue
+        try:
+            if default_storage.exists(name):
+                default_storage.delete(name)
+        except Exception:
+            logger.exception('Could not delete the media file %s', name)
 
 
 def delete_ckeditor_rich_text_images(html_content):
@@ -18,12 +43,111 @@ def delete_ckeditor_rich_text_images(html_content):
     for img_upload_path in images_occurences:
 
         img_upload_path = unquote(img_upload_path)
-        img_full_path = os.path.join(settings.MEDIA_ROOT, img_upload_path)
 
         # CKEDITOR automatically generate thumbnails for images
-        img_name = '.'.join(img_full_path.split('.')[:-1])
-        img_ext = img_full_path.split('.')[-1]
-        img_thumb_full_path = '{}_thumb.{}'.format(img_name, img_ext)
+        img_name, img_ext = os.path.splitext(img_upload_path)
+        img_thumb_upload_path = '{}_thumb{}'.format(img_name, img_ext)
+
+        delete_media_files(img_upload_path, img_thumb_upload_path)
+
+
+def get_popularity_score(interactions, created_on=None, now=None):
+    '''Time decayed popularity: the interactions (likes and comments) weigh
+       less and less as the diary gets older.
+    '''
+    if now is None:
+        now = timezone.now()
+    age_in_hours = 0
+    if created_on is not None:
+        age_in_hours = max((now - created_on).total_seconds() / 3600, 0)
+    return interactions / (age_in_hours + 2) ** POPULARITY_GRAVITY
+
+
+class TextExtractor(HTMLParser):
+    '''Walks html content once, keeping its text with collapsed whitespace
+       and counting its words. Block level tags separate words, inline ones
+       don't: '<b>a</b>b' is one word.
+    '''
+    BLOCK_TAGS = {
+        'address', 'blockquote', 'br', 'caption', 'div', 'h1', 'h2', 'h3',
+        'h4', 'h5', 'h6', 'hr', 'img', 'li', 'ol', 'p', 'pre', 'table', 'td',
+        'th', 'tr', 'ul',
+    }
+    SKIPPED_TAGS = {'script', 'style'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.words_count = 0
+        self._chunks = []
+        self._in_word = False
+        self._skipping = 0
+
+    @property
+    def text(self):
+        return ''.join(self._chunks).strip()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag in self.BLOCK_TAGS:
+            self._break_word()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS:
+            self._break_word()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            self._skipping = max(self._skipping - 1, 0)
+        elif tag in self.BLOCK_TAGS:
+            self._break_word()
+
+    def handle_data(self, data):
+        if self._skipping or not data:
+            return
+        words = data.split()
+        if not words:
+            self._break_word()
+            return
+        self.words_count += len(words)
+        text = ' '.join(words)
+        if data[0].isspace():
+            self._break_word()
+        elif self._in_word:
+            # The first word continues the one the previous data ended with.
+            self.words_count -= 1
+        if data[-1].isspace():
+            text += ' '
+        self._append(text)
+        self._in_word = not data[-1].isspace()
+
+    def _break_word(self):
+        if self._in_word:
+            self._append(' ')
+        self._in_word = False
+
+    def _append(self, text):
+        if self._chunks and self._chunks[-1].endswith(' '):
+            text = text.lstrip(' ')
+        elif not self._chunks:
+            text = text.lstrip(' ')
+        if text:
+            self._chunks.append(text)
+
+
+def extract_text(html_content):
+    '''Returns (text, words count) of html_content'''
+    extractor = TextExtractor()
+    extractor.feed(html_content)
+    extractor.close()
+    return extractor.text, extractor.words_count
+
+
+def get_plain_text(html_content):
+    '''Returns the text of html_content, without the tags'''
+    return extract_text(html_content)[0]
+
 
-        os.unlink(img_full_path)
-        os.unlink(img_thumb_full_path)
+def get_reading_time(words_count):
+    '''Reading time in minutes, at least one for a diary with any word'''
+    return math.ceil(words_count / settings.WORDS_READ_PER_MINUTE)
@@ -1,7 +1,7 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import Paginator
-from django.db.models import Q, F
+from django.db.models import F
 from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import (
@@ -15,9 +15,12 @@ from django.urls import reverse
 from notifications.views import NotificationViewList
 from notifications.models import Notification
 
-from .forms import DiaryForm, CommentForm, SearchForm
-from .models import Diary, DiaryLike, Comment
+from .discover import DiscoverFeed, get_discover_diary_ids
+from .forms import DiaryForm, CommentForm, FeelingFilterForm, SearchForm
+from .models import Diary, DiaryFeelingCount, DiaryLike, Comment
+from .rendering import get_detail_parts
 from accounts.models import Profile
+from core.pagination import WindowedPaginator
 
 
 DIARIES_PER_PAGE = 9
@@ -26,33 +29,46 @@ DIARIES_PER_PAGE = 9
 class DiaryListView(ListView):
     model = Diary
     paginate_by = DIARIES_PER_PAGE
+    paginator_class = WindowedPaginator
     template_name = 'diaries/diary_list.html'
     context_object_name = 'diaries'
     order_by = None
 
     extra_context = {'search_form': SearchForm(initial={'model': 'diary'})}
 
+    def get(self, request, *args, **kwargs):
+        self.feeling_form = FeelingFilterForm(request.GET)
+        self.feeling = self.feeling_form.get_feeling()
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        cx = super().get_context_data(**kwargs)
+        cx['feeling'] = self.feeling
+        # The stored counts, the feeds aren't grouped by feeling.
+        counts = DiaryFeelingCount.objects.get_counts()
+        cx['feeling_filters'] = self.feeling_form.get_filters(counts)
+        return cx
+
     def get_queryset(self):
         order_by = self.order_by
+        user = self.request.user
         if order_by == 'popularity':
             qs = self.model.objects.popular()
         elif order_by == 'discover':
-            qs = self.model.objects.all()
-            qs = qs.active(self.request.user)
+            diary_ids = get_discover_diary_ids(user, self.feeling)
+            qs = self.model.objects.for_cards()
+            return DiscoverFeed(diary_ids, qs.with_viewer_state(user))
         else:
-            if self.request.user.is_authenticated:
-                followed_profiles_diaries = Diary.objects\
-                    .by_followed_profiles(self.request.user.profile).order_by()
-
-                current_profile_diaries = Diary.objects.filter(
-                    author=self.request.user.profile
-                ).order_by()
-
-                qs = followed_profiles_diaries.union(current_profile_diaries)
-                qs = qs.order_by('-created_on')
+            if user.is_authenticated:
+                qs = self.model.objects.timeline(user.profile)
             else:
-                qs = self.model.objects.all()
-        return qs
+                # The anonymous home feed is bounded, the paginator doesn't
+                # count the whole table.
+                qs = self.model.objects.active(user).for_cards()
+                qs = qs.with_feeling(self.feeling).with_viewer_state(user)
+                return qs[:settings.ANONYMOUS_FEED_SIZE]
+        qs = qs.with_feeling(self.feeling)
+        return qs.for_cards().with_viewer_state(user)
 
 
 class DiaryDetailView(DetailView):
@@ -66,6 +82,9 @@ class DiaryDetailView(DetailView):
         qs = self.model.objects.all()
         qs = qs.filter(slug=self.kwargs[self.slug_url_kwarg])
         qs = qs.active(self.request.user)
+        qs = qs.with_viewer_state(self.request.user)
+        # The content is only needed when the cached parts are rendered.
+        qs = qs.defer('content')
         obj = qs.first()
         if obj is None:
             raise Http404()
@@ -73,6 +92,7 @@ class DiaryDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         cx = super(DiaryDetailView, self).get_context_data(**kwargs)
+        cx['diary_parts'] = get_detail_parts(self.object)
 
         comment_form = None
         if self.object.is_commentable == Diary.ALL_CHOICE:
@@ -127,6 +147,14 @@ class DiaryDeleteView(LoginRequiredMixin, DeleteView):
         messages.warning(self.request, 'Your Diary was deleted successfly.')
         return reverse('diaries:diary_list')
 
+    def delete(self, request, *args, **kwargs):
+        # Only flagged, purge_deleted_diaries deletes it with its images and
+        # notifications out of the request.
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        self.object.soft_delete()
+        return redirect(success_url)
+
     def get_object(self):
         obj = get_object_or_404(
             self.model,
@@ -155,7 +183,8 @@ class DiaryLikeView(LoginRequiredMixin, View):
         else:
             dl.delete()
             diary.likes_count = F('likes_count') - 1
-        diary.save()
+        diary.save(update_fields=['likes_count'])
+        diary.update_popularity_score()
         return redirect(diary)
 
 
@@ -183,7 +212,8 @@ class CommentCreateView(LoginRequiredMixin, View):
             new_comment.diary = diary
             new_comment.save()
             diary.comments_count = F('comments_count') + 1
-            diary.save()
+            diary.save(update_fields=['comments_count'])
+            diary.update_popularity_score()
             messages.success(
                 self.request, 'Your comment was created successfly.')
             return redirect(diary)
@@ -214,7 +244,8 @@ class CommentDeleteView(LoginRequiredMixin, DeleteView):
         )
         # Not sure if i should put this here
         diary.comments_count = F('comments_count') - 1
-        diary.save()
+        diary.save(update_fields=['comments_count'])
+        diary.update_popularity_score()
         messages.warning(self.request, 'Your comment was deleted successfly.')
         return diary.get_absolute_url()
 
@@ -222,6 +253,7 @@ class CommentDeleteView(LoginRequiredMixin, DeleteView):
 class SearchView(ListView):
     template_name = 'diaries/search.html'
     context_object_name = 'results'
+    paginator_class = WindowedPaginator
 
     def get_paginate_by(self, queryset):
         search_form = SearchForm(self.request.GET)
@@ -248,19 +280,19 @@ class SearchView(ListView):
             q = search_form.cleaned_data['q']
             if search_form.cleaned_data['model'] == 'diary':
                 diaries = Diary.objects.active(self.request.user)
-                diaries = diaries.filter(title__contains=q).distinct()
+                diaries = diaries.search(q).for_cards()
+                diaries = diaries.with_viewer_state(self.request.user)
                 return diaries
             elif search_form.cleaned_data['model'] == 'profile':
-                profiles = Profile.objects.filter(
-                    Q(name__contains=q) |
-                    Q(user__username__contains=q) |
-                    Q(description__contains=q)).distinct()
-                return profiles
+                profiles = Profile.objects.with_viewer_state(
+                    self.request.user)
+                return profiles.search(q)
 
 
 class NotificationListView(LoginRequiredMixin, NotificationViewList):
     template_name = 'diaries/notification_list.html'
     paginate_by = 10
+    paginator_class = WindowedPaginator
 
     def get_queryset(self):
         qs = Notification.objects.filter(recipient=self.request.user)
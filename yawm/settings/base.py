@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import tempfile
 
 from django.contrib.messages import constants as messages
 
@@ -180,6 +181,80 @@ MESSAGE_TAGS = {
     messages.WARNING: 'alert-warning'
 }
 
+# DISCOVER FEED
+# Number of recent public diaries the discover feed picks from, and how long
+# (in seconds) the pool is cached before it's rebuilt. With a cache shared by
+# the workers, the refresh_discover_pool command can be scheduled instead.
+DISCOVER_POOL_SIZE = 3000
+DISCOVER_POOL_TIMEOUT = 15 * 60
+
+# DIARY SEARCH
+# PostgreSQL text search configuration of the diaries search vectors. 'simple'
+# doesn't stem words, diaries are written in many languages.
+DIARY_SEARCH_CONFIG = 'simple'
+
+# DIARY CONTENT COMPRESSION
+# Size (in bytes) from which the content of diaries is stored zlib compressed.
+DIARY_CONTENT_COMPRESSION_THRESHOLD = 1024
+
+# DIARY REVISIONS
+# Every how many revisions the content of a diary is stored in full rather
+# than as a delta against the previous revision. Rebuilding a revision
+# decodes at most that many revisions.
+DIARY_REVISION_SNAPSHOT_INTERVAL = 10
+
+# READING TIME
+# Reading speed the reading time of diaries is estimated with.
+WORDS_READ_PER_MINUTE = 200
+
+# DIARY DETAIL AND CARDS CACHE
+# How long (in seconds) the rendered parts of diary pages and cards are
+# cached. The Dropbox links of the images they hold expire after four hours.
+DIARY_DETAIL_CACHE_TIMEOUT = 60 * 60
+DIARY_CARD_CACHE_TIMEOUT = 60 * 60
+
+# ANONYMOUS PAGES CACHE
+# How long (in seconds) the public pages served to anonymous visitors are
+# cached (0 disables the cache). Diary, comment and profile changes drop them
+# right away, likes counters are refreshed when they expire.
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60
+# Number of recent public diaries the anonymous home feed is paginated over.
+ANONYMOUS_FEED_SIZE = 500
+
+# PAGINATION
+# How long (in seconds) the counts of the paginated lists are cached.
+PAGINATOR_COUNT_CACHE_TIMEOUT = 60
+
+# THUMBNAILS
+# Number of worker processes generating the thumbnails of the saved images,
+# 0 generates them in the process that saved the image.
+THUMBNAIL_WORKERS = 2
+
+# PROFILE AUTOCOMPLETE
+# Number of suggested profiles, and for how long (in seconds) the suggestions
+# of the prefixes up to PROFILE_AUTOCOMPLETE_CACHED_PREFIX_LENGTH characters
+# are cached.
+PROFILE_AUTOCOMPLETE_LIMIT = 8
+PROFILE_AUTOCOMPLETE_CACHED_PREFIX_LENGTH = 3
+PROFILE_AUTOCOMPLETE_CACHE_TIMEOUT = 60
+
+# MEDIA CACHE
+# The urls of the media files are Dropbox temporary links valid for 4 hours.
+# They're cached for MEDIA_URL_CACHE_TIMEOUT seconds, then served for as long
+# as the diary parts and cards, then the anonymous pages (or the profile
+# suggestions) holding them are cached: the sum stays under their lifetime,
+# with a margin for the pages left open.
+MEDIA_URL_LIFETIME = 4 * 60 * 60
+MEDIA_URL_CACHE_TIMEOUT = (
+    MEDIA_URL_LIFETIME -
+    max(DIARY_DETAIL_CACHE_TIMEOUT, DIARY_CARD_CACHE_TIMEOUT) -
+    max(ANONYMOUS_PAGE_CACHE_TIMEOUT, PROFILE_AUTOCOMPLETE_CACHE_TIMEOUT) -
+    10 * 60)
+# Directory of the local copies of the recently used media files, and its
+# maximum size in bytes (0 disables the copies).
+MEDIA_MIRROR_ROOT = os.path.join(tempfile.gettempdir(), 'yawm_media_mirror')
+MEDIA_MIRROR_MAX_SIZE = 256 * 1024 * 1024
+
 REST_FRAMEWORK = {
     'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning'
 }
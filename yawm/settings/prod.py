@@ -18,9 +18,22 @@ DATABASES = {
     )
 }
 
+# Shared by all the workers (and the management commands): the cached pages,
+# their invalidations, the discover pool and the caches hits and misses.
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': config('REDIS_URL'),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        },
+    }
+}
+
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
-DEFAULT_FILE_STORAGE = 'storages.backends.dropbox.DropBoxStorage'
+# Dropbox, behind a cache of the urls and a local copy of the files.
+DEFAULT_FILE_STORAGE = 'core.storage.CachedDropBoxStorage'
 DROPBOX_OAUTH2_TOKEN = config('DROPBOX_OAUTH2_TOKEN')
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'